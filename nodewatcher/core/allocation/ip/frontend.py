@@ -10,4 +10,5 @@ components.partials.get_partial('node_display_partial').add(components.PartialEn
     name='ip_allocations',
     weight=90,
     template='nodes/ip_allocations.html',
+    cache=components.CachePolicy([components.registry_version()]),
 ))
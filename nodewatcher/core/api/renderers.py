@@ -7,3 +7,42 @@ class JSONRenderer(renderers.UJSONRenderer):
             return super(renderers.UJSONRenderer, self).render(data, accepted_media_type, renderer_context)
         else:
             return super(JSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+    def render_stream(self, envelope, chunks, accepted_media_type=None, renderer_context=None):
+        """
+        Renders a list incrementally, producing the same output as rendering the
+        whole list at once. Indentation is not supported.
+
+        :param envelope: Optional ordered dictionary of keys preceding the list, in
+            which case the list is rendered under the 'results' key
+        :param chunks: Iterable of lists of items
+        :return: A generator of rendered fragments
+        """
+
+        renderer_context = renderer_context or {}
+
+        if envelope is not None:
+            fragment = '{'
+            for key, value in envelope.items():
+                fragment += '%s:%s,' % (
+                    self.render(key, accepted_media_type, renderer_context),
+                    # Rendering None produces an empty string.
+                    self.render(value, accepted_media_type, renderer_context) if value is not None else 'null',
+                )
+            yield fragment + '"results":['
+        else:
+            yield '['
+
+        first = True
+        for chunk in chunks:
+            if not chunk:
+                continue
+
+            fragment = ','.join([self.render(item, accepted_media_type, renderer_context) for item in chunk])
+            if not first:
+                fragment = ',' + fragment
+            first = False
+
+            yield fragment
+
+        yield ']}' if envelope is not None else ']'
@@ -37,8 +37,13 @@ class JSONLDSerializerMixin(object):
         # Include metadata.
         base_view = getattr(self.Meta, 'base_view', None)
         if base_view is not None:
+            # Resolve the base only once per serializer instance as it is shared by all
+            # instances when serializing a list.
+            if '_jsonld_base' not in self.__dict__:
+                self._jsonld_base = urlresolvers.reverse(base_view)
+
             data['@context'] = {
-                '@base': urlresolvers.reverse(base_view),
+                '@base': self._jsonld_base,
                 # TODO: Also include @vocab.
             }
 
@@ -55,10 +60,19 @@ class PolymorphicSerializerMixin(object):
         data = super(PolymorphicSerializerMixin, self).to_representation(instance)
 
         # Resolve the subclass serializer (if it exists).
+        serializers = self.__dict__.setdefault('_polymorphic_serializers', {})
         try:
-            data.update(pool.get_serializer(instance.__class__)(instance).data)
-        except exceptions.SerializerNotRegistered:
-            pass
+            serializer = serializers[instance.__class__]
+        except KeyError:
+            try:
+                serializer = pool.get_serializer(instance.__class__)()
+            except exceptions.SerializerNotRegistered:
+                serializer = None
+
+            serializers[instance.__class__] = serializer
+
+        if serializer is not None:
+            data.update(serializer.to_representation(instance))
 
         return data
 
@@ -1,23 +1,162 @@
 import copy
+import hashlib
 import re
 
 from django.conf import settings
+from django.core import cache as django_cache
 from django.template import loader
+from django.utils import safestring, timezone, translation
+
+from sekizai import helpers as sekizai_helpers
 
 from . import exceptions
 
 # Exports
 __all__ = [
+    'CachePolicy',
     'Partial',
     'PartialEntry',
-    'partials'
+    'partials',
+    'registry_version',
 ]
 
 VALID_NAME = re.compile('^[A-Za-z_][A-Za-z0-9_]*$')
 
 
+def registry_version(root_variable='node'):
+    """
+    Returns a cache dependency on the change version of a registry root in the
+    template context. The version changes whenever any configuration or
+    monitoring item of the root changes.
+
+    :param root_variable: Name of the context variable holding the root
+    """
+
+    def dependency(context):
+        # Imported here as components are loaded before models are ready.
+        from nodewatcher.core.registry import versions
+
+        root = context[root_variable]
+        key = (root_variable, root.__class__.__name__, root.pk)
+
+        # Versions are only fetched once per request.
+        request = context.get('request', None)
+        known_versions = getattr(request, '_registry_versions', None)
+        if known_versions is None:
+            known_versions = {}
+            if request is not None:
+                request._registry_versions = known_versions
+
+        if key not in known_versions:
+            known_versions[key] = versions.tracker.get_version(root.__class__, root.pk)[0]
+
+        return key, known_versions[key]
+
+    return dependency
+
+
+class _RecordingSequence(object):
+    """
+    Sekizai block content, which records all additions.
+    """
+
+    def __init__(self, name, sequence, log):
+        self._name = name
+        self._sequence = sequence
+        self._log = log
+
+    def append(self, value):
+        self._log.append((self._name, None, value))
+        self._sequence.append(value)
+
+    def insert(self, index, value):
+        self._log.append((self._name, index, value))
+        self._sequence.insert(index, value)
+
+    def __contains__(self, value):
+        return value in self._sequence
+
+    def __iter__(self):
+        return iter(self._sequence)
+
+    def __len__(self):
+        return len(self._sequence)
+
+    def __getitem__(self, index):
+        return self._sequence[index]
+
+    def __getattr__(self, name):
+        return getattr(self._sequence, name)
+
+
+class _RecordingHolder(dict):
+    """
+    Sekizai content holder, which records all additions so that they can be
+    repeated when a cached fragment is used.
+    """
+
+    def __init__(self, holder):
+        super(_RecordingHolder, self).__init__()
+        self._holder = holder
+        self.log = []
+
+    def __missing__(self, name):
+        sequence = self[name] = _RecordingSequence(name, self._holder[name], self.log)
+        return sequence
+
+
+class CachePolicy(object):
+    """
+    Cache policy of a partial entry. Rendered entries are cached under a key
+    derived from the values of all dependencies, so a cached entry is no
+    longer used as soon as any of its dependencies changes. Extra context is
+    not computed when a cached entry is used.
+    """
+
+    def __init__(self, dependencies, timeout=None, per_user=False):
+        """
+        Class constructor.
+
+        :param dependencies: A list of callables, which receive the template
+            context and return a value identifying the rendered data
+        :param timeout: Optional cache timeout in seconds
+        :param per_user: Should entries be cached separately for each user
+        """
+
+        self.dependencies = dependencies
+        self.timeout = timeout or getattr(settings, 'PARTIALS_CACHE_TIMEOUT', 3600)
+        self.per_user = per_user
+
+    @property
+    def cache(self):
+        return django_cache.caches[getattr(settings, 'PARTIALS_CACHE', 'default')]
+
+    def get_key(self, entry, context):
+        """
+        Returns the cache key of a rendered entry.
+
+        :param entry: Partial entry
+        :param context: Flattened template context
+        """
+
+        key = [
+            entry.name,
+            entry.template,
+            translation.get_language(),
+            timezone.get_current_timezone_name(),
+        ]
+
+        if self.per_user:
+            request = context.get('request', None)
+            key.append(getattr(getattr(request, 'user', None), 'pk', None))
+
+        key.extend([dependency(context) for dependency in self.dependencies])
+
+        return 'nodewatcher:partial:%s' % hashlib.md5(repr(key)).hexdigest()
+
+
 class PartialEntry(object):
-    def __init__(self, name, template, visible=None, weight=0, classes=None, extra_context=None):
+    def __init__(self, name, template, visible=None, weight=0, classes=None, extra_context=None, cache=None, prefetch=None):
         if not name:
             raise exceptions.InvalidPartial("A partial entry has invalid name")
 
@@ -34,6 +173,8 @@ class PartialEntry(object):
         self._classes = ' '.join(classes)
 
         self._extra_context = extra_context
+        self._cache = cache
+        self._prefetch = prefetch or []
 
         self._context = None
 
@@ -41,6 +182,23 @@ class PartialEntry(object):
     def name(self):
         return self._name
 
+    @property
+    def template(self):
+        return self._template
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def prefetch(self):
+        """
+        Registry lookups used by the extra context, which may be prefetched
+        by views.
+        """
+
+        return self._prefetch
+
     @property
     def weight(self):
         return self._weight
@@ -67,8 +225,37 @@ class PartialEntry(object):
         if context is None:
             context = self._context
         context = context.flatten()
+
+        if self._cache is None:
+            context.update(self.get_extra_context(context))
+            return loader.render_to_string(self._template, context)
+
+        key = self._cache.get_key(self, context)
+        varname = sekizai_helpers.get_varname()
+        holder = context.get(varname, None)
+
+        cached = self._cache.cache.get(key)
+        if cached is not None:
+            rendered, log = cached
+            if holder is not None:
+                # Repeat sekizai additions made while the entry was rendered.
+                for name, index, value in log:
+                    if index is None:
+                        holder[name].append(value)
+                    else:
+                        holder[name].insert(index, value)
+
+            return safestring.mark_safe(rendered)
+
+        log = []
+        if holder is not None:
+            context[varname] = _RecordingHolder(holder)
+            log = context[varname].log
+
         context.update(self.get_extra_context(context))
-        return loader.render_to_string(self._template, context)
+        rendered = loader.render_to_string(self._template, context)
+        self._cache.cache.set(key, (unicode(rendered), log), self._cache.timeout)
+        return rendered
 
 
 class DeferredPartial(object):
@@ -113,6 +300,20 @@ class Partial(DeferredPartial):
     def get_entries(self):
         return self._entries
 
+    def get_prefetch_lookups(self):
+        """
+        Returns registry lookups used by entries of this partial. Entries with
+        a cache policy are not included as their extra context is usually not
+        needed.
+        """
+
+        lookups = []
+        for entry in self._entries:
+            if entry.cache is None:
+                lookups.extend(entry.prefetch)
+
+        return lookups
+
     @property
     def entries(self):
         return self.get_entries()
@@ -0,0 +1,44 @@
+from django import test
+from django.template import context as template_context
+
+from sekizai import data as sekizai_data
+
+from . import components
+
+
+class PartialCacheTestCase(test.SimpleTestCase):
+    def setUp(self):
+        self.calls = []
+
+        def extra_context(context):
+            self.calls.append(context['version'])
+            return {'node_last_seen': 'seen %s' % context['version']}
+
+        self.entry = components.PartialEntry(
+            name='last_seen',
+            template='nodes/last_seen.html',
+            extra_context=extra_context,
+            cache=components.CachePolicy([lambda context: context['version']]),
+        )
+        self.entry._cache.cache.clear()
+
+    def test_cached_render(self):
+        first = self.entry.render(template_context.Context({'version': 1}))
+        self.assertIn('seen 1', first)
+        self.assertEqual(self.entry.render(template_context.Context({'version': 1})), first)
+        self.assertEqual(self.calls, [1])
+
+        # Changed dependencies cause the entry to be rendered again.
+        self.assertIn('seen 2', self.entry.render(template_context.Context({'version': 2})))
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_recording_holder(self):
+        holder = sekizai_data.UniqueSequence()
+        holders = {'js': holder}
+        recorder = components.partial._RecordingHolder(holders)
+        recorder['js'].append('a.js')
+        recorder['js'].insert(0, 'b.js')
+        recorder['js'].append('a.js')
+
+        self.assertEqual(list(holder), ['b.js', 'a.js'])
+        self.assertEqual(recorder.log, [('js', None, 'a.js'), ('js', 0, 'b.js'), ('js', None, 'a.js')])
@@ -3,6 +3,10 @@ from django.core import exceptions
 from django.utils import encoding
 from django.utils.translation import ugettext_lazy as _
 
+from nodewatcher.core.registry import prefetch as registry_prefetch
+
+from . import components
+
 
 class NodeNameMixin(object):
     def get_context_data(self, **kwargs):
@@ -11,6 +15,39 @@ class NodeNameMixin(object):
         return context
 
 
+class RegistryPrefetchMixin(object):
+    """
+    Prefetches registry items of displayed registry roots, so that accessing
+    them does not cause a query for each root. Items are declared using
+    ``registry_prefetch`` and by entries of partials listed in
+    ``registry_prefetch_partials``.
+    """
+
+    registry_prefetch = None
+    registry_prefetch_partials = None
+
+    def get_registry_prefetch(self):
+        planner = registry_prefetch.PrefetchPlanner(self.registry_prefetch)
+        for partial_name in self.registry_prefetch_partials or []:
+            if components.partials.has_partial(partial_name):
+                planner.add(*components.partials.get_partial(partial_name).get_prefetch_lookups())
+
+        return planner
+
+    def get_context_data(self, **kwargs):
+        context = super(RegistryPrefetchMixin, self).get_context_data(**kwargs)
+
+        planner = self.get_registry_prefetch()
+        if planner:
+            if context.get('object_list', None) is not None:
+                # Evaluates the list, which is then reused by the template.
+                planner.prefetch(list(context['object_list']))
+            elif context.get('object', None) is not None:
+                planner.prefetch([context['object']])
+
+        return context
+
+
 class CancelableFormMixin(object):
     cancel_url = None
 
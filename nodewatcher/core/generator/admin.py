@@ -9,7 +9,7 @@ class BuildChannelAdmin(admin.ModelAdmin):
 
 
 class BuilderAdmin(admin.ModelAdmin):
-    list_display = ('host', 'platform', 'architecture', 'version')
+    list_display = ('host', 'platform', 'architecture', 'version', 'max_concurrent_builds')
     list_filter = ('platform', 'architecture', 'version')
 
 admin.site.register(models.BuildChannel, BuildChannelAdmin)
@@ -462,7 +462,7 @@ class PlatformBase(object):
         result.save()
 
         from . import tasks
-        tasks.background_build.delay(result.uuid)
+        tasks.schedule_builds.delay(result.uuid)
 
         return result
 
@@ -511,21 +511,24 @@ class PlatformBase(object):
             except generator_models.BuildVersion.DoesNotExist:
                 raise exceptions.NoBuildersConfigured
 
-        # Select a proper builder.
-        try:
-            builder = generator_models.Builder.objects.get(
-                platform=self.name,
-                architecture=device.architecture,
-                channels=build_channel,
-                version=version,
-            )
-        except generator_models.Builder.DoesNotExist:
+        # Select a proper builder. Any builder from the pool may be selected here as the
+        # scheduler will later assign the build to the least loaded builder of the pool.
+        builders = generator_models.Builder.objects.filter(
+            platform=self.name,
+            architecture=device.architecture,
+            channels=build_channel,
+            version=version,
+        ).order_by('host')
+        if not builders:
             raise exceptions.NoSuitableBuildersFound
 
         # Ensure that current builder metadata is consistent with what has been stored
         # in the database. Otherwise, the actual builder may be replaced and we will be
         # operating on incorrect data.
-        if not builder.is_consistent():
+        for builder in builders:
+            if builder.is_consistent():
+                break
+        else:
             raise exceptions.BuilderInconsistent
 
         # Update metadata.
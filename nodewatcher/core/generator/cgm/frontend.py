@@ -25,6 +25,7 @@ components.partials.get_partial('node_general_partial').add(components.PartialEn
     name='device',
     template='nodes/cgm/device.html',
     weight=80,
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=device_context,
 ))
 
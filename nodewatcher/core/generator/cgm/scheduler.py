@@ -0,0 +1,151 @@
+import collections
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .. import models as generator_models
+
+
+def get_build_timeout():
+    """
+    Returns the time after which a running build is considered stale and its
+    builder slot is released.
+    """
+
+    return datetime.timedelta(seconds=getattr(settings, 'GENERATOR_BUILD_TIMEOUT', 2 * 3600))
+
+
+def get_pending_results(builder):
+    """
+    Returns a queryset of pending build results which may be built by builders
+    from the pool of the specified builder.
+
+    :param builder: Builder that identifies the pool
+    """
+
+    return generator_models.BuildResult.objects.filter(
+        status=generator_models.BuildResult.PENDING,
+        builder__platform=builder.platform,
+        builder__architecture=builder.architecture,
+        builder__version=builder.version_id,
+    )
+
+
+def get_running_results(builders):
+    """
+    Returns a queryset of build results which currently occupy a slot on one
+    of the specified builders.
+
+    :param builders: A list of builders
+    """
+
+    return generator_models.BuildResult.objects.filter(
+        status=generator_models.BuildResult.BUILDING,
+        builder__in=builders,
+        build_started__gte=timezone.now() - get_build_timeout(),
+    )
+
+
+@transaction.atomic
+def schedule(builder):
+    """
+    Assigns pending build results to free slots on builders from the pool of
+    the specified builder. Pending results are handed out in order of creation,
+    preferring users with the least builds currently running, so that a single
+    user requesting many builds cannot starve others.
+
+    :param builder: Builder that identifies the pool
+    :return: A list of build results that were assigned to builders
+    """
+
+    # Lock all builders in the pool so that concurrent schedulers do not hand out
+    # the same slots. Builders are always locked in the same order to avoid deadlocks.
+    builders = list(builder.get_pool().select_for_update().order_by('pk'))
+    if not builders:
+        return []
+
+    capacity = sum([pool_builder.max_concurrent_builds for pool_builder in builders])
+    running_builders = collections.Counter()
+    running_users = collections.Counter()
+    for builder_id, user_id in get_running_results(builders).values_list('builder', 'user'):
+        running_builders[builder_id] += 1
+        running_users[user_id] += 1
+
+    busy = sum(running_builders.values())
+    if busy >= capacity:
+        return []
+
+    # Determine which channels each builder may build for.
+    channels = collections.defaultdict(set)
+    for builder_id, channel_id in generator_models.BuildChannel.builders.through.objects.filter(
+        builder__in=builders,
+    ).values_list('builder', 'buildchannel'):
+        channels[builder_id].add(channel_id)
+
+    pending = list(get_pending_results(builder).select_for_update().order_by('created'))
+    assigned = []
+    while pending and busy < capacity:
+        result = min(pending, key=lambda result: (running_users[result.user_id], result.created))
+        pending.remove(result)
+
+        # Choose the least loaded builder with a free slot that can build for the result's channel.
+        candidates = [
+            pool_builder for pool_builder in builders
+            if running_builders[pool_builder.pk] < pool_builder.max_concurrent_builds and
+            result.build_channel_id in channels[pool_builder.pk]
+        ]
+        if not candidates:
+            continue
+
+        selected = min(
+            candidates,
+            key=lambda pool_builder: float(running_builders[pool_builder.pk]) / pool_builder.max_concurrent_builds,
+        )
+        running_builders[selected.pk] += 1
+        running_users[result.user_id] += 1
+        busy += 1
+
+        result.builder = selected
+        result.status = generator_models.BuildResult.BUILDING
+        result.build_started = timezone.now()
+        result.builder_utilisation = float(busy) / capacity
+        result.save()
+        assigned.append(result)
+
+    return assigned
+
+
+def expire_stale_builds():
+    """
+    Marks builds that have exceeded the build timeout as failed, so that their
+    builder slots may be reused.
+
+    :return: Number of expired builds
+    """
+
+    from . import tasks
+
+    timeout = get_build_timeout()
+    stale = generator_models.BuildResult.objects.filter(
+        status=generator_models.BuildResult.BUILDING,
+        build_started__lt=timezone.now() - timeout,
+    ).values_list('pk', flat=True)
+
+    expired = 0
+    for result_uuid in list(stale):
+        with transaction.atomic():
+            # The build may have finished in the meantime.
+            try:
+                result = generator_models.BuildResult.objects.select_for_update().get(
+                    pk=result_uuid,
+                    status=generator_models.BuildResult.BUILDING,
+                )
+            except generator_models.BuildResult.DoesNotExist:
+                continue
+
+            tasks.fail_build(result, 'ERROR: Build has not finished within %d seconds.' % timeout.total_seconds())
+            expired += 1
+
+    return expired
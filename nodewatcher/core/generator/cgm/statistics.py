@@ -0,0 +1,21 @@
+from nodewatcher.core import models as core_models
+from nodewatcher.core.statistics import base as statistics_base
+from nodewatcher.core.statistics.pool import pool
+
+from . import models
+
+
+class DeviceStatistics(statistics_base.StatisticsDimension):
+    """
+    Number of nodes by device.
+    """
+
+    name = 'device'
+    tracked_models = (models.CgmGeneralConfig,)
+
+    def get_queryset(self):
+        return core_models.Node.objects.regpoint('config').registry_fields(
+            value='core.general__router'
+        )
+
+pool.register(DeviceStatistics)
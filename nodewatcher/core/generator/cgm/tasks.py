@@ -9,72 +9,121 @@ import unidecode
 from celery.task import task as celery_task
 
 from django.core.files import uploadedfile
-from django import db
 from django.db import transaction
+from django.utils import timezone
 
-from . import signals, base as cgm_base, exceptions
+from . import signals, base as cgm_base, exceptions, scheduler
 from .. import models as generator_models
 from .. import events as generator_events
 
 
-@celery_task(bind=True)
-@transaction.atomic
-def background_build(self, result_uuid):
+@celery_task()
+def schedule_builds(result_uuid):
     """
-    A task for deferred building of a firmware image.
+    A task for assigning pending builds to free builder slots. Builds are
+    scheduled on the builder pool of the specified build result.
+
+    :param result_uuid: Build result UUID identifying the builder pool
+    """
+
+    try:
+        result = generator_models.BuildResult.objects.select_related('builder').get(pk=result_uuid)
+    except generator_models.BuildResult.DoesNotExist:
+        return
+
+    for assigned in scheduler.schedule(result.builder):
+        background_build.delay(assigned.uuid)
+
+
+@celery_task()
+def background_build(result_uuid):
+    """
+    A task for deferred building of a firmware image. The build result must
+    have already been assigned to a builder by the scheduler.
 
     :param result_uuid: Destination build result UUID
     """
 
     result = generator_models.BuildResult.objects.get(pk=result_uuid)
-    if result.status != generator_models.BuildResult.PENDING:
+    if result.status != generator_models.BuildResult.BUILDING or result.build_finished is not None:
         return
 
-    # Try to lock the builder for building
     try:
-        list(generator_models.Builder.objects.select_for_update(nowait=True).filter(pk=result.builder.pk))
-    except db.DatabaseError:
-        # Retry the build task again in 15 seconds
-        raise self.retry(countdown=15)
+        build(result)
+    finally:
+        # A builder slot has been released, so the next pending build may be started.
+        schedule_builds.delay(result.uuid)
 
-    result.status = generator_models.BuildResult.BUILDING
-    result.save()
 
-    platform = cgm_base.get_platform(result.builder.platform)
+def lock_building(result):
+    """
+    Locks a build result until the end of the current transaction and checks
+    that it is still being built. Builds may be expired by the scheduler while
+    they are running, in which case their outcome must not be stored.
 
-    # Dispatch pre-build signal
-    signals.pre_firmware_build.send(sender=None, result=result)
+    :param result: Build result
+    :return: True if the build result is still being built
+    """
 
-    # Build the firmware and obtain firmware files
-    try:
-        files = platform.build(result)
-    except exceptions.BuildError, e:
-        if len(e.args) > 0:
-            error_message = 'ERROR: %s' % e.args[0]
+    return generator_models.BuildResult.objects.select_for_update().filter(
+        pk=result.pk,
+        status=generator_models.BuildResult.BUILDING,
+    ).exists()
+
+
+def fail_build(result, error_message=None):
+    """
+    Marks a build result as failed and dispatches failure signals and events.
+
+    :param result: Failed build result
+    :param error_message: Optional message to append to the build log
+    :return: False if the build result is no longer being built
+    """
+
+    with transaction.atomic():
+        if not lock_building(result):
+            return False
 
+        if error_message:
             if result.build_log:
                 result.build_log += '\n' + error_message
             else:
                 result.build_log = error_message
 
         result.status = generator_models.BuildResult.FAILED
+        result.build_finished = timezone.now()
         result.save()
 
-        # Dispatch error signal
-        signals.fail_firmware_build.send(sender=None, result=result)
-        # Dispatch the result failed event
-        generator_events.BuildResultFailed(result).post()
+    # Dispatch error signal
+    signals.fail_firmware_build.send(sender=None, result=result)
+    # Dispatch the result failed event
+    generator_events.BuildResultFailed(result).post()
+    return True
+
+
+def build(result):
+    """
+    Builds the firmware image for an assigned build result and stores the
+    resulting files.
+
+    :param result: Destination build result
+    """
+
+    platform = cgm_base.get_platform(result.builder.platform)
+
+    # Dispatch pre-build signal
+    signals.pre_firmware_build.send(sender=None, result=result)
+
+    # Build the firmware and obtain firmware files
+    try:
+        files = platform.build(result)
+    except exceptions.BuildError, e:
+        fail_build(result, 'ERROR: %s' % e.args[0] if len(e.args) > 0 else None)
         return
     except:
         result.build_log = 'An internal build error has occurred.\n\n'
         result.build_log += traceback.format_exc()
-        result.status = generator_models.BuildResult.FAILED
-        result.save()
-
-        # Dispatch error signal
-        signals.fail_firmware_build.send(sender=None, result=result)
-        # Dispatch the result failed event
-        generator_events.BuildResultFailed(result).post()
+        fail_build(result)
         return
 
     # By default, prepend node name and version before firmware filenames.
@@ -99,46 +148,54 @@ def background_build(self, result_uuid):
         'files': []
     }
 
-    for fw_name, fw_file in files:
-        r_file = generator_models.BuildResultFile(
+    with transaction.atomic():
+        if not lock_building(result):
+            # The build has been expired in the meantime, discard the generated files.
+            for fw_name, fw_file in files:
+                fw_file.close()
+            return
+
+        try:
+            for fw_name, fw_file in files:
+                # Firmware files are temporary files streamed from the builder, which already
+                # carry their checksums, so they are moved into storage without being read again.
+                fw_file.name = os.path.basename(fw_name)
+                r_file = generator_models.BuildResultFile(
+                    result=result,
+                    file=fw_file,
+                    checksum_md5=fw_file.checksum_md5,
+                    checksum_sha256=fw_file.checksum_sha256,
+                )
+
+                manifest_entry = r_file.to_manifest()
+                if manifest_entry is not None:
+                    manifest['files'].append(manifest_entry)
+
+                r_file.save()
+        finally:
+            for fw_name, fw_file in files:
+                fw_file.close()
+
+        # Store the manifest.
+        manifest = json.dumps(manifest)
+        generator_models.BuildResultFile(
             result=result,
             file=uploadedfile.InMemoryUploadedFile(
-                io.BytesIO(fw_file),
+                io.BytesIO(manifest),
                 None,
-                os.path.basename(fw_name),
-                'application/octet-stream',
-                len(fw_file),
+                'manifest.json',
+                'text/json',
+                len(manifest),
                 None
             ),
-            checksum_md5=hashlib.md5(fw_file).hexdigest(),
-            checksum_sha256=hashlib.sha256(fw_file).hexdigest(),
-        )
-
-        manifest_entry = r_file.to_manifest()
-        if manifest_entry is not None:
-            manifest['files'].append(manifest_entry)
-
-        r_file.save()
-
-    # Store the manifest.
-    manifest = json.dumps(manifest)
-    generator_models.BuildResultFile(
-        result=result,
-        file=uploadedfile.InMemoryUploadedFile(
-            io.BytesIO(manifest),
-            None,
-            'manifest.json',
-            'text/json',
-            len(manifest),
-            None
-        ),
-        checksum_md5=hashlib.md5(manifest).hexdigest(),
-        checksum_sha256=hashlib.sha256(manifest).hexdigest(),
-        hidden=True,
-    ).save()
-
-    result.status = generator_models.BuildResult.OK
-    result.save()
+            checksum_md5=hashlib.md5(manifest).hexdigest(),
+            checksum_sha256=hashlib.sha256(manifest).hexdigest(),
+            hidden=True,
+        ).save()
+
+        result.status = generator_models.BuildResult.OK
+        result.build_finished = timezone.now()
+        result.save()
 
     # Dispatch finalize signal
     signals.finalize_firmware_build.send(sender=None, result=result)
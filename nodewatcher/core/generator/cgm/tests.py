@@ -0,0 +1,136 @@
+import datetime
+import uuid
+
+from django import test
+from django.contrib.auth import models as auth_models
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+
+from . import scheduler, signals, tasks
+from .. import models as generator_models
+
+
+class SchedulerTestCase(test.TestCase):
+    def setUp(self):
+        self.users = [auth_models.User.objects.create_user(username='user%d' % i) for i in xrange(2)]
+        self.node = core_models.Node(uuid=str(uuid.UUID(int=0, version=1)))
+        self.node.save()
+
+        self.build_version = generator_models.BuildVersion(name='git.1234567')
+        self.build_version.save()
+        self.build_channel = generator_models.BuildChannel(name='stable', default=True)
+        self.build_channel.save()
+
+        self.builders = []
+        for i in xrange(2):
+            builder = generator_models.Builder(
+                platform='openwrt',
+                architecture='ar71xx',
+                version=self.build_version,
+                host='builder%d' % i,
+                private_key='key',
+                max_concurrent_builds=2,
+            )
+            builder.save()
+            self.build_channel.builders.add(builder)
+            self.builders.append(builder)
+
+        self.created = timezone.now() - datetime.timedelta(hours=1)
+
+    def create_result(self, user, status=generator_models.BuildResult.PENDING, **kwargs):
+        result = generator_models.BuildResult(
+            user=user,
+            node=self.node,
+            build_channel=self.build_channel,
+            builder=self.builders[0],
+            status=status,
+            **kwargs
+        )
+        result.save()
+
+        # Creation timestamps determine the order in which results are scheduled.
+        self.created += datetime.timedelta(seconds=1)
+        generator_models.BuildResult.objects.filter(pk=result.pk).update(created=self.created)
+        return result
+
+    def test_fairness(self):
+        first = [self.create_result(self.users[0]) for i in xrange(4)]
+        second = self.create_result(self.users[1])
+        self.builders[1].max_concurrent_builds = 0
+        self.builders[1].save()
+
+        # The second user must not wait for all builds of the first user.
+        assigned = scheduler.schedule(self.builders[0])
+        self.assertEqual([result.pk for result in assigned], [first[0].pk, second.pk])
+
+        # No builds are scheduled while the pool is busy.
+        self.assertEqual(scheduler.schedule(self.builders[0]), [])
+
+    def test_least_loaded_builder(self):
+        self.builders[1].max_concurrent_builds = 3
+        self.builders[1].save()
+
+        self.create_result(self.users[0], status=generator_models.BuildResult.BUILDING, build_started=timezone.now())
+        pending = [self.create_result(self.users[1]) for i in xrange(3)]
+
+        assigned = scheduler.schedule(self.builders[1])
+        self.assertEqual([result.pk for result in assigned], [result.pk for result in pending])
+        self.assertEqual([result.builder.pk for result in assigned], [
+            self.builders[1].pk,
+            self.builders[1].pk,
+            self.builders[0].pk,
+        ])
+        self.assertEqual(assigned[-1].builder_utilisation, 0.8)
+
+        for result in assigned:
+            result.refresh_from_db()
+            self.assertEqual(result.status, generator_models.BuildResult.BUILDING)
+            self.assertIsNotNone(result.build_started)
+
+    def test_build_channel(self):
+        self.build_channel.builders.remove(self.builders[0])
+        assigned = scheduler.schedule(self.builders[0])
+        self.assertEqual(assigned, [])
+
+        self.create_result(self.users[0])
+        assigned = scheduler.schedule(self.builders[0])
+        self.assertEqual([result.builder.pk for result in assigned], [self.builders[1].pk])
+
+    def test_expire_stale_builds(self):
+        failed = []
+
+        def fail_firmware_build(result, **kwargs):
+            failed.append(result.pk)
+
+        signals.fail_firmware_build.connect(fail_firmware_build)
+        self.addCleanup(signals.fail_firmware_build.disconnect, fail_firmware_build)
+
+        stale = self.create_result(
+            self.users[0],
+            status=generator_models.BuildResult.BUILDING,
+            build_started=timezone.now() - scheduler.get_build_timeout() - datetime.timedelta(minutes=1),
+        )
+        running = self.create_result(
+            self.users[0],
+            status=generator_models.BuildResult.BUILDING,
+            build_started=timezone.now(),
+        )
+
+        self.assertEqual(scheduler.expire_stale_builds(), 1)
+        self.assertEqual(failed, [stale.pk])
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, generator_models.BuildResult.FAILED)
+        self.assertIsNotNone(stale.build_finished)
+        self.assertIn('ERROR', stale.build_log)
+
+        running.refresh_from_db()
+        self.assertEqual(running.status, generator_models.BuildResult.BUILDING)
+
+        # Builds that finish after they have been expired must not change the result.
+        self.assertFalse(tasks.fail_build(stale, 'ERROR: Late failure.'))
+        self.assertEqual(failed, [stale.pk])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, generator_models.BuildResult.FAILED)
+        self.assertNotIn('Late failure', stale.build_log)
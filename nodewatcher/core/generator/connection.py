@@ -5,10 +5,14 @@ import paramiko
 import pipes
 import socket
 
+from django.core.files import uploadedfile
+
 from . import exceptions
 from .cgm import exceptions as cgm_exceptions
 
 BUILDER_PATH = '/builder/imagebuilder'
+# Size of chunks in which result files are transferred from the builder
+RESULT_CHUNK_SIZE = 32768
 
 
 class BuilderConnection(object):
@@ -25,6 +29,7 @@ class BuilderConnection(object):
 
         self.builder = builder
         self.tempdirs = []
+        self.build_path = BUILDER_PATH
 
     def __enter__(self):
         """
@@ -55,6 +60,17 @@ class BuilderConnection(object):
         except (paramiko.SSHException, paramiko.SFTPError, socket.error):
             raise exceptions.BuilderConnectionFailed
 
+        # When multiple builds may run concurrently on the same builder, each build
+        # gets its own copy of the image builder, so build directories do not clash.
+        if self.builder.max_concurrent_builds > 1:
+            try:
+                build_path = os.path.join(self.create_tempdir(), 'imagebuilder')
+                self.call('cp', '-a', '--reflink=auto', BUILDER_PATH, build_path)
+                self.build_path = build_path
+            except:
+                self.__exit__()
+                raise
+
         return self
 
     def __exit__(self, *args):
@@ -134,7 +150,7 @@ class BuilderConnection(object):
 
         try:
             cmd = [
-                'cd %s;' % BUILDER_PATH,
+                'cd %s;' % pipes.quote(self.build_path),
                 " ".join(args),
                 "2>&1",
             ]
@@ -156,14 +172,49 @@ class BuilderConnection(object):
         :param path: Path relative to the builder directory
         """
 
-        return self.sftp.listdir(os.path.join(BUILDER_PATH, path))
+        return self.sftp.listdir(os.path.join(self.build_path, path))
 
     def read_result_file(self, path):
         """
-        Reads a result file.
+        Reads a result file. The file is streamed from the builder into a local
+        temporary file and its checksums are computed in the same pass, so the
+        whole file is never held in memory.
 
         :param path: Path relative to the builder directory
+        :return: A temporary uploaded file with additional ``checksum_md5`` and
+            ``checksum_sha256`` attributes
         """
 
-        with self.sftp.open(os.path.join(BUILDER_PATH, path), 'r') as fobj:
-            return fobj.read()
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        size = 0
+
+        result_file = uploadedfile.TemporaryUploadedFile(
+            os.path.basename(path),
+            'application/octet-stream',
+            0,
+            None
+        )
+
+        try:
+            with self.sftp.open(os.path.join(self.build_path, path), 'r') as fobj:
+                while True:
+                    chunk = fobj.read(RESULT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+
+                    md5.update(chunk)
+                    sha256.update(chunk)
+                    result_file.write(chunk)
+                    size += len(chunk)
+
+            result_file.flush()
+            result_file.seek(0)
+        except:
+            result_file.close()
+            raise
+
+        result_file.size = size
+        result_file.checksum_md5 = md5.hexdigest()
+        result_file.checksum_sha256 = sha256.hexdigest()
+        return result_file
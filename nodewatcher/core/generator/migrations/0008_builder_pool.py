@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0007_json_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='builder',
+            name='max_concurrent_builds',
+            field=models.PositiveIntegerField(default=1, help_text='Maximum number of builds that may run on this builder at the same time.'),
+        ),
+        migrations.AddField(
+            model_name='buildresult',
+            name='build_finished',
+            field=models.DateTimeField(editable=False, help_text='Timestamp when build has finished.', null=True),
+        ),
+        migrations.AddField(
+            model_name='buildresult',
+            name='build_started',
+            field=models.DateTimeField(editable=False, help_text='Timestamp when build was assigned to a builder.', null=True),
+        ),
+        migrations.AddField(
+            model_name='buildresult',
+            name='builder_utilisation',
+            field=models.FloatField(editable=False, help_text='Fraction of builder pool capacity in use when the build was started.', null=True),
+        ),
+    ]
@@ -129,6 +129,10 @@ class Builder(models.Model):
     private_key = models.TextField(
         help_text=_('Private key for SSH authentication.'),
     )
+    max_concurrent_builds = models.PositiveIntegerField(
+        default=1,
+        help_text=_('Maximum number of builds that may run on this builder at the same time.'),
+    )
 
     def _get_metadata(self):
         """
@@ -204,6 +208,18 @@ class Builder(models.Model):
 
         return True
 
+    def get_pool(self):
+        """
+        Returns a queryset of all builders that may be used interchangeably with
+        this builder, as they share the same platform, architecture and version.
+        """
+
+        return Builder.objects.filter(
+            platform=self.platform,
+            architecture=self.architecture,
+            version=self.version_id,
+        )
+
     def connect(self):
         """
         Establishes a connection with the builder via SSH and returns the
@@ -274,6 +290,11 @@ class BuildResult(models.Model):
         Builder,
         help_text=_('Firmware builder host used.'),
     )
+    builder_utilisation = models.FloatField(
+        null=True,
+        editable=False,
+        help_text=_('Fraction of builder pool capacity in use when the build was started.'),
+    )
     build_log = models.TextField(
         blank=True,
         null=True,
@@ -287,6 +308,16 @@ class BuildResult(models.Model):
         auto_now=True,
         help_text=_('Timestamp when build result was last modified.'),
     )
+    build_started = models.DateTimeField(
+        null=True,
+        editable=False,
+        help_text=_('Timestamp when build was assigned to a builder.'),
+    )
+    build_finished = models.DateTimeField(
+        null=True,
+        editable=False,
+        help_text=_('Timestamp when build has finished.'),
+    )
     status = models.CharField(
         max_length=15,
         choices=STATUS_CHOICES,
@@ -294,6 +325,17 @@ class BuildResult(models.Model):
         help_text=_('Build status.')
     )
 
+    @property
+    def queue_wait_time(self):
+        """
+        Time the build spent waiting in the queue for a free builder.
+        """
+
+        if self.build_started is None:
+            return None
+
+        return self.build_started - self.created
+
     def __repr__(self):
         return '<BuildResult for node \'%s\'>' % self.node_id
 
@@ -5,12 +5,17 @@ from django.utils import timezone
 from nodewatcher import celery
 
 from . import models
+from .cgm import scheduler, tasks as cgm_tasks
 
 # Register the periodic schedule.
 celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.core.generator.tasks.cleanup'] = {
     'task': 'nodewatcher.core.generator.tasks.cleanup',
     'schedule': datetime.timedelta(minutes=30),
 }
+celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.core.generator.tasks.schedule_pending'] = {
+    'task': 'nodewatcher.core.generator.tasks.schedule_pending',
+    'schedule': datetime.timedelta(minutes=1),
+}
 
 
 @celery.app.task(queue='monitor', bind=True)
@@ -22,3 +27,29 @@ def cleanup(self):
     models.BuildResult.objects.filter(
         last_modified__lt=timezone.now() - datetime.timedelta(days=30)
     ).delete()
+
+
+@celery.app.task(queue='generator', bind=True)
+def schedule_pending(self):
+    """
+    Releases builder slots held by stale builds and schedules pending builds
+    on all builder pools, in case some scheduling requests have been lost.
+    """
+
+    scheduler.expire_stale_builds()
+
+    # Schedule one pending result for each builder pool.
+    pools = models.BuildResult.objects.filter(
+        status=models.BuildResult.PENDING,
+    ).order_by(
+        'builder__platform',
+        'builder__architecture',
+        'builder__version',
+    ).distinct(
+        'builder__platform',
+        'builder__architecture',
+        'builder__version',
+    ).values_list('pk', flat=True)
+
+    for result_uuid in pools:
+        cgm_tasks.schedule_builds.delay(result_uuid)
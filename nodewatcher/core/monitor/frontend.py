@@ -9,6 +9,7 @@ api_urls.v2_api.register('link', views.TopologyLinkViewSet)
 components.partials.get_partial('node_general_partial').add(components.PartialEntry(
     name='last_seen',
     template='nodes/last_seen.html',
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {
         'node_last_seen': context['node'].monitoring.core.general(default=models.GeneralMonitor).last_seen
     },
@@ -0,0 +1,247 @@
+import contextlib
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends import utils as backend_utils
+
+# Logger instance
+logger = logging.getLogger('monitor.instrumentation')
+
+# Number of slowest nodes kept for each processor.
+OUTLIER_COUNT = 5
+
+
+class CountingCursorWrapper(backend_utils.CursorWrapper):
+    """
+    Cursor wrapper which counts executed queries and affected or returned rows.
+    """
+
+    def __init__(self, cursor, db, counter):
+        super(CountingCursorWrapper, self).__init__(cursor, db)
+        self.counter = counter
+
+    def _count(self, queries):
+        self.counter['queries'] += queries
+        if self.cursor.rowcount is not None and self.cursor.rowcount > 0:
+            self.counter['rows'] += self.cursor.rowcount
+
+    def execute(self, sql, params=None):
+        try:
+            return super(CountingCursorWrapper, self).execute(sql, params)
+        finally:
+            self._count(1)
+
+    def executemany(self, sql, param_list):
+        try:
+            return super(CountingCursorWrapper, self).executemany(sql, param_list)
+        finally:
+            self._count(1)
+
+
+@contextlib.contextmanager
+def count_queries():
+    """
+    Context manager which counts database queries and rows made using the
+    default connection. Yields a dictionary with 'queries' and 'rows' keys.
+    """
+
+    counter = {'queries': 0, 'rows': 0}
+    previous_force_debug_cursor = connection.force_debug_cursor
+    connection.force_debug_cursor = True
+    connection.make_debug_cursor = lambda cursor: CountingCursorWrapper(cursor, connection, counter)
+    try:
+        yield counter
+    finally:
+        del connection.make_debug_cursor
+        connection.force_debug_cursor = previous_force_debug_cursor
+
+
+@contextlib.contextmanager
+def measure(statistics, processor, node=None):
+    """
+    Context manager which measures a processor invocation when statistics
+    are being collected.
+
+    :param statistics: ProcessorStatistics instance or None
+    :param processor: Processor class name
+    :param node: Optional primary key of the processed node
+    """
+
+    if statistics is None:
+        yield
+    else:
+        with statistics.measure(processor, node):
+            yield
+
+
+class ProcessorStatistics(object):
+    """
+    Timing and query statistics of processors. Statistics may be collected in
+    pool workers and merged in the run process.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.processors = {}
+
+    def _get(self, processor):
+        return self.processors.setdefault(processor, {
+            'calls': 0,
+            'time': 0.0,
+            'queries': 0,
+            'rows': 0,
+            'outliers': [],
+        })
+
+    @contextlib.contextmanager
+    def measure(self, processor, node=None):
+        """
+        Context manager which measures a processor invocation.
+
+        :param processor: Processor class name
+        :param node: Optional primary key of the processed node
+        """
+
+        start = time.time()
+        with count_queries() as counter:
+            try:
+                yield
+            finally:
+                self.record(processor, time.time() - start, counter['queries'], counter['rows'], node)
+
+    def record(self, processor, duration, queries=0, rows=0, node=None):
+        """
+        Records a processor invocation.
+
+        :param processor: Processor class name
+        :param duration: Wall time in seconds
+        :param queries: Number of executed queries
+        :param rows: Number of rows returned or affected by the queries
+        :param node: Optional primary key of the processed node
+        """
+
+        entry = self._get(processor)
+        entry['calls'] += 1
+        entry['time'] += duration
+        entry['queries'] += queries
+        entry['rows'] += rows
+
+        if node is not None:
+            self._add_outliers(entry, [(duration, node)])
+
+    def _add_outliers(self, entry, outliers):
+        entry['outliers'] = heapq.nlargest(OUTLIER_COUNT, entry['outliers'] + [tuple(outlier) for outlier in outliers])
+
+    def merge(self, other):
+        """
+        Merges statistics collected elsewhere into these statistics.
+
+        :param other: A ProcessorStatistics instance
+        """
+
+        for processor, other_entry in other.processors.items():
+            entry = self._get(processor)
+            for key in ('calls', 'time', 'queries', 'rows'):
+                entry[key] += other_entry[key]
+            self._add_outliers(entry, other_entry['outliers'])
+
+    def get_report(self):
+        """
+        Returns a JSON-serializable report.
+        """
+
+        report = []
+        for processor, entry in sorted(self.processors.items(), key=lambda item: -item[1]['time']):
+            report.append({
+                'processor': processor,
+                'calls': entry['calls'],
+                'time': entry['time'],
+                'queries': entry['queries'],
+                'rows': entry['rows'],
+                'outliers': [{'node': node, 'time': duration} for duration, node in entry['outliers']],
+            })
+
+        return report
+
+
+class ReportStore(object):
+    """
+    Stores reports of the latest monitoring cycles in a local directory, with
+    one file per run.
+    """
+
+    def __init__(self, path=None, history=None):
+        """
+        Class constructor.
+
+        :param path: Optional directory where reports are stored
+        :param history: Optional number of cycles kept for each run
+        """
+
+        self.path = path or getattr(settings, 'MONITOR_REPORT_PATH', None) or \
+            os.path.join(tempfile.gettempdir(), 'nodewatcher-monitor-reports')
+        self.history = history or getattr(settings, 'MONITOR_REPORT_HISTORY', 10)
+        self._lock = threading.Lock()
+
+    def _filename(self, run):
+        return os.path.join(self.path, '%s.json' % run)
+
+    def get_reports(self, run):
+        """
+        Returns stored reports of a run, the latest one last.
+
+        :param run: Run name
+        """
+
+        try:
+            with open(self._filename(run), 'r') as report_file:
+                return json.load(report_file)
+        except (IOError, ValueError):
+            return []
+
+    def get_runs(self):
+        """
+        Returns names of runs with stored reports.
+        """
+
+        try:
+            return sorted([filename[:-5] for filename in os.listdir(self.path) if filename.endswith('.json')])
+        except OSError:
+            return []
+
+    def store(self, run, report):
+        """
+        Stores a cycle report of a run.
+
+        :param run: Run name
+        :param report: Report dictionary
+        """
+
+        with self._lock:
+            reports = self.get_reports(run)
+            reports.append(report)
+            reports = reports[-self.history:]
+
+            try:
+                if not os.path.isdir(self.path):
+                    os.makedirs(self.path)
+
+                # Write atomically so that readers never see partial reports.
+                handle, filename = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+                with os.fdopen(handle, 'w') as report_file:
+                    json.dump(reports, report_file)
+                os.rename(filename, self._filename(run))
+            except (IOError, OSError):
+                logger.warning("Unable to store monitoring report for run '%s'." % run)
+
+report_store = ReportStore()
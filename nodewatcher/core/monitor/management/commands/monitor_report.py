@@ -0,0 +1,54 @@
+import json
+
+from django.core.management import base
+
+from ... import instrumentation
+
+
+class Command(base.BaseCommand):
+    help = "Shows per-processor timing and query statistics of recent monitoring cycles."
+    requires_system_checks = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', type=str, help="Only show reports of a specific run")
+        parser.add_argument('--cycles', type=int, default=1, help="Number of latest cycles to show")
+        parser.add_argument('--json', action='store_true', help="Output reports as JSON")
+
+    def handle(self, *args, **options):
+        store = instrumentation.report_store
+        runs = [options['run']] if options['run'] else store.get_runs()
+
+        reports = []
+        for run in runs:
+            reports.extend(store.get_reports(run)[-options['cycles']:])
+
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        if not reports:
+            raise base.CommandError("No monitoring reports are available in '%s'." % store.path)
+
+        for report in reports:
+            self.stdout.write("Run '%s' started at %s took %.2f s (%d%% of %d s interval, %d workers)." % (
+                report['run'],
+                report['started'],
+                report['time'],
+                int(100 * report['time'] / report['interval']),
+                report['interval'],
+                report['workers'],
+            ))
+            self.stdout.write("  %-50s %8s %10s %10s %10s" % ("Processor", "Calls", "Time (s)", "Queries", "Rows"))
+            for entry in report['processors']:
+                self.stdout.write("  %-50s %8d %10.2f %10d %10d" % (
+                    entry['processor'],
+                    entry['calls'],
+                    entry['time'],
+                    entry['queries'],
+                    entry['rows'],
+                ))
+
+                for outlier in entry['outliers']:
+                    self.stdout.write("    slowest node %s: %.2f s" % (outlier['node'], outlier['time']))
+
+            self.stdout.write("")
@@ -1,3 +1,4 @@
+import copy
 import logging
 import traceback
 
@@ -11,8 +12,16 @@ from . import models
 class ProcessorContext(dict):
     """
     A simple dictionary wrapper to support attribute access.
+
+    A context may also be an overlay on top of a base context (see `overlay`),
+    in which case it initially shares values with the base context and copies
+    them only when they are first accessed, so the base context is never
+    modified.
     """
 
+    # Keys with values which are still shared with the base context of an overlay.
+    _shared = None
+
     def __init__(self, mapping=None):
         """
         Create a new processor context.
@@ -27,11 +36,65 @@ class ProcessorContext(dict):
             # Perform recursive merge.
             self.merge_with(mapping)
 
+    def overlay(self):
+        """
+        Returns a new context, which contains the same values as this context,
+        but may be modified without affecting it. This is much cheaper than a
+        deep copy when only a small part of the context is accessed, but this
+        context must not be modified while the overlay is in use.
+
+        All keys are present in the overlay, so code which bypasses overridden
+        methods (for example `dict(context)` or `json.dumps(context)`) sees all
+        values. Values obtained in this way are shared with this context and
+        must not be modified.
+        """
+
+        # Avoid sharing values with other contexts through this one.
+        self._materialize()
+
+        context = self.__class__()
+        dict.update(context, self)
+        if context:
+            context._shared = set(dict.keys(context))
+        return context
+
+    def _copy_shared(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, ProcessorContext):
+            value = value.overlay()
+        else:
+            value = copy.deepcopy(value)
+
+        dict.__setitem__(self, key, value)
+        self._shared.discard(key)
+        return value
+
+    def _materialize(self):
+        """
+        Copies all values which are still shared with the base context, so that
+        this context no longer depends on it.
+        """
+
+        if not self._shared:
+            return
+
+        for key in list(self._shared):
+            self._copy_shared(key)
+
+        self._shared = None
+
+    def _unshare(self, key):
+        if self._shared:
+            self._shared.discard(key)
+
     def __getitem__(self, key):
         """
         Get that automatically creates ProcessorContexts when key doesn't exist.
         """
 
+        if self._shared and key in self._shared:
+            return self._copy_shared(key)
+
         try:
             return super(ProcessorContext, self).__getitem__(key)
         except KeyError:
@@ -40,6 +103,70 @@ class ProcessorContext(dict):
 
             return super(ProcessorContext, self).setdefault(key, ProcessorContext())
 
+    def __setitem__(self, key, value):
+        self._unshare(key)
+        return super(ProcessorContext, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._unshare(key)
+        return super(ProcessorContext, self).__delitem__(key)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        return default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        return super(ProcessorContext, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).iteritems():
+            self[key] = value
+
+    # Operations which return values first copy all values shared with the base context.
+
+    def __reduce_ex__(self, protocol):
+        self._materialize()
+        return super(ProcessorContext, self).__reduce_ex__(protocol)
+
+    def clear(self):
+        self._shared = None
+        return super(ProcessorContext, self).clear()
+
+    def copy(self):
+        self._materialize()
+        return super(ProcessorContext, self).copy()
+
+    def values(self):
+        self._materialize()
+        return super(ProcessorContext, self).values()
+
+    def items(self):
+        self._materialize()
+        return super(ProcessorContext, self).items()
+
+    def itervalues(self):
+        self._materialize()
+        return super(ProcessorContext, self).itervalues()
+
+    def iteritems(self):
+        self._materialize()
+        return super(ProcessorContext, self).iteritems()
+
+    def pop(self, key, *args):
+        if self._shared and key in self._shared:
+            self._copy_shared(key)
+
+        return super(ProcessorContext, self).pop(key, *args)
+
+    def popitem(self):
+        self._materialize()
+        return super(ProcessorContext, self).popitem()
+
     def __getattr__(self, name):
         """
         Attribute access.
@@ -111,6 +238,18 @@ class MonitoringProcessor(object):
 
         self.logger = logging.getLogger('monitor.processor.%s' % self.__class__.__name__)
 
+    @classmethod
+    def initialize_run(cls, run):
+        """
+        Called once in the main process of a scheduled monitoring run, before any
+        cycles are started. Cycles run in processes forked from the main process,
+        so this may be used to set up long-lived resources they inherit.
+
+        :param run: Monitoring run instance
+        """
+
+        pass
+
     def report_exception(self, msg="Processor has failed with exception:"):
         """
         Reports an exception via the built-in logger.
@@ -0,0 +1,4 @@
+from django import dispatch
+
+# Sent by the monitoring daemon after each completed monitoring cycle.
+cycle_finished = dispatch.Signal(providing_args=['run', 'report'])
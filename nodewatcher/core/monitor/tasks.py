@@ -4,17 +4,20 @@ from celery.task import task as celery_task
 
 from . import processors as monitor_processors, worker as monitor_worker
 from .config import config as monitor_config
+from .. import models as core_models
 
 
 @celery_task(bind=True)
-def run_pipeline(self, run_id, base_context=None):
+def run_pipeline(self, run_id, base_context=None, max_nodes=1):
     """
     Runs an on-demand monitoring run pipeline. Compared to a scheduled run, this
     is a much more simplified version as it is designed to be used to process
-    push updates for a single node.
+    push updates for a single node or a small batch of nodes.
 
     :param run_id: Monitoring run identifier
     :param base_context: Optional base context dictionary
+    :param max_nodes: Maximum number of nodes processed by each group of node
+        processors
     """
 
     run_info = monitor_config.get_run(run_id)
@@ -39,23 +42,25 @@ def run_pipeline(self, run_id, base_context=None):
             else:
                 context, nodes = lead_proc().process(context, nodes)
         elif issubclass(lead_proc, monitor_processors.NodeProcessor):
-            # Node processor also behaves differently, as we only process a single node. This is
-            # to prevent runs from consuming too many resources as on-demand runs are meant for
-            # push updates from a single node.
-            if nodes:
-                node = nodes.pop()
-
+            # Node processor also behaves differently, as we only process a limited number of
+            # nodes. This is to prevent runs from consuming too many resources as on-demand runs
+            # are meant for push updates from a single node or a small batch of nodes.
+            batch = [nodes.pop() for _ in xrange(min(max_nodes, len(nodes)))]
+            if batch:
                 # Store the per-node context, so we can limit its scope only to specific nodes in
                 # order to avoid excessive context copying.
                 node_local_context = context.for_node
                 del context['for_node']
 
-                monitor_worker.stage_worker((
-                    context,
-                    node_local_context.get(node.pk, monitor_processors.ProcessorContext()),
-                    node.pk,
-                    processor_list
-                ))
+                # Fetch all nodes of the batch using a single query.
+                batch = core_models.Node.objects.in_bulk([node.pk for node in batch])
+                for node in batch.values():
+                    monitor_worker.process_node(
+                        context,
+                        node_local_context.get(node.pk, monitor_processors.ProcessorContext()),
+                        node,
+                        processor_list
+                    )
 
                 # Restore per-node context for further network processors.
                 context.for_node = node_local_context
@@ -0,0 +1,66 @@
+import json
+import pickle
+import unittest
+
+from . import processors
+
+
+class ProcessorContextTestCase(unittest.TestCase):
+    def test_overlay(self):
+        base = processors.ProcessorContext({
+            'topology': {'links': [1, 2], 'graph': {'nodes': 1}},
+            'interval': 300,
+        })
+
+        context = base.overlay()
+        context.merge_with({'push': {'source': 'node'}, 'topology': {'local': True}})
+        context.topology.links.append(3)
+        context.topology.graph.nodes = 2
+        context.http.successfully_parsed = True
+        del context['interval']
+
+        # The base context is not modified.
+        self.assertEqual(base.topology.links, [1, 2])
+        self.assertEqual(base.topology.graph.nodes, 1)
+        self.assertNotIn('local', base.topology)
+        self.assertNotIn('push', base)
+        self.assertNotIn('http', base)
+        self.assertEqual(base.interval, 300)
+
+        self.assertEqual(context.topology.links, [1, 2, 3])
+        self.assertEqual(context.topology.graph.nodes, 2)
+        self.assertNotIn('interval', context)
+        self.assertEqual(sorted(context.keys()), ['http', 'push', 'topology'])
+
+    def test_overlay_pickle(self):
+        base = processors.ProcessorContext({'topology': {'links': [1, 2]}})
+        context = pickle.loads(pickle.dumps(base.overlay(), pickle.HIGHEST_PROTOCOL))
+
+        self.assertEqual(context, base)
+        self.assertIsNone(context._shared)
+
+    def test_overlay_as_dict(self):
+        base = processors.ProcessorContext({
+            'topology': {'links': [1, 2]},
+            'interval': 300,
+        })
+        context = base.overlay()
+        context.push = {'source': 'node'}
+        context.topology.links.append(3)
+
+        # Operations bypassing overridden methods must see all values.
+        expected = {'topology': {'links': [1, 2, 3]}, 'interval': 300, 'push': {'source': 'node'}}
+        self.assertEqual(json.loads(json.dumps(context)), expected)
+        self.assertEqual(dict(context), expected)
+        updated = {}
+        updated.update(context)
+        self.assertEqual(updated, expected)
+        self.assertEqual((lambda **kwargs: kwargs)(**context), expected)
+        self.assertEqual(base.topology.links, [1, 2])
+
+        # Values set on an overlay are returned as they are.
+        links = [4]
+        context.update({'interval': 60, 'links': links})
+        self.assertIs(context.links, links)
+        self.assertEqual(context.interval, 60)
+        self.assertEqual(base.interval, 300)
@@ -1,13 +1,14 @@
-import copy
+import datetime
 import logging
 import multiprocessing
 import time
 import traceback
 
 from django import db
+from django.conf import settings
 from django.db import connection, transaction
 
-from . import processors as monitor_processors, exceptions
+from . import processors as monitor_processors, exceptions, instrumentation, signals
 from .config import config as monitor_config
 from .. import models as core_models
 
@@ -18,18 +19,42 @@ logger = logging.getLogger('monitor.worker')
 def stage_worker(args):
     """
     Runs a list of (node) processors on a given node.
+
+    :return: Processor statistics or None if instrumentation is disabled
     """
 
     context, node_context, node_pk, processors = args
-    context = copy.deepcopy(context)
-    context.merge_with(node_context)
+    statistics = instrumentation.ProcessorStatistics() if is_instrumented() else None
     node = core_models.Node.objects.get(pk=node_pk)
+    process_node(context, node_context, node, processors, statistics)
+    return statistics
+
+
+def is_instrumented():
+    return getattr(settings, 'MONITOR_INSTRUMENTATION', True)
+
+
+def process_node(context, node_context, node, processors, statistics=None):
+    """
+    Runs a list of (node) processors on a given node instance.
+
+    :param context: Network-level context, which is not modified
+    :param node_context: Per-node context merged into the copied context
+    :param node: Node instance
+    :param processors: A list of node processor classes
+    :param statistics: Optional processor statistics to record timings into
+    """
+
+    # Node processors only modify an overlay, so the network-level context can be shared
+    # between nodes without copying it.
+    context = context.overlay()
+    context.merge_with(node_context)
     cleanup_queue = []
     try:
         for p in processors:
             try:
                 abort_requested = False
-                with transaction.atomic():
+                with instrumentation.measure(statistics, p.__name__, node.pk), transaction.atomic():
                     processor = p()
                     try:
                         context = processor.process(context, node)
@@ -106,18 +131,28 @@ class MonitorRun(object):
 
         logger.info("Ready with %d workers for run '%s'." % (self.config['workers'], self.name))
 
-    def cycle(self):
+    def cycle(self, base_context=None):
         """
         Performs a single monitoring cycle.
+
+        :param base_context: Optional base context dictionary
+        :return: Cycle report or None if instrumentation is disabled
         """
 
         logger.info("Preparing the worker pool for run '%s'..." % self.name)
         self.prepare_workers()
 
+        cycle_start = time.time()
+        started = datetime.datetime.utcnow()
+        statistics = instrumentation.ProcessorStatistics() if is_instrumented() else None
+
         try:
             nodes = set()
             context = monitor_processors.ProcessorContext()
 
+            if base_context is not None:
+                context.merge_with(base_context)
+
             for processor_list in self.config['processors']:
                 lead_proc = processor_list[0]
                 if issubclass(lead_proc, monitor_processors.NetworkProcessor):
@@ -125,11 +160,12 @@ class MonitorRun(object):
                     logger.info("Running network processor %s..." % lead_proc.__name__)
 
                     try:
-                        if lead_proc.requires_transaction:
-                            with transaction.atomic():
+                        with instrumentation.measure(statistics, lead_proc.__name__):
+                            if lead_proc.requires_transaction:
+                                with transaction.atomic():
+                                    context, nodes = lead_proc(worker_pool=self.workers).process(context, nodes)
+                            else:
                                 context, nodes = lead_proc(worker_pool=self.workers).process(context, nodes)
-                        else:
-                            context, nodes = lead_proc(worker_pool=self.workers).process(context, nodes)
                     except KeyboardInterrupt:
                         raise
                     except:
@@ -154,11 +190,24 @@ class MonitorRun(object):
                             processor_list,
                         )
 
+                    stage_start = time.time()
                     if self.config['process_only_node'] is not None:
                         logger.info("Limiting only to the following node: %s" % self.config['process_only_node'])
-                        self.workers.map_async(stage_worker, (node_arguments(node) for node in nodes if node.pk == self.config['process_only_node'])).get(0xFFFF)
+                        results = self.workers.map_async(stage_worker, (node_arguments(node) for node in nodes if node.pk == self.config['process_only_node'])).get(0xFFFF)
                     else:
-                        self.workers.map_async(stage_worker, (node_arguments(node) for node in nodes)).get(0xFFFF)
+                        results = self.workers.map_async(stage_worker, (node_arguments(node) for node in nodes)).get(0xFFFF)
+
+                    if statistics is not None:
+                        # Merge statistics collected by pool workers. Stage wall time is recorded
+                        # separately as processor times are summed over all workers.
+                        for node_statistics in results:
+                            if node_statistics is not None:
+                                statistics.merge(node_statistics)
+
+                        statistics.record(
+                            '+'.join([p.__name__ for p in processor_list]),
+                            time.time() - stage_start,
+                        )
 
                     # Restore per-node context for further network processors.
                     context.for_node = node_local_context
@@ -173,9 +222,51 @@ class MonitorRun(object):
                 logger.info("Stopping worker processes...")
                 self.workers.terminate()
 
+        report = None
+        if statistics is not None:
+            report = self.report(started, time.time() - cycle_start, statistics)
+
         logger.info("All done.")
+        return report
+
+    def report(self, started, duration, statistics):
+        """
+        Stores the report of a completed monitoring cycle.
+
+        :param started: Cycle start time (UTC)
+        :param duration: Cycle wall time in seconds
+        :param statistics: Processor statistics
+        :return: Report dictionary
+        """
+
+        report = {
+            'run': self.name,
+            'started': started.isoformat(),
+            'time': duration,
+            'interval': self.config['interval'],
+            'workers': self.config['workers'],
+            'processors': statistics.get_report(),
+        }
+
+        if self.config.get('store_reports', True):
+            instrumentation.report_store.store(self.name, report)
+
+        try:
+            signals.cycle_finished.send(sender=self.__class__, run=self, report=report)
+        except KeyboardInterrupt:
+            raise
+        except:
+            logger.warning("Failed to process monitoring report:")
+            logger.warning(traceback.format_exc())
+
+        return report
 
     def start(self):
+        # Allow processors to set up any long-lived resources for this run.
+        for processor_list in self.config['processors']:
+            for processor in processor_list:
+                processor.initialize_run(self)
+
         logger.info("Run '%s' entering monitoring cycle..." % self.name)
         try:
             cycle = 0
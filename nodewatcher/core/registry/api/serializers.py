@@ -66,10 +66,23 @@ class RegistryRootSerializerMixin(object):
 
         return fields
 
-    def to_representation(self, instance):
-        data = super(RegistryRootSerializerMixin, self).to_representation(instance)
+    def get_registry_plan(self, model):
+        """
+        Returns a list describing how virtual registry fields of the given model
+        are serialized. The plan is computed once per serializer instance, so
+        it is shared between all rows when serializing a list.
+
+        :param model: Root model class (possibly a registry proxy model)
+        """
 
-        for field in instance._meta.virtual_fields:
+        plans = self.__dict__.setdefault('_registry_plans', {})
+        try:
+            return plans[model]
+        except KeyError:
+            pass
+
+        plan = []
+        for field in model._meta.virtual_fields:
             if not hasattr(field, 'src_model'):
                 continue
 
@@ -77,21 +90,67 @@ class RegistryRootSerializerMixin(object):
             if field.name.startswith('_order_field_'):
                 continue
 
+            meta = field.src_model._registry
+            atoms = None
+            sensitive = False
+            if field.src_field:
+                atoms = field.src_field.split(constants.LOOKUP_SEP)
+                # Sensitive fields are not serialized, but their namespace is still emitted.
+                sensitive = atoms[0] in meta.sensitive_fields
+
+            plan.append((field, meta, atoms, sensitive))
+
+        plans[model] = plan
+        return plan
+
+    def get_registry_serializer(self, model, registry_item=False):
+        """
+        Returns a cached serializer instance for the given model class.
+
+        :param model: Model class
+        :param registry_item: True if the model is a registry item, in which case
+            its registry serializer is used
+        """
+
+        cache = self.__dict__.setdefault('_registry_serializers', {})
+        try:
+            return cache[(model, registry_item)]
+        except KeyError:
+            pass
+
+        if registry_item:
+            serializer = model._registry.serializer_class
+        else:
+            try:
+                serializer = api_serializers.pool.get_serializer(model)
+            except api_exceptions.SerializerNotRegistered:
+                # Don't know how to serialize the model, construct a default serializer.
+                class meta_cls:
+                    pass
+                meta_cls.model = model
+
+                serializer = type('DefaultModelSerializer', (serializers.ModelSerializer,), {'Meta': meta_cls})
+
+        cache[(model, registry_item)] = serializer = serializer()
+        return serializer
+
+    def to_representation(self, instance):
+        data = super(RegistryRootSerializerMixin, self).to_representation(instance)
+
+        for field, meta, atoms, sensitive in self.get_registry_plan(instance.__class__):
             def serialize_instance(item):
                 if hasattr(field, '_registry_annotations'):
                     for target_attribute, source_attribute in field._registry_annotations.items():
                         setattr(item, target_attribute, getattr(instance, source_attribute))
 
-                return item._registry.serializer_class(item).data
+                return self.get_registry_serializer(item.__class__, registry_item=True).to_representation(item)
 
-            meta = field.src_model._registry
-            value = getattr(instance, field.name)
             namespace = data.setdefault(meta.registration_point.namespace, {})
-            if field.src_field:
-                atoms = field.src_field.split(constants.LOOKUP_SEP)
-                if atoms[0] in meta.sensitive_fields:
-                    continue
+            if sensitive:
+                continue
 
+            value = getattr(instance, field.name)
+            if atoms is not None:
                 if isinstance(value, models.Manager):
                     base_container = namespace.setdefault(meta.registry_id, [])
                     for index, item in enumerate(value.all()):
@@ -109,16 +168,7 @@ class RegistryRootSerializerMixin(object):
                     container = reduce(lambda a, b: a.setdefault(b, {}), atoms[:-1], base_container)
 
                     if isinstance(value, models.Model):
-                        try:
-                            serializer = api_serializers.pool.get_serializer(value.__class__)
-                        except api_exceptions.SerializerNotRegistered:
-                            # Don't know how to serialize the model, construct a default serializer.
-                            class meta_cls:
-                                model = value.__class__
-
-                            serializer = type('DefaultModelSerializer', (serializers.ModelSerializer,), {'Meta': meta_cls})
-
-                        value = serializer(value).data
+                        value = self.get_registry_serializer(value.__class__).to_representation(value)
 
                     container[atoms[-1]] = value
                     annotate_instance(meta, base_container)
@@ -1,23 +1,269 @@
+import calendar
+import collections
+import hashlib
+
+from django import apps, http
+from django.conf import settings
+from django.core import cache as django_cache
 from django.db import models as django_models
 from django.db.models import constants
 from django.contrib.auth import models as auth_models
+from django.contrib.contenttypes import models as contenttypes_models
 from django.contrib.gis.db import models as geo_models
 # This must be imported in this manner as otherwise an incorrect module will be
 # imported due to gis.db.models.__init__ importing * from django.db.models.
 import django.contrib.gis.db.models.functions as geo_functions
 from django.core import exceptions as django_exceptions
+from django.utils import cache as cache_utils, http as http_utils
+
+from rest_framework import pagination, response as drf_response
 
 from guardian import shortcuts
 
-from .. import expression, exceptions, lookup
+from .. import expression, exceptions, lookup, models, versions
 
 # Exports.
 __all__ = [
     'RegistryRootViewSetMixin'
 ]
 
+# Models by database table, determined on first use.
+_table_models = None
+
+
+def get_table_models():
+    global _table_models
+
+    if _table_models is None:
+        _table_models = {}
+        for model in apps.apps.get_models():
+            _table_models.setdefault(model._meta.db_table, model)
+
+    return _table_models
+
+
+def get_querysets(queryset):
+    """
+    Returns the given queryset and all querysets it prefetches.
+
+    :param queryset: Queryset instance
+    """
+
+    querysets = [queryset]
+    for prefetch in queryset._prefetch_related_lookups:
+        prefetch_queryset = getattr(prefetch, 'queryset', None)
+        if prefetch_queryset is not None:
+            querysets += get_querysets(prefetch_queryset)
+
+    return querysets
+
 
 class RegistryRootViewSetMixin(object):
+    # Whether responses should be validated and cached using registry root versions.
+    registry_cache = False
+
+    # Whether listings should be streamed to clients instead of rendered at once.
+    registry_streaming = False
+
+    def list(self, request, *args, **kwargs):
+        return self.get_registry_cached_response(request, None) or \
+            self.get_registry_streaming_response(request) or \
+            super(RegistryRootViewSetMixin, self).list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        root_id = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, None)
+        return self.get_registry_cached_response(request, root_id) or \
+            super(RegistryRootViewSetMixin, self).retrieve(request, *args, **kwargs)
+
+    def get_registry_cache(self):
+        return django_cache.caches[getattr(settings, 'REGISTRY_API_CACHE', 'default')]
+
+    def get_registry_cache_key(self, request):
+        """
+        Returns a cache key for the given request, which is derived from the
+        normalised query arguments.
+
+        :param request: Request instance
+        """
+
+        query = sorted([(key, request.query_params.getlist(key)) for key in request.query_params])
+        key = repr((request.path, query, request.META.get('HTTP_ACCEPT', '')))
+        return 'nodewatcher:registry:api:%s' % hashlib.md5(key).hexdigest()
+
+    def get_registry_cached_response(self, request, root_id):
+        """
+        Validates a request against the current registry root version. Returns
+        a not modified response if the client has an up-to-date copy, a cached
+        response if one is available or None if the response must be rendered.
+
+        :param request: Request instance
+        :param root_id: Primary key of the requested root or None for listings
+        """
+
+        if not self.registry_cache or request.method not in ('GET', 'HEAD'):
+            return None
+
+        if not self.is_registry_cacheable(request):
+            return None
+
+        version, last_modified = versions.tracker.get_version(self.get_queryset_model(), root_id)
+        cache_key = self.get_registry_cache_key(request)
+        etag = '"%s"' % hashlib.md5('%s:%s' % (cache_key, version)).hexdigest()
+        last_modified = http_utils.http_date(calendar.timegm(last_modified.utctimetuple()))
+        self._registry_validators = (cache_key, etag, last_modified)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', None)
+        if if_none_match is not None:
+            etags = [tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')]
+            not_modified = etag in etags or '*' in etags
+        else:
+            if_modified_since = http_utils.parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+            not_modified = if_modified_since is not None and \
+                if_modified_since >= http_utils.parse_http_date(last_modified)
+
+        if not_modified:
+            response = http.HttpResponseNotModified()
+        else:
+            cached = self.get_registry_cache().get(cache_key, None)
+            if cached is None or cached[0] != etag:
+                return None
+
+            response = http.HttpResponse(cached[2], content_type=cached[1])
+
+        self.set_registry_validators(response)
+        return response
+
+    def is_registry_cacheable(self, request):
+        """
+        Returns True if the response only depends on data tracked by registry
+        root versions, which are the registry roots and their registry items.
+        Responses which depend on object permissions or on models referenced
+        by registry items are never cached.
+
+        :param request: Request instance
+        """
+
+        for key in request.query_params:
+            if key == 'has_permissions' or key.endswith('__has_permissions'):
+                return False
+
+        root_model = self.get_queryset_model()
+        tracked_models = [root_model, contenttypes_models.ContentType] + root_model._meta.get_parent_list()
+        table_models = get_table_models()
+        for queryset in get_querysets(self.filter_queryset(self.get_queryset())):
+            for join in queryset.query.alias_map.values():
+                model = table_models.get(join.table_name, None)
+                if model is None:
+                    return False
+
+                if model not in tracked_models and not issubclass(model, models.RegistryItemBase):
+                    return False
+
+        return True
+
+    def set_registry_validators(self, response):
+        cache_key, etag, last_modified = self._registry_validators
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        cache_utils.patch_vary_headers(response, ['Accept'])
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(RegistryRootViewSetMixin, self).finalize_response(request, response, *args, **kwargs)
+
+        validators = getattr(self, '_registry_validators', None)
+        if validators is not None and isinstance(response, drf_response.Response) and response.status_code == 200:
+            # Render the response so that it can be stored in the cache.
+            response.render()
+            self.set_registry_validators(response)
+            self.get_registry_cache().set(
+                validators[0],
+                (validators[1], response['Content-Type'], response.content),
+                getattr(settings, 'REGISTRY_API_CACHE_TIMEOUT', 300),
+            )
+
+        return response
+
+    def get_registry_streaming_response(self, request):
+        """
+        Returns a streaming response for a listing, or None if the listing
+        cannot be streamed. Items are fetched, serialized and rendered in
+        chunks, so memory use does not depend on the number of items.
+
+        :param request: Request instance
+        """
+
+        if not self.registry_streaming:
+            return None
+
+        renderer = getattr(request, 'accepted_renderer', None)
+        if not hasattr(renderer, 'render_stream') or 'indent' in getattr(request, 'accepted_media_type', ''):
+            return None
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # The primary key is always the last ordering criterion, so that the order is
+        # deterministic even when ordering by non-unique fields.
+        ordering = list(queryset.query.order_by)
+        if not ordering and queryset.query.default_ordering:
+            ordering = list(queryset.model._meta.ordering)
+        queryset = queryset.order_by(*(ordering + ['pk']))
+
+        envelope = None
+        limit = None
+        if self.paginator is not None:
+            if not isinstance(self.paginator, pagination.LimitOffsetPagination):
+                return None
+
+            limit = self.paginator.get_limit(request)
+
+        # Primary keys of all items are determined by a single query, so that items which
+        # are concurrently added or removed do not shift items between chunks.
+        pks = queryset.values_list('pk', flat=True)
+        if limit is not None:
+            offset = self.paginator.get_offset(request)
+            self.paginator.limit = limit
+            self.paginator.offset = offset
+            self.paginator.count = pagination._get_count(queryset)
+            self.paginator.request = request
+
+            envelope = collections.OrderedDict([
+                ('count', self.paginator.count),
+                ('next', self.paginator.get_next_link()),
+                ('previous', self.paginator.get_previous_link()),
+            ])
+            pks = pks[offset:offset + limit]
+
+        pks = list(pks)
+        chunk_size = getattr(settings, 'REGISTRY_API_STREAMING_CHUNK_SIZE', 100)
+
+        def get_chunks():
+            for start in xrange(0, len(pks), chunk_size):
+                chunk = pks[start:start + chunk_size]
+                items = dict([(item.pk, item) for item in queryset.filter(pk__in=chunk)])
+
+                # Items removed since primary keys have been determined are skipped.
+                items = [items[pk] for pk in chunk if pk in items]
+                if items:
+                    yield self.get_serializer(items, many=True).data
+
+        if renderer.charset:
+            content_type = '%s; charset=%s' % (renderer.media_type, renderer.charset)
+        else:
+            content_type = renderer.media_type
+
+        response = http.StreamingHttpResponse(
+            renderer.render_stream(envelope, get_chunks(), request.accepted_media_type, self.get_renderer_context()),
+            content_type=content_type,
+        )
+
+        if getattr(self, '_registry_validators', None) is not None:
+            self.set_registry_validators(response)
+
+        return response
+
+    def get_queryset_model(self):
+        return self.queryset.model
+
     def get_queryset(self):
         queryset = super(RegistryRootViewSetMixin, self).get_queryset()
 
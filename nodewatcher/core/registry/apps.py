@@ -11,3 +11,7 @@ class RegistryConfig(apps.AppConfig):
         super(RegistryConfig, self).ready()
 
         models_signals.post_migrate.connect(permissions.create_permissions)
+
+        # Track registry changes for API response validation.
+        from . import signals
+        signals.connect()
@@ -0,0 +1,278 @@
+import collections
+
+from django.db import connections, models as django_models, router, transaction
+from django.db.models import signals as django_signals
+
+from . import models
+
+# Maximum number of rows written by a single query.
+BATCH_SIZE = 500
+
+
+def get_concrete_models(model):
+    """
+    Returns concrete models in the inheritance chain of a model, starting with
+    the top-most parent. Each of these models has its own table.
+
+    :param model: Model class
+    """
+
+    return list(reversed(model._meta.get_parent_list())) + [model._meta.concrete_model]
+
+
+def get_model(instances):
+    """
+    Returns the model class of instances, which must all be of the same class.
+    """
+
+    model = type(instances[0])
+    for instance in instances:
+        if type(instance) is not model:
+            raise TypeError("All instances must be of the same class.")
+
+    return model
+
+
+def send_post_save(instances, created, update_fields=None, using=None):
+    """
+    Sends post_save signals for instances written by a bulk operation, so that
+    receivers (for example registry version tracking) see them as regular saves.
+
+    :param instances: A list of model instances
+    :param created: True if instances have been created
+    :param update_fields: Optional names of updated fields
+    :param using: Database alias
+    """
+
+    if update_fields is not None:
+        update_fields = frozenset(update_fields)
+
+    for instance in instances:
+        django_signals.post_save.send(
+            sender=type(instance),
+            instance=instance,
+            created=created,
+            update_fields=update_fields,
+            raw=False,
+            using=using,
+        )
+
+
+def get_unsaved_related(instance):
+    """
+    Returns unsaved model instances which are referenced by relation fields of
+    the given instance.
+
+    :param instance: Model instance
+    """
+
+    related = []
+    for field in instance._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+
+        obj = getattr(instance, field.get_cache_name(), None)
+        if obj is not None and obj.pk is None:
+            related.append(obj)
+
+    return related
+
+
+def _update_related_ids(instance):
+    # Related instances may have been assigned before they were saved, in which
+    # case their identifiers are not yet set on the referencing instance.
+    for field in instance._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+
+        obj = getattr(instance, field.get_cache_name(), None)
+        if obj is None:
+            continue
+        if obj.pk is None:
+            raise ValueError("Unable to create instance with unsaved related object '%s'." % field.name)
+
+        setattr(instance, field.attname, obj.pk)
+
+
+def _batches(instances):
+    for index in xrange(0, len(instances), BATCH_SIZE):
+        yield instances[index:index + BATCH_SIZE]
+
+
+def create(instances):
+    """
+    Inserts new model instances using a single query per table and batch. In
+    contrast to ``QuerySet.bulk_create``, models using multi-table inheritance
+    are supported and primary keys are set on the instances. Polymorphic
+    content types are set on registry items. Only post_save signals are sent.
+
+    Requires a database backend that can return identifiers from bulk inserts.
+
+    :param instances: A list of unsaved model instances of the same class
+    :return: The list of instances
+    """
+
+    if not instances:
+        return instances
+
+    model = get_model(instances)
+    using = router.db_for_write(model)
+
+    for instance in instances:
+        _update_related_ids(instance)
+        if isinstance(instance, models.RegistryItemBase):
+            instance.pre_save_polymorphic()
+
+    with transaction.atomic(using=using, savepoint=False):
+        for concrete_model in get_concrete_models(model):
+            meta = concrete_model._meta
+
+            # Link child rows with the already inserted parent rows.
+            for parent, field in meta.parents.items():
+                if field is None:
+                    continue
+
+                for instance in instances:
+                    setattr(instance, field.attname, instance._get_pk_val(parent._meta))
+
+            auto_field = meta.auto_field if meta.auto_field in meta.local_concrete_fields else None
+            fields = [field for field in meta.local_concrete_fields if field is not auto_field]
+
+            for batch in _batches(instances):
+                ids = concrete_model._base_manager._insert(
+                    batch,
+                    fields=fields,
+                    return_id=auto_field is not None,
+                    using=using,
+                )
+
+                if auto_field is not None:
+                    if not isinstance(ids, list):
+                        ids = [ids]
+
+                    for instance, pk in zip(batch, ids):
+                        setattr(instance, auto_field.attname, pk)
+
+    for instance in instances:
+        instance._state.adding = False
+        instance._state.db = using
+
+    send_post_save(instances, True, using=using)
+    return instances
+
+
+def create_all(instances):
+    """
+    Inserts new model instances of possibly different classes, which may
+    reference each other. Instances are grouped by class and created in
+    dependency order, so referenced instances are created first.
+
+    :param instances: A list of unsaved model instances
+    :return: The list of instances
+    """
+
+    pending = list(instances)
+    while pending:
+        unsaved = set([id(instance) for instance in pending])
+        ready = collections.OrderedDict()
+        blocked = []
+        for instance in pending:
+            if any([id(obj) in unsaved for obj in get_unsaved_related(instance)]):
+                blocked.append(instance)
+            else:
+                ready.setdefault(type(instance), []).append(instance)
+
+        if not ready:
+            raise ValueError("Unable to create instances with circular references.")
+
+        for group in ready.values():
+            create(group)
+
+        pending = blocked
+
+    return instances
+
+
+def update(instances, fields):
+    """
+    Updates fields of existing model instances using a single query per table
+    and batch. Only tables containing the given fields are updated. Only post_save
+    signals are sent.
+
+    :param instances: A list of saved model instances of the same class
+    :param fields: A list of field names which should be updated
+    """
+
+    if not instances or not fields:
+        return
+
+    model = get_model(instances)
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+
+    # Group fields by the tables they are stored in.
+    tables = []
+    fields = [model._meta.get_field(name) for name in fields]
+    for concrete_model in get_concrete_models(model):
+        local_fields = [field for field in fields if field in concrete_model._meta.local_concrete_fields]
+        if local_fields:
+            tables.append((concrete_model, local_fields))
+
+    with transaction.atomic(using=using, savepoint=False):
+        for concrete_model, local_fields in tables:
+            meta = concrete_model._meta
+            pk = meta.pk
+            if isinstance(pk, django_models.AutoField):
+                pk_type = pk.rel_db_type(connection)
+            else:
+                pk_type = pk.db_type(connection)
+
+            columns = [pk] + local_fields
+            row = '(%s)' % ', '.join(['CAST(%%s AS %s)' % pk_type] + [
+                'CAST(%%s AS %s)' % field.db_type(connection) for field in local_fields
+            ])
+
+            for batch in _batches(instances):
+                values = []
+                for instance in batch:
+                    values.append(pk.get_db_prep_save(instance._get_pk_val(meta), connection))
+                    for field in local_fields:
+                        values.append(field.get_db_prep_save(getattr(instance, field.attname), connection))
+
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'UPDATE {table} SET {assignments} FROM (VALUES {rows}) AS updated ({columns}) '
+                        'WHERE {table}.{pk} = updated.{pk}'.format(
+                            table=quote_name(meta.db_table),
+                            assignments=', '.join([
+                                '{column} = updated.{column}'.format(column=quote_name(field.column))
+                                for field in local_fields
+                            ]),
+                            rows=', '.join([row] * len(batch)),
+                            columns=', '.join([quote_name(field.column) for field in columns]),
+                            pk=quote_name(pk.column),
+                        ),
+                        values
+                    )
+
+    send_post_save(instances, False, update_fields=[field.name for field in fields], using=using)
+
+
+def get_changed_fields(instance, values):
+    """
+    Sets attributes of a model instance and returns the names of the ones that
+    have changed.
+
+    :param instance: Model instance
+    :param values: A dictionary of attribute values
+    :return: A list of changed field names
+    """
+
+    changed = []
+    for name, value in values.items():
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+
+    return changed
@@ -1,3 +1,5 @@
+from django.conf import settings
+
 from rest_framework import serializers as drf_serializers, viewsets as drf_viewsets
 
 from nodewatcher.core.api import urls as api_urls, serializers as api_serializers
@@ -39,6 +41,8 @@ for model in top_level_models:
         {
             'queryset': model.objects.all(),
             'serializer_class': serializer,
+            'registry_cache': True,
+            'registry_streaming': getattr(settings, 'REGISTRY_API_STREAMING', False),
         }
     )
 
@@ -1,3 +1,4 @@
+from django.contrib.contenttypes import models as contenttypes_models
 from django.contrib.postgres.fields import JSONField
 from django.db import models
 
@@ -69,3 +70,19 @@ class RegistryItemBase(polymorphic_models.PolymorphicModel):
                 self._registry.registry_id
             )
             cfg.exclude(pk=self.pk).delete()
+
+
+class RegistryRootVersion(models.Model):
+    """
+    Change version of a registry root, which is incremented whenever any of
+    its registry items change. An empty root identifier is used for the version
+    of all roots of the given type.
+    """
+
+    content_type = models.ForeignKey(contenttypes_models.ContentType, on_delete=models.CASCADE)
+    root_id = models.CharField(max_length=255, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    last_modified = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('content_type', 'root_id')
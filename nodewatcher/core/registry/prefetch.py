@@ -0,0 +1,107 @@
+import collections
+
+from django.db import models as django_models
+
+from . import registration
+
+
+class PrefetchPlanner(object):
+    """
+    Loads registry items of many roots at once. Registry items that will be
+    accessed (for example ``node.config.core.general()``) are declared up
+    front and loaded for all roots using a constant number of queries. Items
+    are cast to their actual classes and stored in the prefetch cache of each
+    root, so that registry resolvers can return them without any queries.
+
+    Only unfiltered access is served from the cache; resolving with ``onlyclass``
+    or filtering the returned queryset still issues queries. As with any
+    prefetched relation, items changed after prefetching are not reflected.
+    """
+
+    def __init__(self, lookups=None):
+        """
+        Class constructor.
+
+        :param lookups: Optional list of registry lookups, see ``add``
+        """
+
+        self._lookups = []
+        if lookups:
+            self.add(*lookups)
+
+    def add(self, *lookups):
+        """
+        Declares registry items that will be accessed.
+
+        :param lookups: Registry item classes or lookups in the form
+            ``regpoint:registry_id`` (for example ``config:core.general``)
+        """
+
+        for lookup in lookups:
+            if isinstance(lookup, basestring):
+                if ':' not in lookup:
+                    raise ValueError("Invalid registry lookup '%s'." % lookup)
+            elif not hasattr(lookup, '_registry'):
+                raise TypeError("Specified model must be a registry item.")
+
+            if lookup not in self._lookups:
+                self._lookups.append(lookup)
+
+    def __nonzero__(self):
+        return bool(self._lookups)
+
+    def get_prefetches(self, root_model):
+        """
+        Returns prefetch objects for the declared registry items.
+
+        :param root_model: Registry root model class
+        """
+
+        prefetches = collections.OrderedDict()
+        for lookup in self._lookups:
+            if isinstance(lookup, basestring):
+                point_name, registry_id = lookup.split(':', 1)
+                try:
+                    point = registration.point('%s.%s' % (root_model._meta.concrete_model._meta.model_name, point_name))
+                except KeyError:
+                    raise ValueError("Invalid registration point: %s" % point_name)
+            else:
+                point = lookup._registry.registration_point
+                registry_id = lookup._registry.registry_id
+
+            if not issubclass(root_model, point.model):
+                raise TypeError("Specified registry item is not part of any registration point for '%s'." % root_model.__name__)
+
+            top_level = point.get_top_level_class(registry_id)
+            accessor = point.get_top_level_accessor_name(top_level)
+            prefetches[accessor] = django_models.Prefetch(accessor, queryset=top_level.objects.all())
+
+        return prefetches.values()
+
+    def prefetch(self, roots):
+        """
+        Loads declared registry items of the given roots.
+
+        :param roots: A list of registry root instances of the same class
+        :return: The list of roots
+        """
+
+        roots = [root for root in roots if root is not None]
+        if not roots or not self._lookups:
+            return roots
+
+        django_models.prefetch_related_objects(roots, *self.get_prefetches(roots[0].__class__))
+        return roots
+
+
+def prefetch(roots, *lookups):
+    """
+    Loads registry items of the given roots. See ``PrefetchPlanner``.
+
+    :param roots: A list of registry root instances of the same class
+    :param lookups: Registry item classes or lookups in the form
+        ``regpoint:registry_id``
+    :return: The list of roots
+    """
+
+    return PrefetchPlanner(lookups).prefetch(roots)
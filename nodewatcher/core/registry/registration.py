@@ -361,12 +361,19 @@ class RegistrationPoint(object):
         """
 
         assert isinstance(root, self.model)
-        try:
-            top_level = self.item_registry[registry_id][0]
-        except KeyError:
-            raise exceptions.RegistryItemNotRegistered("Registry item with id '%s' is not registered!" % registry_id)
+        top_level = self.get_top_level_class(registry_id)
+
+        return getattr(root, self.get_top_level_accessor_name(top_level)), top_level
+
+    def get_top_level_accessor_name(self, top_level):
+        """
+        Returns the name of the root attribute, which provides access to
+        top-level items of the given class.
+
+        :param top_level: Top-level registry item class
+        """
 
-        return getattr(root, '{0}_{1}_{2}'.format(self.namespace, top_level._meta.app_label, top_level._meta.model_name)), top_level
+        return '{0}_{1}_{2}'.format(self.namespace, top_level._meta.app_label, top_level._meta.model_name)
 
     def get_top_level_class(self, registry_id):
         """
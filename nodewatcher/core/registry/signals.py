@@ -0,0 +1,59 @@
+from django.db.models import signals as django_signals
+
+from . import models, registration, versions
+
+# Registry root models, determined on first use.
+_root_models = None
+
+
+def get_root_models():
+    global _root_models
+
+    if _root_models is None:
+        _root_models = set([point.model for point in registration.all_points()])
+
+    return _root_models
+
+
+def registry_item_changed(sender, instance, raw=False, **kwargs):
+    """
+    Increment registry root versions when registry items change.
+    """
+
+    if raw or not isinstance(instance, models.RegistryItemBase):
+        return
+
+    registration_point = instance._registry.registration_point
+    if registration_point is None or instance.root_id is None:
+        return
+
+    versions.tracker.schedule_bump(registration_point.model, instance.root_id)
+
+
+def registry_root_saved(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Increment registry root versions when registry roots change.
+    """
+
+    if raw or sender not in get_root_models():
+        return
+
+    versions.tracker.schedule_bump(sender, instance.pk, created=created)
+
+
+def registry_root_removed(sender, instance, **kwargs):
+    """
+    Remove version of a registry root when it gets removed.
+    """
+
+    if sender not in get_root_models():
+        return
+
+    versions.tracker.schedule_remove(sender, instance.pk)
+
+
+def connect():
+    django_signals.post_save.connect(registry_item_changed, dispatch_uid='registry_item_saved')
+    django_signals.post_delete.connect(registry_item_changed, dispatch_uid='registry_item_deleted')
+    django_signals.post_save.connect(registry_root_saved, dispatch_uid='registry_root_saved')
+    django_signals.post_delete.connect(registry_root_removed, dispatch_uid='registry_root_removed')
@@ -1,3 +1,4 @@
+import json
 import random
 
 from django import test as django_test
@@ -7,7 +8,10 @@ from django.core import management, exceptions as django_exceptions
 from django.db.models import query
 from django.test import utils
 
-from nodewatcher.core.registry import registration, exceptions, expression
+from rest_framework import serializers as drf_serializers
+
+from nodewatcher.core.registry import bulk, registration, exceptions, expression, prefetch
+from nodewatcher.core.registry.api import serializers as api_serializers
 
 CUSTOM_SETTINGS = {
     'DEBUG': True,
@@ -218,6 +222,31 @@ class RegistryTestCase(django_test.TransactionTestCase):
         # Test polymorphic cascade deletions
         thing.delete()
 
+    def test_serializer_sensitive_fields(self):
+        from .registry_tests import models
+
+        thing = models.Thing(foo='hello', bar=1)
+        thing.save()
+        simple = thing.first.foo.simple(create=models.SimpleRegistryItem)
+        simple.interesting = 'secret'
+        simple.save()
+
+        serializer = type('ThingSerializer', (api_serializers.RegistryRootSerializerMixin, drf_serializers.ModelSerializer), {
+            'Meta': type('Meta', (object,), {'model': models.Thing, 'fields': '__all__'}),
+        })
+
+        # A projection with only sensitive fields still emits its empty namespace.
+        thing = models.Thing.objects.regpoint('first').registry_fields(f1='foo.simple__interesting').get(pk=thing.pk)
+        data = serializer(thing).data
+        self.assertEqual(data['first'], {})
+        self.assertNotIn('secret', json.dumps(data))
+
+        thing = models.Thing.objects.regpoint('first').registry_fields(
+            f1='foo.simple__interesting',
+            f2='foo.simple__level',
+        ).get(pk=thing.pk)
+        self.assertEqual(serializer(thing).data['first'].keys(), ['foo.simple'])
+
     def test_choices(self):
         from .registry_tests import models
 
@@ -311,6 +340,70 @@ class RegistryTestCase(django_test.TransactionTestCase):
             self.assertEqual(thing.f1.level, None)
             self.assertEqual(thing.f1.test, None)
 
+    def test_bulk(self):
+        from .registry_tests import models
+
+        thing = models.Thing(foo='hello', bar=1)
+        thing.save()
+
+        items = []
+        for i in xrange(10):
+            item = thing.second.foo.multiple(create=models.FirstSubRegistryItem)
+            item.foo = i
+            item.bar = i * 2
+            items.append(item)
+
+        bulk.create(items)
+        self.assertTrue(all([item.pk is not None for item in items]))
+
+        stored = list(thing.second.foo.multiple().order_by('foo'))
+        self.assertEqual(len(stored), 10)
+        for i, item in enumerate(stored):
+            self.assertIsInstance(item, models.FirstSubRegistryItem)
+            self.assertEqual(item.pk, items[i].pk)
+            self.assertEqual(item.bar, i * 2)
+
+        for item in items:
+            self.assertEqual(bulk.get_changed_fields(item, {'foo': item.foo, 'bar': item.bar + 1}), ['bar'])
+        items[0].foo = 100
+        bulk.update(items, ['foo', 'bar'])
+
+        stored = list(thing.second.foo.multiple().order_by('bar'))
+        self.assertEqual([item.bar for item in stored], [i * 2 + 1 for i in xrange(10)])
+        self.assertEqual(stored[0].foo, 100)
+
+        # Instances referencing unsaved instances are created after them.
+        related = models.RelatedModel(name='related')
+        item = models.DoubleChildRegistryItem(root=thing, related=related)
+        bulk.create_all([item, related])
+        self.assertIsNotNone(related.pk)
+        self.assertEqual(thing.first.foo.simple().cast().related_id, related.pk)
+
+    def test_prefetch_planner(self):
+        from .registry_tests import models
+
+        for i in xrange(3):
+            thing = models.Thing(foo='thing', bar=i)
+            thing.save()
+
+            thing.first.foo.simple(create=models.ChildRegistryItem, additional=i)
+            for j in xrange(2):
+                thing.second.foo.multiple(create=models.FirstSubRegistryItem, foo=j).save()
+
+        things = list(models.Thing.objects.filter(foo='thing').order_by('bar'))
+        prefetch.prefetch(things, 'first:foo.simple', models.FirstSubRegistryItem)
+
+        # Prefetched items are cast and accessed without any queries.
+        with self.assertNumQueries(0):
+            for i, thing in enumerate(things):
+                simple = thing.first.foo.simple()
+                self.assertIsInstance(simple, models.ChildRegistryItem)
+                self.assertEqual(simple.additional, i)
+                self.assertEqual(sorted([item.foo for item in thing.second.foo.multiple()]), [0, 1])
+
+        with self.assertRaises(ValueError):
+            prefetch.prefetch(things, 'foo.simple')
+
     def test_filter_expression_parser(self):
         from .registry_tests import models
 
@@ -0,0 +1,192 @@
+import collections
+import threading
+
+from django.contrib.contenttypes import models as contenttypes_models
+from django.db import models as django_models, transaction, utils as db_utils
+from django.utils import timezone
+
+from . import models
+
+# Version identifier of the set of all roots of a given type.
+ALL_ROOTS = ''
+
+
+class PendingChanges(object):
+    """
+    Registry root changes, which are applied when a transaction commits.
+    """
+
+    def __init__(self):
+        self.roots = collections.defaultdict(set)
+        self.removed = collections.defaultdict(set)
+        self.flushed = False
+
+
+class VersionTracker(object):
+    """
+    Tracks change versions of registry roots, so that clients may validate
+    their cached copies of registry data.
+
+    Each root has its own version, which is incremented whenever the root or
+    any of its registry items change. The version of all roots of a given type
+    is the sum of versions of individual roots and of a version, which is only
+    incremented when roots are created or removed. On removal it is incremented
+    by more than the version of the removed root, so the sum never repeats.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self._pending = threading.local()
+
+    def schedule_bump(self, root_model, root_id=None, created=False):
+        """
+        Schedules a version increment for a registry root. The increment is
+        deferred until the current transaction commits, so that multiple changes
+        to the same root only result in a single increment.
+
+        :param root_model: Registry root model class
+        :param root_id: Optional primary key of the changed root; when None,
+            only the version of the set of roots is incremented
+        :param created: True if the root has just been created
+        """
+
+        roots = set()
+        if root_id is None or created:
+            roots.add(ALL_ROOTS)
+        if root_id is not None:
+            roots.add(str(root_id))
+
+        if not transaction.get_connection().in_atomic_block:
+            self.bump(root_model, roots)
+            return
+
+        self._get_pending().roots[root_model].update(roots)
+
+    def schedule_remove(self, root_model, root_id):
+        """
+        Schedules removal of the version of a deleted registry root.
+
+        :param root_model: Registry root model class
+        :param root_id: Primary key of the deleted root
+        """
+
+        if not transaction.get_connection().in_atomic_block:
+            self.remove(root_model, [str(root_id)])
+            return
+
+        self._get_pending().removed[root_model].add(str(root_id))
+
+    def _get_pending(self):
+        batch = getattr(self._pending, 'batch', None)
+        if batch is None or batch.flushed:
+            batch = self._pending.batch = PendingChanges()
+
+        # A callback is registered for every change, as callbacks registered by earlier
+        # changes may have been discarded together with a rolled back transaction. Only
+        # the first callback of a batch applies the changes.
+        transaction.on_commit(lambda: self._flush(batch))
+        return batch
+
+    def _flush(self, batch):
+        if batch.flushed:
+            return
+        batch.flushed = True
+
+        for root_model, model_roots in batch.roots.items():
+            self.bump(root_model, model_roots.difference(batch.removed[root_model]))
+
+        for root_model, model_roots in batch.removed.items():
+            # Changes of rolled back transactions may be left in the batch, so only versions
+            # of roots which really have been removed are removed.
+            existing = set([str(pk) for pk in root_model.objects.filter(pk__in=model_roots).values_list('pk', flat=True)])
+            self.remove(root_model, model_roots.difference(existing))
+
+    def bump(self, root_model, roots, amount=1):
+        """
+        Immediately increments versions of the given registry roots.
+
+        :param root_model: Registry root model class
+        :param roots: A list of root primary keys
+        :param amount: Optional increment
+        """
+
+        if not roots:
+            return
+
+        content_type = contenttypes_models.ContentType.objects.get_for_model(root_model)
+        now = timezone.now()
+
+        versions = models.RegistryRootVersion.objects.filter(content_type=content_type, root_id__in=roots)
+        if versions.update(version=django_models.F('version') + amount, last_modified=now) == len(roots):
+            return
+
+        existing = set(versions.values_list('root_id', flat=True))
+        for root_id in set(roots).difference(existing):
+            try:
+                with transaction.atomic():
+                    models.RegistryRootVersion.objects.create(
+                        content_type=content_type,
+                        root_id=root_id,
+                        version=amount,
+                        last_modified=now,
+                    )
+            except db_utils.IntegrityError:
+                # Version has been concurrently created.
+                versions.filter(root_id=root_id).update(version=django_models.F('version') + amount, last_modified=now)
+
+    def remove(self, root_model, roots):
+        """
+        Immediately removes versions of the given deleted registry roots.
+
+        :param root_model: Registry root model class
+        :param roots: A list of root primary keys
+        """
+
+        if not roots:
+            return
+
+        with transaction.atomic():
+            versions = models.RegistryRootVersion.objects.select_for_update().filter(
+                content_type=contenttypes_models.ContentType.objects.get_for_model(root_model),
+                root_id__in=roots,
+            )
+            removed_version = sum(versions.values_list('version', flat=True))
+            versions.delete()
+
+            self.bump(root_model, [ALL_ROOTS], amount=removed_version + 1)
+
+    def get_version(self, root_model, root_id=None):
+        """
+        Returns the current version of a registry root.
+
+        :param root_model: Registry root model class
+        :param root_id: Optional root primary key, defaults to all roots
+        :return: A tuple (version, last_modified)
+        """
+
+        versions = models.RegistryRootVersion.objects.filter(
+            content_type=contenttypes_models.ContentType.objects.get_for_model(root_model),
+        )
+
+        if root_id is None:
+            version = versions.aggregate(
+                version=django_models.Sum('version'),
+                last_modified=django_models.Max('last_modified'),
+            )
+            if version['version'] is None:
+                return 0, timezone.now()
+
+            return version['version'], version['last_modified']
+
+        try:
+            version = versions.get(root_id=str(root_id))
+        except models.RegistryRootVersion.DoesNotExist:
+            # Roots which have not changed since versions have been tracked.
+            return 0, timezone.now()
+
+        return version.version, version.last_modified
+
+tracker = VersionTracker()
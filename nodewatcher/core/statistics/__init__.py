@@ -0,0 +1 @@
+default_app_config = 'nodewatcher.core.statistics.apps.StatisticsConfig'
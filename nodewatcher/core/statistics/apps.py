@@ -0,0 +1,13 @@
+from django import apps
+
+
+class StatisticsConfig(apps.AppConfig):
+    name = 'nodewatcher.core.statistics'
+    label = 'core_statistics'
+
+    def ready(self):
+        super(StatisticsConfig, self).ready()
+
+        # Connect signals.
+        from . import signals
+        signals.connect_tracked_models()
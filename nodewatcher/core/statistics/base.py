@@ -0,0 +1,55 @@
+from django.utils import encoding
+
+
+class StatisticsDimension(object):
+    """
+    A statistics dimension counts nodes by a single value, for example their
+    network status. Counts are materialised into buckets which are kept up to
+    date whenever one of the tracked models is saved or deleted.
+    """
+
+    # Unique dimension name.
+    name = None
+    # Model classes which affect the value of this dimension.
+    tracked_models = ()
+
+    def get_queryset(self):
+        """
+        Returns a queryset of nodes which should be counted in this dimension,
+        with the dimension value annotated as ``value``.
+        """
+
+        raise NotImplementedError
+
+    def get_affected_nodes(self, instance):
+        """
+        Returns primary keys of nodes whose value may have changed when the given
+        tracked model instance has been changed. By default, the instance is
+        assumed to be a registry item.
+
+        :param instance: Tracked model instance
+        """
+
+        return [instance.root_id]
+
+    def get_values(self, nodes=None):
+        """
+        Returns current values of nodes in this dimension. Nodes which are not
+        counted in this dimension are not included.
+
+        :param nodes: Optional list of node primary keys to limit the query to
+        :return: A dictionary mapping node primary keys to values
+        """
+
+        queryset = self.get_queryset()
+        if nodes is not None:
+            queryset = queryset.filter(pk__in=nodes)
+
+        values = {}
+        for node, value in queryset.values_list('pk', 'value'):
+            if value is None:
+                value = ''
+
+            values[node] = encoding.force_text(value)[:255]
+
+        return values
@@ -0,0 +1,14 @@
+class StatisticsException(Exception):
+    pass
+
+
+class InvalidDimension(StatisticsException, TypeError):
+    pass
+
+
+class DimensionAlreadyRegistered(StatisticsException):
+    pass
+
+
+class DimensionNotRegistered(StatisticsException):
+    pass
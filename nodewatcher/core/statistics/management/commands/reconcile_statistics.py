@@ -0,0 +1,18 @@
+from django.core.management import base
+
+from ... import exceptions
+from ...pool import pool
+
+
+class Command(base.BaseCommand):
+    help = "Recomputes materialised node statistics. Should be run after the statistics tables are first created."
+    requires_model_validation = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('dimensions', nargs='*', type=str, help="Names of dimensions to reconcile, defaults to all.")
+
+    def handle(self, *args, **options):
+        try:
+            pool.reconcile(dimensions=options['dimensions'] or None)
+        except exceptions.DimensionNotRegistered as error:
+            raise base.CommandError(str(error))
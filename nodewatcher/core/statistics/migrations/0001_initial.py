@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_json_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeStatisticsMembership',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=255, blank=True)),
+                ('node', models.ForeignKey(related_name='+', on_delete=django.db.models.deletion.CASCADE, to='core.Node')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatisticsBucket',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('dimension', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=255, blank=True)),
+                ('nodes', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('dimension', 'value'),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='statisticsbucket',
+            unique_together=set([('dimension', 'value')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='nodestatisticsmembership',
+            unique_together=set([('node', 'dimension')]),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+
+from nodewatcher.core import models as core_models
+
+
+class StatisticsBucket(models.Model):
+    """
+    Materialised number of nodes which have a specific value in a
+    statistics dimension.
+    """
+
+    dimension = models.CharField(max_length=50)
+    # Missing values are stored as empty strings so that buckets are unique.
+    value = models.CharField(max_length=255, blank=True)
+    nodes = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ('dimension', 'value')
+        unique_together = ('dimension', 'value')
+
+    def __unicode__(self):
+        return u"%s=%s (%d)" % (self.dimension, self.value, self.nodes)
+
+    @property
+    def key(self):
+        """
+        Bucket value, where missing values are represented by None.
+        """
+
+        return self.value or None
+
+
+class NodeStatisticsMembership(models.Model):
+    """
+    Bucket value that a node is currently counted under in a statistics
+    dimension. Used to compute bucket changes incrementally.
+    """
+
+    node = models.ForeignKey(core_models.Node, on_delete=models.CASCADE, related_name='+')
+    dimension = models.CharField(max_length=50)
+    value = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        unique_together = ('node', 'dimension')
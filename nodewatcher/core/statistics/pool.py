@@ -0,0 +1,306 @@
+import collections
+import logging
+import threading
+
+from django.db import models as django_models, transaction, utils as db_utils
+
+from ...utils import loader
+
+from . import exceptions, models
+
+# Logger instance
+logger = logging.getLogger('nodewatcher.core.statistics')
+
+
+class PendingUpdates(object):
+    """
+    Nodes with pending statistics updates, which are performed when a
+    transaction commits.
+    """
+
+    def __init__(self):
+        self.nodes = collections.defaultdict(set)
+        self.flushed = False
+
+
+class StatisticsPool(object):
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self._dimensions = collections.OrderedDict()
+        self._model_dimensions = {}
+        self._pending = threading.local()
+        self._discovered = False
+
+    def discover(self):
+        """
+        Discovers and loads all statistics dimensions.
+        """
+
+        if self._discovered:
+            return
+        self._discovered = True
+
+        loader.load_modules('statistics')
+
+    def register(self, dimension):
+        """
+        Registers a new statistics dimension.
+
+        :param dimension: Dimension class
+        """
+
+        from . import base
+
+        if not issubclass(dimension, base.StatisticsDimension):
+            raise exceptions.InvalidDimension("'%s' is not a subclass of nodewatcher.core.statistics.base.StatisticsDimension" % dimension.__name__)
+
+        if not dimension.name:
+            raise exceptions.InvalidDimension("Statistics dimension '%s' has no name" % dimension.__name__)
+
+        if dimension.name in self._dimensions:
+            raise exceptions.DimensionAlreadyRegistered("A statistics dimension with name '%s' is already registered" % dimension.name)
+
+        self._dimensions[dimension.name] = dimension()
+        self._model_dimensions = {}
+
+    def get_dimension(self, name):
+        """
+        Returns a registered statistics dimension.
+
+        :param name: Dimension name
+        """
+
+        self.discover()
+
+        try:
+            return self._dimensions[name]
+        except KeyError:
+            raise exceptions.DimensionNotRegistered("Statistics dimension '%s' is not registered" % name)
+
+    def get_all_dimensions(self):
+        """
+        Returns a list of all registered statistics dimensions.
+        """
+
+        self.discover()
+
+        return self._dimensions.values()
+
+    def get_dimensions_for_model(self, model):
+        """
+        Returns a list of dimensions which track the given model class.
+
+        :param model: Model class
+        """
+
+        self.discover()
+
+        try:
+            return self._model_dimensions[model]
+        except KeyError:
+            dimensions = [
+                dimension for dimension in self._dimensions.values()
+                if issubclass(model, tuple(dimension.tracked_models))
+            ]
+            self._model_dimensions[model] = dimensions
+            return dimensions
+
+    def get_buckets(self, name):
+        """
+        Returns a queryset of non-empty buckets of a statistics dimension.
+
+        :param name: Dimension name
+        """
+
+        return models.StatisticsBucket.objects.filter(dimension=name, nodes__gt=0)
+
+    def schedule_update(self, instance):
+        """
+        Schedules statistics updates for nodes affected by a change to a
+        tracked model instance. Updates are deferred until the current
+        transaction commits, so that multiple changes to the same node only
+        result in a single update.
+
+        :param instance: Model instance
+        """
+
+        dimensions = self.get_dimensions_for_model(instance.__class__)
+        if not dimensions:
+            return
+
+        batch = getattr(self._pending, 'batch', None)
+        if batch is None or batch.flushed:
+            batch = self._pending.batch = PendingUpdates()
+
+        for dimension in dimensions:
+            batch.nodes[dimension.name].update(dimension.get_affected_nodes(instance))
+
+        # A callback is registered for every change, as callbacks registered by earlier
+        # changes may have been discarded together with a rolled back transaction. Only
+        # the first callback of a batch performs the updates. Nodes of rolled back changes
+        # stay in the batch, which is harmless as their statistics are recomputed.
+        transaction.on_commit(lambda: self._flush(batch))
+
+    def _flush(self, batch):
+        if batch.flushed:
+            return
+        batch.flushed = True
+
+        for name, nodes in batch.nodes.items():
+            nodes.discard(None)
+            if not nodes:
+                continue
+
+            try:
+                self.update_nodes(nodes, dimensions=[name])
+            except db_utils.DatabaseError:
+                # Statistics will be corrected by the next reconciliation.
+                logger.exception("Failed to update '%s' statistics." % name)
+
+    def _apply_deltas(self, name, deltas):
+        for value, delta in deltas.items():
+            if not delta:
+                continue
+
+            updated = models.StatisticsBucket.objects.filter(
+                dimension=name,
+                value=value,
+            ).update(nodes=django_models.F('nodes') + delta)
+
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        models.StatisticsBucket.objects.create(dimension=name, value=value, nodes=delta)
+                except db_utils.IntegrityError:
+                    # Bucket has been concurrently created.
+                    models.StatisticsBucket.objects.filter(
+                        dimension=name,
+                        value=value,
+                    ).update(nodes=django_models.F('nodes') + delta)
+
+    def update_nodes(self, nodes, dimensions=None):
+        """
+        Incrementally updates statistics for the given nodes.
+
+        :param nodes: A list of node primary keys
+        :param dimensions: Optional list of dimension names to update, defaults
+            to all dimensions
+        """
+
+        nodes = set(nodes)
+        if not nodes:
+            return
+
+        if dimensions is None:
+            dimensions = self.get_all_dimensions()
+        else:
+            dimensions = [self.get_dimension(name) for name in dimensions]
+
+        for dimension in dimensions:
+            values = dimension.get_values(nodes)
+
+            with transaction.atomic():
+                memberships = {
+                    membership.node_id: membership
+                    for membership in models.NodeStatisticsMembership.objects.select_for_update().filter(
+                        dimension=dimension.name,
+                        node__in=nodes,
+                    )
+                }
+
+                deltas = collections.Counter()
+                removed = []
+                added = []
+                for node in nodes:
+                    membership = memberships.get(node, None)
+                    old_value = membership.value if membership is not None else None
+                    new_value = values.get(node, None)
+                    if old_value == new_value:
+                        continue
+
+                    if old_value is not None:
+                        deltas[old_value] -= 1
+                    if new_value is not None:
+                        deltas[new_value] += 1
+
+                    if new_value is None:
+                        removed.append(membership.pk)
+                    elif membership is None:
+                        added.append(models.NodeStatisticsMembership(node_id=node, dimension=dimension.name, value=new_value))
+                    else:
+                        membership.value = new_value
+                        membership.save(update_fields=['value'])
+
+                if removed:
+                    models.NodeStatisticsMembership.objects.filter(pk__in=removed).delete()
+                if added:
+                    models.NodeStatisticsMembership.objects.bulk_create(added)
+
+                self._apply_deltas(dimension.name, deltas)
+
+    def remove_nodes(self, nodes):
+        """
+        Removes the given nodes from statistics in all dimensions.
+
+        :param nodes: A list of node primary keys
+        """
+
+        with transaction.atomic():
+            memberships = models.NodeStatisticsMembership.objects.select_for_update().filter(node__in=nodes)
+
+            deltas = collections.defaultdict(collections.Counter)
+            for dimension, value in memberships.values_list('dimension', 'value'):
+                deltas[dimension][value] -= 1
+
+            memberships.delete()
+
+            for name, dimension_deltas in deltas.items():
+                self._apply_deltas(name, dimension_deltas)
+
+    def reconcile(self, dimensions=None):
+        """
+        Recomputes memberships and buckets from scratch, correcting any drift
+        of the incrementally maintained statistics. This includes nodes that
+        have dropped out of time-based dimensions without being changed.
+
+        :param dimensions: Optional list of dimension names to reconcile,
+            defaults to all dimensions
+        """
+
+        if dimensions is None:
+            dimensions = self.get_all_dimensions()
+        else:
+            dimensions = [self.get_dimension(name) for name in dimensions]
+
+        for dimension in dimensions:
+            values = dimension.get_values()
+
+            with transaction.atomic():
+                memberships = models.NodeStatisticsMembership.objects.select_for_update().filter(dimension=dimension.name)
+
+                current = dict(memberships.values_list('node_id', 'value'))
+                stale = [node for node, value in current.items() if values.get(node, None) != value]
+                if stale:
+                    memberships.filter(node__in=stale).delete()
+
+                models.NodeStatisticsMembership.objects.bulk_create([
+                    models.NodeStatisticsMembership(node_id=node, dimension=dimension.name, value=value)
+                    for node, value in values.items()
+                    if current.get(node, None) != value
+                ], batch_size=1000)
+
+                # Rewrite buckets from scratch.
+                counts = collections.Counter(values.values())
+                buckets = models.StatisticsBucket.objects.select_for_update().filter(dimension=dimension.name)
+                existing = set(buckets.values_list('value', flat=True))
+                buckets.exclude(value__in=counts.keys()).update(nodes=0)
+                for value, count in counts.items():
+                    if value in existing:
+                        buckets.filter(value=value).update(nodes=count)
+                    else:
+                        models.StatisticsBucket.objects.create(dimension=dimension.name, value=value, nodes=count)
+
+pool = StatisticsPool()
@@ -0,0 +1,55 @@
+from django import apps, dispatch
+from django.db.models import signals as django_signals
+
+from nodewatcher.core import models as core_models
+
+from .pool import pool
+
+
+def statistics_track_change(sender, instance, raw=False, **kwargs):
+    """
+    Update statistics when a tracked model is changed.
+    """
+
+    if raw:
+        return
+
+    pool.schedule_update(instance)
+
+
+def connect_tracked_models():
+    """
+    Connects change tracking to models tracked by statistics dimensions,
+    including their subclasses.
+    """
+
+    tracked_models = set()
+    for dimension in pool.get_all_dimensions():
+        tracked_models.update(dimension.tracked_models)
+
+    if not tracked_models:
+        return
+
+    for model in apps.apps.get_models():
+        if not issubclass(model, tuple(tracked_models)):
+            continue
+
+        django_signals.post_save.connect(
+            statistics_track_change,
+            sender=model,
+            dispatch_uid='statistics_track_save_%s' % model._meta.label,
+        )
+        django_signals.post_delete.connect(
+            statistics_track_change,
+            sender=model,
+            dispatch_uid='statistics_track_delete_%s' % model._meta.label,
+        )
+
+
+@dispatch.receiver(django_signals.pre_delete, sender=core_models.Node)
+def statistics_node_removed(sender, instance, **kwargs):
+    """
+    Remove the node from all statistics when it gets removed.
+    """
+
+    pool.remove_nodes([instance.pk])
@@ -0,0 +1,20 @@
+import datetime
+
+from nodewatcher import celery
+
+from .pool import pool
+
+# Register the periodic schedule.
+celery.app.conf.CELERYBEAT_SCHEDULE['nodewatcher.core.statistics.tasks.reconcile'] = {
+    'task': 'nodewatcher.core.statistics.tasks.reconcile',
+    'schedule': datetime.timedelta(hours=1),
+}
+
+
+@celery.app.task(queue='monitor', bind=True)
+def reconcile(self):
+    """
+    Reconciles materialised statistics with the registry.
+    """
+
+    pool.reconcile()
@@ -4,6 +4,7 @@ components.partials.get_partial('node_general_partial').add(components.PartialEn
     name='url',
     template='nodes/general/url.html',
     weight=85,
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {
         'description': context['node'].config.core.description()
     },
@@ -4,6 +4,7 @@ components.partials.get_partial('node_display_partial').add(components.PartialEn
     name='location',
     weight=10,
     template='nodes/location.html',
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {
         'node_location': context['node'].config.core.location(),
     }
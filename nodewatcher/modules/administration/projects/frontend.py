@@ -10,6 +10,7 @@ api_urls.v2_api.register('statistics/project', views.ProjectStatisticsViewSet, b
 components.partials.get_partial('node_general_partial').add(components.PartialEntry(
     name='project',
     template='nodes/snippet/project.html',
+    prefetch=['config:core.project'],
     extra_context=lambda context: {
         'node_project': getattr(context['node'].config.core.project(), 'project', None),
     }
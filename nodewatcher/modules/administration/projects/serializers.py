@@ -21,5 +21,5 @@ class ProjectStatisticsSerializer(serializers.Serializer):
     Serializer for global per-project statistics.
     """
 
-    project = serializers.CharField()
+    project = serializers.CharField(source='key')
     nodes = serializers.IntegerField()
@@ -0,0 +1,37 @@
+import datetime
+
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.statistics import base as statistics_base
+from nodewatcher.core.statistics.pool import pool
+
+from . import models
+
+
+class ProjectStatistics(statistics_base.StatisticsDimension):
+    """
+    Number of recently seen nodes by project.
+    """
+
+    name = 'project'
+    # Nodes entering or leaving the last seen window are handled by periodic reconciliation,
+    # as tracking monitor updates would update statistics on every monitoring cycle.
+    tracked_models = (models.ProjectConfig, models.Project)
+
+    def get_queryset(self):
+        return core_models.Node.objects.regpoint('config').registry_fields(
+            value='core.project__project__name'
+        ).regpoint('monitoring').registry_filter(
+            # Ignore nodes, which haven't been seen for more than 180 days.
+            core_general__last_seen__gt=timezone.now() - datetime.timedelta(days=180),
+        )
+
+    def get_affected_nodes(self, instance):
+        if isinstance(instance, models.Project):
+            # Renaming a project changes the value of all its nodes.
+            return models.ProjectConfig.objects.filter(project=instance).values_list('root', flat=True)
+
+        return super(ProjectStatistics, self).get_affected_nodes(instance)
+
+pool.register(ProjectStatistics)
@@ -8,6 +8,7 @@ api_urls.v2_api.register('statistics/status', views.StatusStatisticsViewSet, bas
 components.partials.get_partial('node_general_partial').add(components.PartialEntry(
     name='status',
     template='display/status.html',
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {
         'node_status': context['node'].monitoring.core.status(default=models.StatusMonitor),
     },
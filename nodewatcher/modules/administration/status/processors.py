@@ -4,6 +4,8 @@ from django.utils import timezone
 
 from nodewatcher.core import models as core_models
 from nodewatcher.core.monitor import processors as monitor_processors
+from nodewatcher.core.registry import versions as registry_versions
+from nodewatcher.core.statistics.pool import pool as statistics_pool
 
 from . import models, events
 
@@ -88,7 +90,14 @@ class PushNodeStatus(monitor_processors.NetworkProcessor):
             network_status='up',
         )
 
-        # Update node status.
+        down_nodes = list(down_nodes.values_list('pk', flat=True))
+        if not down_nodes:
+            return context, nodes
+
+        # Update node status. Bulk updates do not emit any signals, so statistics and
+        # registry versions must be updated explicitly.
         models.StatusMonitor.objects.filter(root__in=down_nodes).update(network='down')
+        statistics_pool.update_nodes(down_nodes, dimensions=['status'])
+        registry_versions.tracker.bump(core_models.Node, down_nodes)
 
         return context, nodes
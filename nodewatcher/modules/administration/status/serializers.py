@@ -10,6 +10,7 @@ class StatusStatisticsSerializer(serializers.Serializer):
 
     status = registry_serializers.RegisteredChoiceSerializer(
         regpoint='node.monitoring',
-        choices='core.status#network'
+        choices='core.status#network',
+        source='key',
     )
     nodes = serializers.IntegerField()
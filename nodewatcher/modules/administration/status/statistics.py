@@ -0,0 +1,30 @@
+import datetime
+
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.statistics import base as statistics_base
+from nodewatcher.core.statistics.pool import pool
+
+from . import models
+
+
+class StatusStatistics(statistics_base.StatisticsDimension):
+    """
+    Number of recently seen nodes by network status.
+    """
+
+    name = 'status'
+    # Nodes entering or leaving the last seen window are handled by periodic reconciliation,
+    # as tracking monitor updates would update statistics on every monitoring cycle.
+    tracked_models = (models.StatusMonitor,)
+
+    def get_queryset(self):
+        return core_models.Node.objects.regpoint('monitoring').registry_fields(
+            value='core.status__network'
+        ).regpoint('monitoring').registry_filter(
+            # Ignore nodes, which haven't been seen for more than 180 days.
+            core_general__last_seen__gt=timezone.now() - datetime.timedelta(days=180),
+        )
+
+pool.register(StatusStatistics)
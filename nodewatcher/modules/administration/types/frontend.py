@@ -4,6 +4,7 @@ from nodewatcher.core.frontend import components
 components.partials.get_partial('node_general_partial').add(components.PartialEntry(
     name='type',
     template='display/type.html',
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {
         'node_type': context['node'].config.core.type(),
     }
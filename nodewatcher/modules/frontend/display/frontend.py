@@ -27,6 +27,7 @@ components.partials.get_partial('node_general_partial').add(components.PartialEn
     name='name',
     template='nodes/general/name.html',
     weight=-1,
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {} if 'node_name' in context else {
         'node_name': getattr(context['node'].config.core.general(), 'name', None) or _("unknown")
     },
@@ -36,6 +37,7 @@ components.partials.get_partial('node_general_partial').add(components.PartialEn
     name='router_id',
     template='nodes/general/router_id.html',
     weight=100,
+    cache=components.CachePolicy([components.registry_version()]),
     extra_context=lambda context: {
         'router_ids': context['node'].config.core.routerid()
     },
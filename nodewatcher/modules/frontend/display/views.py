@@ -4,7 +4,9 @@ from nodewatcher.core import models
 from nodewatcher.core.frontend import views
 
 
-class DisplayNode(views.NodeNameMixin, generic.DetailView):
+class DisplayNode(views.NodeNameMixin, views.RegistryPrefetchMixin, generic.DetailView):
     template_name = 'nodes/display.html'
     context_object_name = 'node'
     model = models.Node
+    registry_prefetch = ['config:core.general']
+    registry_prefetch_partials = ['node_display_partial', 'node_general_partial']
@@ -55,10 +55,12 @@ class BuildResultSerializer(serializers.ModelSerializer):
     build_channel = BuildChannelSerializer()
     builder = BuilderSerializer()
     files = BuildResultFileSerializer(many=True)
+    queue_wait_time = serializers.DurationField(read_only=True)
 
     class Meta:
         model = models.BuildResult
         fields = ('uuid', 'build_channel', 'builder', 'status', 'created', 'last_modified',
+                  'build_started', 'build_finished', 'queue_wait_time', 'builder_utilisation',
                   'files', 'build_log', 'config')
 
     def get_fields(self):
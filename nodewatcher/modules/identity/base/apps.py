@@ -4,3 +4,8 @@ from django import apps
 class IdentityBaseConfig(apps.AppConfig):
     name = 'nodewatcher.modules.identity.base'
     label = 'identity_base'
+
+    def ready(self):
+        # Connect to the HTTP push validation signal if HTTP source is installed.
+        if apps.apps.is_installed('nodewatcher.modules.monitor.sources.http'):
+            from . import http_signals
@@ -0,0 +1,27 @@
+from django import dispatch
+
+from nodewatcher.modules.monitor.sources.http import signals
+
+from . import events
+
+
+@dispatch.receiver(signals.validate_push)
+def http_validate_push(sender, node, context, **kwargs):
+    """
+    Rejects pushes from nodes whose identity can never be verified, so that they
+    are not queued for processing. All other pushes are left to the identity
+    verification processor, which also stores unknown identities.
+    """
+
+    config = node.config.core.identity()
+    if not config:
+        return True
+
+    # When only explicitly configured identities are trusted and unknown identities are
+    # not stored for confirmation, at least one trusted identity must exist.
+    if config.trust_policy == 'config' and not config.store_unknown:
+        if not node.config.core.identity.mechanisms(queryset=True).filter(trusted=True).exists():
+            events.IdentityVerificationFailed(node).post()
+            return False
+
+    return True
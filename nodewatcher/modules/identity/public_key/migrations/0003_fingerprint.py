@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from cryptography.hazmat import backends
+from cryptography.hazmat.primitives import serialization
+
+from django.db import models, migrations
+
+
+def populate_fingerprint(apps, schema_editor):
+    """
+    Populates the fingerprint field for existing PublicKeyIdentityConfig instances.
+    """
+
+    PublicKeyIdentityConfig = apps.get_model('identity_public_key', 'PublicKeyIdentityConfig')
+    backend = backends.default_backend()
+    for identity in PublicKeyIdentityConfig.objects.all():
+        try:
+            key = serialization.load_pem_public_key(identity.public_key.encode('ascii'), backend)
+        except ValueError:
+            continue
+
+        identity.fingerprint = hashlib.sha256(
+            key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
+        ).hexdigest()
+        identity.save(update_fields=['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('identity_public_key', '0002_auto_20151001_2359'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publickeyidentityconfig',
+            name='fingerprint',
+            field=models.CharField(db_index=True, max_length=64, editable=False, blank=True),
+        ),
+        migrations.RunPython(populate_fingerprint, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from cryptography import x509
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat import backends
@@ -12,6 +14,11 @@ from nodewatcher.modules.identity.base import models as base_models
 # Ensure default cryptography backend is loaded.
 backends.default_backend()
 
+# Maximum number of fingerprints of presented keys cached in each process.
+FINGERPRINT_CACHE_SIZE = 10000
+# Fingerprints of presented keys, indexed by digests of presented data.
+_fingerprint_cache = {}
+
 
 class PublicKeyIdentityConfig(base_models.IdentityMechanismConfig):
     """
@@ -19,6 +26,7 @@ class PublicKeyIdentityConfig(base_models.IdentityMechanismConfig):
     """
 
     public_key = models.TextField()
+    fingerprint = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
 
     class RegistryMeta(base_models.IdentityMechanismConfig.RegistryMeta):
         registry_name = _("Public Key")
@@ -56,24 +64,61 @@ class PublicKeyIdentityConfig(base_models.IdentityMechanismConfig):
             certificate = x509.load_pem_x509_certificate(data, backend)
             return certificate.public_key()
 
-    def is_match(self, data):
+    @classmethod
+    def get_fingerprint(cls, data):
         """
-        Returns true if the passed in public key matches this identity.
+        Returns the SHA-256 fingerprint of the DER-encoded public key contained in
+        data or None if data does not contain a valid public key. Fingerprints of
+        PEM-encoded data are cached in each process, so that repeated verification
+        of the same key does not need to parse it again.
+
+        :param data: Public key or certificate data
         """
 
-        # Extract public key from source data.
+        if isinstance(data, dict):
+            data = data.get('public_key', None)
+        if isinstance(data, unicode):
+            data = data.encode('ascii')
+
+        digest = None
+        if isinstance(data, str):
+            digest = hashlib.sha256(data).digest()
+            try:
+                return _fingerprint_cache[digest]
+            except KeyError:
+                pass
+
         try:
-            key = self._extract_public_key(data)
+            key = cls._extract_public_key(data)
+            fingerprint = hashlib.sha256(
+                key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
+            ).hexdigest()
         except ValueError:
-            return False
+            fingerprint = None
+
+        if digest is not None:
+            if len(_fingerprint_cache) >= FINGERPRINT_CACHE_SIZE:
+                _fingerprint_cache.clear()
+            _fingerprint_cache[digest] = fingerprint
+
+        return fingerprint
+
+    def save(self, *args, **kwargs):
+        self.fingerprint = self.get_fingerprint(self.public_key) or ''
+        super(PublicKeyIdentityConfig, self).save(*args, **kwargs)
 
-        # Extract stored public key and compare.
-        stored_key = self._extract_public_key(self.public_key.encode('ascii'))
+    def is_match(self, data):
+        """
+        Returns true if the passed in public key matches this identity.
+        """
 
-        encoded_a = key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
-        encoded_b = stored_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
+        # Identities stored before fingerprints were introduced may not have one.
+        if not self.fingerprint:
+            self.fingerprint = self.get_fingerprint(self.public_key) or ''
+            if not self.fingerprint:
+                return False
 
-        return encoded_a == encoded_b
+        return self.get_fingerprint(data) == self.fingerprint
 
     @classmethod
     def from_data(cls, data):
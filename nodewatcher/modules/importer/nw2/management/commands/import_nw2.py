@@ -1,19 +1,27 @@
 # coding: utf-8
+import collections
 import datetime
 import json
+import os
+import tempfile
+import time
+
 import pytz
+import radix
 
 from django.apps import apps
 from django.core.management import base
 from django.contrib.auth import models as auth_models
+from django.contrib.contenttypes import models as contenttypes_models
 from django.db import transaction
 
-from guardian import shortcuts
+from guardian import models as guardian_models
 
 from nodewatcher.core import models as core_models
 from nodewatcher.core.allocation.ip import models as pool_models
 from nodewatcher.core.generator.cgm import models as cgm_models, devices as cgm_devices
 from nodewatcher.core.monitor import models as monitor_models
+from nodewatcher.core.registry import bulk
 from nodewatcher.modules.administration.description import models as dsc_models
 from nodewatcher.modules.administration.location import models as location_models
 from nodewatcher.modules.administration.projects import models as project_models
@@ -196,6 +204,195 @@ NODE_NOTES_METADATA = {
     'DISTANCE': 'distance',
 }
 
+# Permissions assigned to node maintainers.
+NODE_PERMISSIONS = ['change_node', 'delete_node', 'reset_node', 'generate_firmware']
+
+# Number of nodes configured in a single transaction.
+DEFAULT_BATCH_SIZE = 100
+
+
+class PoolIndex(object):
+    """
+    Prefix index of top-level pools.
+    """
+
+    def __init__(self, pools):
+        """
+        Class constructor.
+
+        :param pools: A list of IpPool instances
+        """
+
+        self._tree = radix.Radix()
+        for pool in pools:
+            network = pool.to_ip_network()
+            self._tree.add(network=str(network.network), masklen=network.prefixlen).data['pool'] = pool
+
+    def get_pool(self, subnet):
+        """
+        Returns the most specific pool containing a subnet.
+
+        :param subnet: ipaddr.IPNetwork instance
+        """
+
+        node = self._tree.search_best(network=str(subnet.network), masklen=subnet.prefixlen)
+        if node is None:
+            raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet)
+
+        return node.data['pool']
+
+
+class PoolReservations(object):
+    """
+    Reserves subnets of newly imported top-level pools in memory, following
+    the buddy allocation scheme of ``IpPool.reserve_subnet``. The resulting
+    pool hierarchy is then stored using a bulk insert for each level, instead
+    of a number of queries for every level of every reservation.
+    """
+
+    def __init__(self):
+        self._trees = collections.OrderedDict()
+        self._reserved = []
+
+    def count(self):
+        return len(self._reserved)
+
+    def _create_entry(self, network):
+        return {
+            'network': network,
+            'status': pool_models.IpPoolStatus.Free,
+            'children': None,
+            'model': None,
+        }
+
+    def _reserve(self, entry, subnet):
+        if subnet not in entry['network']:
+            return None
+
+        if subnet == entry['network'] and entry['status'] == pool_models.IpPoolStatus.Free:
+            entry['status'] = pool_models.IpPoolStatus.Full
+            return entry
+
+        alloc = None
+        if entry['children'] is not None:
+            for child in entry['children']:
+                if child['status'] not in (pool_models.IpPoolStatus.Free, pool_models.IpPoolStatus.Partial):
+                    continue
+
+                alloc = self._reserve(child, subnet)
+                if alloc:
+                    break
+            else:
+                return None
+
+            if all([child['status'] == pool_models.IpPoolStatus.Full for child in entry['children']]):
+                entry['status'] = pool_models.IpPoolStatus.Full
+        elif entry['status'] == pool_models.IpPoolStatus.Free:
+            # Split into two halves.
+            entry['children'] = [self._create_entry(network) for network in entry['network'].subnet()]
+            entry['status'] = pool_models.IpPoolStatus.Partial
+            for child in entry['children']:
+                alloc = self._reserve(child, subnet)
+                if alloc:
+                    break
+            else:
+                entry['children'] = None
+                entry['status'] = pool_models.IpPoolStatus.Free
+
+        return alloc
+
+    def reserve(self, pool, subnet):
+        """
+        Reserves a subnet in a top-level pool.
+
+        :param pool: Top-level IpPool instance without any child pools
+        :param subnet: ipaddr.IPNetwork instance
+        :return: True if the subnet has been reserved
+        """
+
+        if subnet.prefixlen == 31:
+            return False
+
+        if subnet.prefixlen < pool.prefix_length_minimum or subnet.prefixlen > pool.prefix_length_maximum:
+            return False
+
+        if pool.pk not in self._trees:
+            self._trees[pool.pk] = self._create_entry(pool.to_ip_network())
+            self._trees[pool.pk]['model'] = pool
+
+        entry = self._reserve(self._trees[pool.pk], subnet)
+        if entry is None:
+            return False
+
+        self._reserved.append((str(subnet), entry))
+        return True
+
+    def save(self):
+        """
+        Stores all reserved pools.
+
+        :return: A dictionary mapping reserved subnets to IpPool instances
+        """
+
+        level = self._trees.values()
+        for entry in level:
+            pool = entry['model']
+            if pool.status != entry['status']:
+                pool.status = entry['status']
+                pool_models.IpPool.objects.filter(pk=pool.pk).update(status=pool.status)
+
+        while level:
+            children = []
+            for entry in level:
+                for child in entry['children'] or []:
+                    network = child['network']
+                    child['model'] = pool_models.IpPool(
+                        parent=entry['model'],
+                        top_level_id=entry['model'].top_level_id,
+                        family=entry['model'].family,
+                        network=str(network.network),
+                        prefix_length=network.prefixlen,
+                        ip_subnet='%s/%s' % (network.network, network.prefixlen),
+                        status=child['status'],
+                    )
+                    children.append(child)
+
+            bulk.create([child['model'] for child in children])
+            level = children
+
+        return dict([(subnet, entry['model']) for subnet, entry in self._reserved])
+
+
+class Checkpoint(object):
+    """
+    Import progress, stored in a local file so that an interrupted import
+    may be resumed.
+    """
+
+    def __init__(self, filename):
+        """
+        Class constructor.
+
+        :param filename: Checkpoint filename
+        """
+
+        self.filename = filename
+        self.state = {}
+
+        if os.path.exists(filename):
+            with open(filename, 'r') as checkpoint_file:
+                self.state = json.load(checkpoint_file)
+
+    def save(self):
+        """
+        Atomically stores import progress.
+        """
+
+        handle, filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)), suffix='.tmp')
+        with os.fdopen(handle, 'w') as checkpoint_file:
+            json.dump(self.state, checkpoint_file)
+        os.rename(filename, self.filename)
+
 
 class Command(base.BaseCommand):
     help = "Imports legacy nodewatcher v2 data."
@@ -203,6 +400,18 @@ class Command(base.BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('filename', type=str)
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help="Number of nodes configured in a single transaction.",
+        )
+        parser.add_argument(
+            '--checkpoint', type=str, default=None,
+            help="File where import progress is recorded, defaults to the export filename with a .checkpoint suffix.",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Import a single batch of nodes, roll back all changes and report the estimated runtime.",
+        )
 
     def handle(self, *args, **options):
         # Validate that all the required applications are registered.
@@ -219,15 +428,162 @@ class Command(base.BaseCommand):
         self.stdout.write('Loading export file \'%s\'...\n' % input_filename)
         data = json.load(input_file)
 
+        checkpoint = Checkpoint(options['checkpoint'] or '%s.checkpoint' % input_filename)
+        batch_size = max(1, options['batch_size'])
+        self._ssids = {}
+        self._antennas = {}
+
+        if not options['dry_run']:
+            self.run_import(data, checkpoint, batch_size)
+            self.stdout.write('Import completed.\n')
+            return
+
+        # Checkpoints are only stored on commit, so they are discarded together with all changes.
         with transaction.atomic():
-            self.import_users(data)
-            self.import_pools(data)
-            self.import_projects(data)
-            self.import_vpn_servers(data)
-            self.import_dns_servers(data)
-            self.import_nodes(data)
+            base_duration, configured, configure_duration, remaining = self.run_import(
+                data, checkpoint, batch_size, sample=batch_size
+            )
+            transaction.set_rollback(True)
+
+        per_node = configure_duration / configured if configured else 0.0
+        estimate = base_duration + per_node * (configured + remaining)
+        self.stdout.write('Dry run completed, all changes have been rolled back.\n')
+        self.stdout.write('  o Base import: %.1f seconds.\n' % base_duration)
+        self.stdout.write('  o Node configuration: %.3f seconds per node, %d nodes.\n' % (per_node, configured + remaining))
+        self.stdout.write('Estimated runtime: %s.\n' % datetime.timedelta(seconds=int(estimate)))
+
+    def run_import(self, data, checkpoint, batch_size, sample=None):
+        """
+        Imports export data. Users, pools, projects, servers and nodes are imported
+        and all subnets are reserved in a single transaction, after which nodes are
+        configured in batches. Imported objects are recorded in a checkpoint once
+        committed and configured nodes are determined from the database, so a failed
+        import continues where it has been interrupted.
+
+        :param data: Export data
+        :param checkpoint: Checkpoint instance
+        :param batch_size: Number of nodes configured in a single transaction
+        :param sample: Optional number of nodes after which configuration stops
+        :return: A tuple (base import duration, number of configured nodes,
+            configuration duration, number of remaining nodes)
+        """
+
+        start = time.time()
+        if checkpoint.state.get('base', False):
+            self.stdout.write('Resuming import from checkpoint \'%s\'...\n' % checkpoint.filename)
+            self.load_base(data, checkpoint)
+
+            for node in data['nodes'].values():
+                node['_plan'] = self.plan_node(node)
+        else:
+            if core_models.Node.objects.filter(pk__in=[node['uuid'] for node in data['nodes'].values()]).exists():
+                raise base.CommandError(
+                    'Nodes from the export already exist, but checkpoint \'%s\' is missing!' % checkpoint.filename
+                )
+
+            with transaction.atomic():
+                self.import_users(data)
+                self.import_pools(data)
+                self.pool_index = PoolIndex([pool['_model'] for pool in data['pools'].values()])
+                self.import_projects(data)
+                self.import_vpn_servers(data)
+                self.import_dns_servers(data)
+                self.import_nodes(data)
 
-        self.stdout.write('Import completed.\n')
+                checkpoint.state = self.get_base_state(data)
+                transaction.on_commit(checkpoint.save)
+
+        base_duration = time.time() - start
+
+        configured_nodes = self.get_configured_nodes(data)
+        node_names = {}
+        pending = []
+        for node in data['nodes'].values():
+            if node['_plan'] is None:
+                continue
+
+            node_names[node['name']] = node['uuid']
+            if node['uuid'] not in configured_nodes:
+                pending.append(node)
+
+        self.stdout.write('Configuring %d nodes (%d already configured)...\n' % (len(pending), len(configured_nodes)))
+
+        start = time.time()
+        configured = 0
+        while pending and (sample is None or configured < sample):
+            batch = pending[:batch_size]
+            pending = pending[batch_size:]
+
+            with transaction.atomic():
+                self.configure_nodes(data, batch, node_names)
+
+            configured += len(batch)
+            self.stdout.write('  o Configured %d/%d nodes.\n' % (
+                len(configured_nodes) + configured, len(configured_nodes) + configured + len(pending)
+            ))
+
+        return base_duration, configured, time.time() - start, len(pending)
+
+    def get_base_state(self, data):
+        """
+        Returns checkpoint state identifying imported objects.
+        """
+
+        return {
+            'base': True,
+            'users': dict([(key, user['_model'].pk) for key, user in data['users'].items()]),
+            'pools': dict([(key, pool['_model'].pk) for key, pool in data['pools'].items()]),
+            'projects': dict([(key, project['_model'].pk) for key, project in data['projects'].items()]),
+            'vpn_servers': [server.pk for server in data['vpn_servers']],
+            'dns_servers': [server.pk for server in data['dns_servers']],
+            'allocations': dict([(subnet, pool.pk) for subnet, pool in data['allocations'].items()]),
+        }
+
+    def load_base(self, data, checkpoint):
+        """
+        Loads objects imported by a previous run and validates that they match
+        the export data and the database.
+        """
+
+        state = checkpoint.state
+
+        def load(model, pks):
+            objects = model.objects.in_bulk(pks)
+            if len(objects) != len(set(pks)):
+                raise base.CommandError(
+                    'Checkpoint \'%s\' does not match the database, remove it to start a new import!' % checkpoint.filename
+                )
+            return objects
+
+        for key, model in (('users', auth_models.User), ('pools', pool_models.IpPool), ('projects', project_models.Project)):
+            if set(state[key].keys()) != set(data[key].keys()):
+                raise base.CommandError('Checkpoint \'%s\' does not match the export file!' % checkpoint.filename)
+
+            objects = load(model, state[key].values())
+            for legacy_id, pk in state[key].items():
+                data[key][legacy_id]['_model'] = objects[pk]
+
+        servers = load(tunneldigger_models.TunneldiggerServer, state['vpn_servers'])
+        data['vpn_servers'] = [servers[pk] for pk in state['vpn_servers']]
+        servers = load(dns_models.DnsServer, state['dns_servers'])
+        data['dns_servers'] = [servers[pk] for pk in state['dns_servers']]
+
+        pools = load(pool_models.IpPool, state['allocations'].values())
+        data['allocations'] = dict([(subnet, pools[pk]) for subnet, pk in state['allocations'].items()])
+
+        self.pool_index = PoolIndex([pool['_model'] for pool in data['pools'].values()])
+
+    def get_configured_nodes(self, data):
+        """
+        Returns identifiers of nodes which have already been configured. Nodes are
+        configured in the same transaction as their general configuration is created.
+
+        :param data: Export data
+        """
+
+        return set(core_models.GeneralConfig.objects.filter(
+            root__in=[node['uuid'] for node in data['nodes'].values()],
+        ).values_list('root', flat=True))
 
     def get_date(self, date):
         if date is None:
@@ -353,10 +709,19 @@ class Command(base.BaseCommand):
     def import_nodes(self, data):
         self.stdout.write('Importing %d nodes...\n' % len(data['nodes']))
 
-        # Preprocess nodes and create instances.
-        name_model_map = {}
+        reservations = PoolReservations()
+        nodes = []
         for node in data['nodes'].values():
-            node_mdl = core_models.Node(
+            plan = node['_plan'] = self.plan_node(node)
+            if plan is None:
+                self.stdout.write('  o Skipping node %s (unable to determine router ID).\n' % node['uuid'])
+                continue
+
+            for subnet in plan['subnets']:
+                if not reservations.reserve(self.pool_index.get_pool(subnet), subnet):
+                    raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet)
+
+            nodes.append(core_models.Node(
                 uuid=node['uuid'],
                 registry_metadata={
                     'config': {
@@ -364,451 +729,530 @@ class Command(base.BaseCommand):
                         'using_defaults': False,
                     }
                 }
-            )
-            node_mdl.save()
-            node['_model'] = node_mdl
-
-            name_model_map[node['name']] = node_mdl
-
-        for node in data['nodes'].values():
-            # Dead node flag, so we don't allocate any resources for it
-            #dead_node = node['node_type'] == 6
-            dead_node = False
+            ))
+
+        bulk.create(nodes)
+
+        self.stdout.write('Storing %d subnet reservations...\n' % reservations.count())
+        data['allocations'] = reservations.save()
+
+    def get_uplink_ports(self, device):
+        """
+        Returns a tuple (WAN port, LAN port) of a device.
+        """
+
+        wan_port = None
+        lan_port = None
+        for switch in device.switches:
+            preset = switch.get_preset('default')
+            for vlan in preset.vlans:
+                if vlan.identifier == 'wan0' and not wan_port:
+                    wan_port = switch.get_port_identifier(vlan.vlan)
+                if vlan.identifier == 'lan0' and not lan_port:
+                    lan_port = switch.get_port_identifier(vlan.vlan)
+
+        if not wan_port:
+            wan_port = device.get_port('wan0')
+            if wan_port:
+                wan_port = wan_port.identifier
+
+        if not lan_port:
+            lan_port = device.get_port('lan0')
+            if lan_port:
+                lan_port = lan_port.identifier
+
+        return wan_port, lan_port
+
+    def plan_node(self, node):
+        """
+        Determines subnets and device settings of a node without accessing the
+        database, so that all subnets may be reserved up front.
+
+        :param node: Exported node
+        :return: Plan dictionary or None if the node should be skipped
+        """
+
+        # Dead node flag, so we don't allocate any resources for it
+        #dead_node = node['node_type'] == 6
+        dead_node = False
+
+        # Determine router ID
+        try:
+            subnet_mesh = [x for x in node['subnets'] if x['gen_iface_type'] == 2][0]
+        except IndexError:
+            return None
 
-            # Determine router ID
+        try:
+            translated_subnets = SUBNET_SIZE_TRANSLATION[subnet_mesh['cidr']]
+        except KeyError:
+            raise base.CommandError('Unable to translate subnet for node %s.' % node['uuid'])
+
+        # Allocate Router-ID based on subnet translation
+        subnet_mesh = ipaddr.IPNetwork('%s/%s' % (subnet_mesh['subnet'], translated_subnets['rid']))
+
+        plan = {
+            'dead': dead_node,
+            'subnet_mesh': subnet_mesh,
+            'subnet_ap': None,
+            'subnets_lan': [],
+            'subnets': [],
+            'metadata': {},
+            'backbone': False,
+        }
+
+        if dead_node:
+            return plan
+
+        plan['subnets'].append(subnet_mesh)
+        if not node['profile']:
+            return plan
+
+        general = cgm_models.CgmGeneralConfig(platform='openwrt', router=ROUTER_MAP[node['profile']['template']])
+        device = plan['device'] = general.get_device()
+
+        # Parse any metadata contained in notes.
+        metadata = plan['metadata']
+        for notes_line in node['notes'].split('\n'):
+            for key, meta_key in NODE_NOTES_METADATA.items():
+                if notes_line.startswith('%s:' % key):
+                    metadata[meta_key] = notes_line.split(':')[1].strip()
+
+        # Determine whether the imported node should be configured as AP/STA.
+        plan['backbone'] = 'ap_ssid' in metadata or 'sta_ssid' in metadata
+
+        # Client AP subnet.
+        dsc_radio = device.get_radio('wifi0')
+        if not plan['backbone'] and translated_subnets['clients'] is not None and \
+                dsc_radio.has_feature(cgm_devices.DeviceRadio.MultipleSSID):
+            subnet_ap = ipaddr.IPNetwork('%s/%s' % (subnet_mesh.ip, translated_subnets['clients'] - 1))
+            plan['subnet_ap'] = list(subnet_ap.iter_subnets())[1]
+            plan['subnets'].append(plan['subnet_ap'])
+
+        # LAN subnets.
+        plan['wan_port'], plan['lan_port'] = self.get_uplink_ports(device)
+        if plan['lan_port'] and plan['subnet_ap'] is None:
+            for subnet in node['subnets']:
+                if subnet['gen_iface_type'] != 0:
+                    continue
+
+                subnet_lan = ipaddr.IPNetwork('%(subnet)s/%(cidr)s' % subnet)
+                plan['subnets_lan'].append(subnet_lan)
+                plan['subnets'].append(subnet_lan)
+
+        return plan
+
+    def get_ssid(self, project, purpose):
+        """
+        Returns a project's SSID for the given purpose.
+        """
+
+        key = (project.pk, purpose)
+        if key not in self._ssids:
+            self._ssids[key] = project.ssids.get(purpose=purpose)
+
+        return self._ssids[key]
+
+    def get_antenna(self, router):
+        """
+        Returns the internal antenna of a router or None.
+        """
+
+        if router not in self._antennas:
             try:
-                subnet_mesh = [x for x in node['subnets'] if x['gen_iface_type'] == 2][0]
-            except IndexError:
-                self.stdout.write('  o Skipping node %s (unable to determine router ID).\n' % node['uuid'])
+                self._antennas[router] = antenna_models.Antenna.objects.get(internal_for=router, internal_id='a1')
+            except antenna_models.Antenna.DoesNotExist:
+                self._antennas[router] = None
+
+        return self._antennas[router]
+
+    def get_location(self, project):
+        """
+        Returns a tuple (city, country) of nodes in a project.
+        """
+
+        if project.name in [u'Števerjan']:
+            return u'Števerjan', 'IT'
+        elif project.name in [u'Maribor', u'Murska Sobota', u'Kranj', u'Sežana', u'Slovenska Bistrica', u'Haloze', u'Vipava']:
+            return project.name, 'SI'
+        elif project.name in [u'London']:
+            return project.name, 'GB'
+        elif project.name in [u'Croatia']:
+            return '', 'HR'
+        elif project.name in [u'Dolenjska']:
+            return '', 'SI'
+        else:
+            return 'Ljubljana', 'SI'
+
+    def configure_node(self, data, node, node_mdl, node_names):
+        """
+        Returns unsaved registry items of a node.
+
+        :param data: Export data
+        :param node: Exported node
+        :param node_mdl: Node instance
+        :param node_names: A dictionary mapping node names to node identifiers
+        """
+
+        plan = node['_plan']
+        items = []
+
+        def create(model, **kwargs):
+            instance = model(root=node_mdl, **kwargs)
+            items.append(instance)
+            return instance
+
+        def allocate(model, subnet, **kwargs):
+            return create(
+                model,
+                family='ipv4',
+                pool=self.pool_index.get_pool(subnet),
+                prefix_length=subnet.prefixlen,
+                allocation=data['allocations'][str(subnet)],
+                **kwargs
+            )
 
-                node['_model'].delete()
-                node['_model'] = None
-                continue
+        # Router ID
+        if not plan['dead']:
+            routerid = allocate(pool_models.AllocatedIpRouterIdConfig, plan['subnet_mesh'])
+            # Bulk creation bypasses save, which would otherwise set the router ID.
+            routerid.rid_family = routerid.get_routerid_family()
+            routerid.router_id = routerid.get_routerid()
+
+        # Last seen / first seen
+        create(
+            monitor_models.GeneralMonitor,
+            first_seen=self.get_date(node['first_seen']),
+            last_seen=self.get_date(node['last_seen']),
+        )
+
+        # Type config
+        create(
+            type_models.TypeConfig,
+            type='backbone' if plan['backbone'] else TYPE_MAP[node['node_type']],
+        )
+
+        # Project config
+        project = data['projects'][str(node['project_id'])]['_model']
+        create(
+            project_models.ProjectConfig,
+            project=project,
+        )
+
+        # Location config
+        city, country = self.get_location(project)
+        create(
+            location_models.LocationConfig,
+            address=node['location'] or '',
+            city=city,
+            country=country,
+            timezone='Europe/Ljubljana',
+            altitude=0,
+            geolocation='POINT(%f %f)' % (node['geo_long'], node['geo_lat']) if node['geo_lat'] else None,
+        )
+
+        # Description config
+        create(
+            dsc_models.DescriptionConfig,
+            notes=node['notes'] or '',
+            url=node['url'] or ''
+        )
+
+        # Role config.
+        role_config = create(role_models.RoleConfig)
+        role_config.roles = []
+        if node['system_node']:
+            role_config.roles.append('system')
+        if node['border_router']:
+            role_config.roles.append('border-router')
+        if node['vpn_server']:
+            role_config.roles.append('vpn-server')
+        if node['redundancy_req']:
+            role_config.roles.append('redundancy-required')
+
+        # HTTP telemetry source config.
+        create(
+            telemetry_http_models.HttpTelemetrySourceConfig,
+            source='poll',
+        )
+
+        # Node identity config.
+        create(
+            identity_base_models.IdentityConfig,
+            trust_policy='first',
+            store_unknown=True,
+        )
+
+        if not node['profile'] or plan['dead']:
+            create(
+                core_models.GeneralConfig,
+                name=node['name'],
+            )
+            return items
+
+        router = ROUTER_MAP[node['profile']['template']]
+        create(
+            cgm_models.CgmGeneralConfig,
+            name=node['name'],
+            platform='openwrt',
+            router=router,
+        )
+        device = plan['device']
+        metadata = plan['metadata']
+
+        # Password authentication config
+        create(
+            cgm_models.PasswordAuthenticationConfig,
+            password=node['profile']['root_pass'],
+        )
+
+        # Bridge for clients.
+        iface_clients_bridge = None
+
+        if plan['backbone']:
+            # Backbone node.
+            radio_wifi = create(
+                cgm_models.WifiRadioDeviceConfig,
+                wifi_radio='wifi0',
+                protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
+                channel_width='ht20',
+                channel=('ch%d' % int(metadata['channel'])) if metadata['channel'] != 'auto' else None,
+                antenna_connector=None,
+                ack_distance=int(metadata['distance']) if 'distance' in metadata else None,
+                tx_power=int(metadata['tx_power']) if 'tx_power' in metadata else None,
+            )
 
-            try:
-                translated_subnets = SUBNET_SIZE_TRANSLATION[subnet_mesh['cidr']]
-            except KeyError:
-                raise base.CommandError('Unable to translate subnet for node %s.' % node['uuid'])
+            if 'ap_ssid' in metadata:
+                # AP interface.
+                create(
+                    cgm_models.WifiInterfaceConfig,
+                    device=radio_wifi,
+                    mode='ap',
+                    essid=metadata['ap_ssid'],
+                    routing_protocols=['olsr', 'babel'],
+                )
+            else:
+                # STA interface.
+                create(
+                    cgm_models.WifiInterfaceConfig,
+                    device=radio_wifi,
+                    mode='sta',
+                    essid=metadata['sta_ssid'],
+                    connect_to_id=node_names[metadata['sta_link']],
+                    routing_protocols=['olsr', 'babel'],
+                )
+        else:
+            # Wireless interface config
+            radio_wifi = create(
+                cgm_models.WifiRadioDeviceConfig,
+                wifi_radio='wifi0',
+                protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
+                channel_width='ht20',
+                channel='ch%d' % node['profile']['channel'],
+                antenna_connector=None,
+            )
 
-            # Allocate Router-ID based on subnet translation
-            subnet_mesh['cidr'] = translated_subnets['rid']
-            subnet_mesh = ipaddr.IPNetwork('%(subnet)s/%(cidr)s' % subnet_mesh)
-            try:
-                pool_mesh = [x['_model'] for x in data['pools'].values() if subnet_mesh in x['_model']][0]
-            except IndexError:
-                raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet_mesh)
+            # Mesh interface
+            ssid = self.get_ssid(project, 'mesh')
+            create(
+                cgm_models.WifiInterfaceConfig,
+                device=radio_wifi,
+                mode='mesh',
+                essid=ssid.essid,
+                bssid=ssid.bssid,
+                routing_protocols=['olsr', 'babel'],
+            )
 
-            if not dead_node:
-                allocation = pool_mesh.reserve_subnet(str(subnet_mesh.ip), subnet_mesh.prefixlen)
-                if allocation is None:
-                    raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet_mesh)
+            # Client AP interface
+            if plan['subnet_ap'] is not None:
+                # In version 2 AP and LAN were bridged, so we also create a bridge on import.
+                iface_clients_bridge = create(
+                    cgm_models.BridgeInterfaceConfig,
+                    name='clients0',
+                    routing_protocols=['olsr', 'babel'],
+                )
 
-            node_mdl = node['_model']
+                allocate(
+                    cgm_models.AllocatedNetworkConfig,
+                    plan['subnet_ap'],
+                    interface=iface_clients_bridge,
+                    description='AP-LAN Client Access',
+                    routing_announces=['olsr', 'babel'],
+                    lease_type='dhcp',
+                    lease_duration='15min',
+                )
 
-            # Router ID
-            if not dead_node:
-                node_mdl.config.core.routerid(
-                    create=pool_models.AllocatedIpRouterIdConfig,
-                    family='ipv4',
-                    pool=pool_mesh,
-                    prefix_length=subnet_mesh.prefixlen,
-                    allocation=allocation,
-                ).save()
+                # Create the AP VIF and put it into the bridge.
+                ssid = self.get_ssid(project, 'ap')
+                iface_ap = create(
+                    cgm_models.WifiInterfaceConfig,
+                    device=radio_wifi,
+                    mode='ap',
+                    essid=ssid.essid,
+                )
 
-            # Assign default permissions
-            maintainer = data['users'][str(node['owner_id'])]['_model']
-            shortcuts.assign_perm('change_node', maintainer, node_mdl)
-            shortcuts.assign_perm('delete_node', maintainer, node_mdl)
-            shortcuts.assign_perm('reset_node', maintainer, node_mdl)
-            shortcuts.assign_perm('generate_firmware', maintainer, node_mdl)
-
-            # Last seen / first seen
-            node_mdl.monitoring.core.general(
-                create=monitor_models.GeneralMonitor,
-                first_seen=self.get_date(node['first_seen']),
-                last_seen=self.get_date(node['last_seen']),
+                create(
+                    cgm_models.BridgedNetworkConfig,
+                    interface=iface_ap,
+                    description='',
+                    bridge=iface_clients_bridge,
+                )
+
+        # Antenna
+        antenna = self.get_antenna(router)
+        if antenna is not None:
+            create(
+                antenna_models.AntennaEquipmentConfig,
+                device=radio_wifi,
+                antenna=antenna,
             )
 
-            # Type config
-            node_mdl.config.core.type(
-                create=type_models.TypeConfig,
-                type=TYPE_MAP[node['node_type']],
+        # Switch configuration.
+        for switch in device.switches:
+            switch_cfg = create(
+                cgm_models.SwitchConfig,
+                switch=switch.identifier,
+                vlan_preset='default',
             )
 
-            # Project config
-            node_mdl.config.core.project(
-                create=project_models.ProjectConfig,
-                project=data['projects'][str(node['project_id'])]['_model'],
+            preset = switch.get_preset('default')
+            for vlan in preset.vlans:
+                # Create all VLAN configurations.
+                create(
+                    cgm_models.VLANConfig,
+                    switch=switch_cfg,
+                    vlan=vlan.vlan,
+                    name=vlan.description,
+                    ports=vlan.ports,
+                )
+
+        # WAN uplink.
+        uplink_configured = False
+        if plan['wan_port']:
+            iface_wan = create(
+                cgm_models.EthernetInterfaceConfig,
+                eth_port=plan['wan_port'],
+                uplink=True,
             )
+            uplink_configured = True
 
-            # Location config
-            project = node_mdl.config.core.project().project
-            if project.name in [u'Števerjan']:
-                city = u'Števerjan'
-                country = 'IT'
-            elif project.name in [u'Maribor', u'Murska Sobota', u'Kranj', u'Sežana', u'Slovenska Bistrica', u'Haloze', u'Vipava']:
-                city = project.name
-                country = 'SI'
-            elif project.name in [u'London']:
-                city = project.name
-                country = 'GB'
-            elif project.name in [u'Croatia']:
-                city = ''
-                country = 'HR'
-            elif project.name in [u'Dolenjska']:
-                city = ''
-                country = 'SI'
+            if node['profile']['wan_dhcp']:
+                create(
+                    cgm_models.DHCPNetworkConfig,
+                    interface=iface_wan,
+                    description='WAN',
+                )
             else:
-                city = 'Ljubljana'
-                country = 'SI'
-
-            node_mdl.config.core.location(
-                create=location_models.LocationConfig,
-                address=node['location'] or '',
-                city=city,
-                country=country,
-                timezone='Europe/Ljubljana',
-                altitude=0,
-                defaults={
-                    'geolocation': 'POINT(%f %f)' % (node['geo_long'], node['geo_lat']) if node['geo_lat'] else None,
-                }
-            )
+                create(
+                    cgm_models.StaticNetworkConfig,
+                    interface=iface_wan,
+                    description='WAN',
+                    family='ipv4',
+                    address='%(wan_ip)s/%(wan_cidr)s' % node['profile'],
+                    gateway=node['profile']['wan_gw']
+                )
 
-            # Description config
-            node_mdl.config.core.description(
-                create=dsc_models.DescriptionConfig,
-                notes=node['notes'] or '',
-                url=node['url'] or ''
+        # LAN subnets.
+        if plan['lan_port']:
+            iface_lan = create(
+                cgm_models.EthernetInterfaceConfig,
+                eth_port=plan['lan_port'],
             )
 
-            # Role config.
-            role_config = node_mdl.config.core.roles(create=role_models.RoleConfig)
-            role_config.roles = []
-            if node['system_node']:
-                role_config.roles.append('system')
-            if node['border_router']:
-                role_config.roles.append('border-router')
-            if node['vpn_server']:
-                role_config.roles.append('vpn-server')
-            if node['redundancy_req']:
-                role_config.roles.append('redundancy-required')
-            role_config.save()
-
-            # HTTP telemetry source config.
-            node_mdl.config.core.telemetry.http(
-                create=telemetry_http_models.HttpTelemetrySourceConfig,
-                source='poll',
-            ).save()
-
-            # Node identity config.
-            node_mdl.config.core.identity(
-                create=identity_base_models.IdentityConfig,
-                trust_policy='first',
-                store_unknown=True,
-            ).save()
-
-            if node['profile'] and not dead_node:
-                general = node_mdl.config.core.general(
-                    create=cgm_models.CgmGeneralConfig,
-                    name=node['name'],
-                    platform='openwrt',
-                    router=ROUTER_MAP[node['profile']['template']],
+            if iface_clients_bridge is not None:
+                # LAN interface should be a part of the clients bridge.
+                create(
+                    cgm_models.BridgedNetworkConfig,
+                    interface=iface_lan,
+                    description='',
+                    bridge=iface_clients_bridge,
                 )
-                device = general.get_device()
-
-                # Password authentication config
-                node_mdl.config.core.authentication(
-                    create=cgm_models.PasswordAuthenticationConfig,
-                    password=node['profile']['root_pass'],
-                ).save()
-
-                # Bridge for clients.
-                iface_clients_bridge = None
-
-                # Parse any metadata contained in notes.
-                metadata = {}
-                for notes_line in node['notes'].split('\n'):
-                    for key, meta_key in NODE_NOTES_METADATA.items():
-                        if notes_line.startswith('%s:' % key):
-                            metadata[meta_key] = notes_line.split(':')[1].strip()
-
-                # Determine whether the imported node should be configured as AP/STA.
-                if 'ap_ssid' in metadata or 'sta_ssid' in metadata:
-                    # Backbone node.
-                    type_config = node_mdl.config.core.type()
-                    type_config.type = 'backbone'
-                    type_config.save()
-
-                    radio_wifi = node_mdl.config.core.interfaces(
-                        create=cgm_models.WifiRadioDeviceConfig,
-                        wifi_radio='wifi0',
-                        protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
-                        channel_width='ht20',
-                        channel=('ch%d' % int(metadata['channel'])) if metadata['channel'] != 'auto' else None,
-                        antenna_connector=None,
-                        ack_distance=int(metadata['distance']) if 'distance' in metadata else None,
-                        tx_power=int(metadata['tx_power']) if 'tx_power' in metadata else None,
-                    )
-                    radio_wifi.save()
-
-                    if 'ap_ssid' in metadata:
-                        # AP interface.
-                        iface_ap = node_mdl.config.core.interfaces(
-                            create=cgm_models.WifiInterfaceConfig,
-                            device=radio_wifi,
-                            mode='ap',
-                            essid=metadata['ap_ssid'],
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_ap.save()
-                    elif 'sta_ssid' in metadata:
-                        # STA interface.
-                        iface_sta = node_mdl.config.core.interfaces(
-                            create=cgm_models.WifiInterfaceConfig,
-                            device=radio_wifi,
-                            mode='sta',
-                            essid=metadata['sta_ssid'],
-                            connect_to=name_model_map[metadata['sta_link']],
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_sta.save()
-                    else:
-                        assert False
-                else:
-                    # Wireless interface config
-                    radio_wifi = node_mdl.config.core.interfaces(
-                        create=cgm_models.WifiRadioDeviceConfig,
-                        wifi_radio='wifi0',
-                        protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
-                        channel_width='ht20',
-                        channel='ch%d' % node['profile']['channel'],
-                        antenna_connector=None,
-                    )
-                    radio_wifi.save()
-
-                    # Mesh interface
-                    ssid = project.ssids.get(purpose='mesh')
-                    iface_mesh = node_mdl.config.core.interfaces(
-                        create=cgm_models.WifiInterfaceConfig,
-                        device=radio_wifi,
-                        mode='mesh',
-                        essid=ssid.essid,
-                        bssid=ssid.bssid,
-                        routing_protocols=['olsr', 'babel'],
-                    )
-                    iface_mesh.save()
-
-                    # Client AP interface
-                    dsc_radio = device.get_radio('wifi0')
-                    if translated_subnets['clients'] is not None and dsc_radio.has_feature(cgm_devices.DeviceRadio.MultipleSSID):
-                        # In version 2 AP and LAN were bridged, so we also create a bridge on import.
-                        iface_clients_bridge = node_mdl.config.core.interfaces(
-                            create=cgm_models.BridgeInterfaceConfig,
-                            name='clients0',
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_clients_bridge.save()
-
-                        subnet_ap = ipaddr.IPNetwork('%s/%s' % (subnet_mesh.ip, translated_subnets['clients'] - 1))
-                        subnet_ap = list(subnet_ap.iter_subnets())[1]
-                        try:
-                            pool_ap = [x['_model'] for x in data['pools'].values() if subnet_ap in x['_model']][0]
-                        except IndexError:
-                            raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet_ap)
-
-                        allocation = pool_ap.reserve_subnet(str(subnet_ap.ip), subnet_ap.prefixlen)
-                        if allocation is None:
-                            raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet_ap)
-
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.AllocatedNetworkConfig,
-                            interface=iface_clients_bridge,
-                            description='AP-LAN Client Access',
-                            routing_announces=['olsr', 'babel'],
-                            family='ipv4',
-                            pool=pool_ap,
-                            prefix_length=subnet_ap.prefixlen,
-                            allocation=allocation,
-                            lease_type='dhcp',
-                            lease_duration='15min',
-                        ).save()
-
-                        # Create the AP VIF and put it into the bridge.
-                        ssid = project.ssids.get(purpose='ap')
-                        iface_ap = node_mdl.config.core.interfaces(
-                            create=cgm_models.WifiInterfaceConfig,
-                            device=radio_wifi,
-                            mode='ap',
-                            essid=ssid.essid,
-                        )
-                        iface_ap.save()
-
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.BridgedNetworkConfig,
-                            interface=iface_ap,
-                            description='',
-                            bridge=iface_clients_bridge,
-                        ).save()
-
-                # Antenna
-                try:
-                    node_mdl.config.core.equipment.antenna(
-                        create=antenna_models.AntennaEquipmentConfig,
-                        device=radio_wifi,
-                        antenna=antenna_models.Antenna.objects.get(
-                            internal_for=ROUTER_MAP[node['profile']['template']],
-                            internal_id='a1'
-                        ),
-                    ).save()
-                except antenna_models.Antenna.DoesNotExist:
-                    pass
-
-                # Switch configuration.
-                wan_port = None
-                lan_port = None
-                for switch in device.switches:
-                    switch_cfg = node_mdl.config.core.switch(
-                        create=cgm_models.SwitchConfig,
-                        switch=switch.identifier,
-                        vlan_preset='default',
+            elif plan['subnets_lan']:
+                for subnet_lan in plan['subnets_lan']:
+                    allocate(
+                        cgm_models.AllocatedNetworkConfig,
+                        subnet_lan,
+                        interface=iface_lan,
+                        description='LAN',
                     )
-                    switch_cfg.save()
-
-                    preset = switch.get_preset('default')
-                    for vlan in preset.vlans:
-                        # Create all VLAN configurations.
-                        node_mdl.config.core.switch.vlan(
-                            create=cgm_models.VLANConfig,
-                            switch=switch_cfg,
-                            vlan=vlan.vlan,
-                            name=vlan.description,
-                            ports=vlan.ports,
-                        ).save()
-
-                        if vlan.identifier == 'wan0' and not wan_port:
-                            wan_port = switch.get_port_identifier(vlan.vlan)
-                        if vlan.identifier == 'lan0' and not lan_port:
-                            lan_port = switch.get_port_identifier(vlan.vlan)
-
-                # Determine WAN and LAN ports.
-                if not wan_port:
-                    wan_port = device.get_port('wan0')
-                    if wan_port:
-                        wan_port = wan_port.identifier
-
-                if not lan_port:
-                    lan_port = device.get_port('lan0')
-                    if lan_port:
-                        lan_port = lan_port.identifier
-
-                # WAN uplink.
-                uplink_configured = False
-                if wan_port:
-                    iface_wan = node_mdl.config.core.interfaces(
-                        create=cgm_models.EthernetInterfaceConfig,
-                        eth_port=wan_port,
-                        uplink=True,
-                    )
-                    iface_wan.save()
-                    uplink_configured = True
-
-                    if node['profile']['wan_dhcp']:
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.DHCPNetworkConfig,
-                            interface=iface_wan,
-                            description='WAN',
-                        ).save()
-                    else:
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.StaticNetworkConfig,
-                            interface=iface_wan,
-                            description='WAN',
-                            family='ipv4',
-                            address='%(wan_ip)s/%(wan_cidr)s' % node['profile'],
-                            gateway=node['profile']['wan_gw']
-                        ).save()
-
-                # LAN subnets.
-                if lan_port:
-                    iface_lan = node_mdl.config.core.interfaces(
-                        create=cgm_models.EthernetInterfaceConfig,
-                        eth_port=lan_port,
-                    )
-                    iface_lan.save()
-
-                    if iface_clients_bridge is not None:
-                        # LAN interface should be a part of the clients bridge.
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.BridgedNetworkConfig,
-                            interface=iface_lan,
-                            description='',
-                            bridge=iface_clients_bridge,
-                        ).save()
-                    else:
-                        have_subnets = False
-                        for subnet in node['subnets']:
-                            if subnet['gen_iface_type'] != 0:
-                                continue
-
-                            subnet_lan = ipaddr.IPNetwork('%(subnet)s/%(cidr)s' % subnet)
-                            try:
-                                pool_lan = [x['_model'] for x in data['pools'].values() if subnet_lan in x['_model']][0]
-                            except IndexError:
-                                raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet_lan)
-
-                            allocation = pool_lan.reserve_subnet(str(subnet_lan.ip), subnet_lan.prefixlen)
-                            if allocation is None:
-                                raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet_lan)
-
-                            subnet_lan = node_mdl.config.core.interfaces.network(
-                                create=cgm_models.AllocatedNetworkConfig,
-                                interface=iface_lan,
-                                description='LAN',
-                                family='ipv4',
-                                pool=pool_lan,
-                                prefix_length=subnet_lan.prefixlen,
-                                allocation=allocation,
-                            )
-                            subnet_lan.save()
-                            have_subnets = True
-
-                        if not have_subnets:
-                            # If no subnets are configured, designate the interface for routing
-                            iface_lan.routing_protocols = ['olsr', 'babel']
-                            iface_lan.save()
-
-                # VPN (only configure when an uplink exists)
-                if node['profile']['use_vpn'] and uplink_configured:
-                    for server in data['vpn_servers']:
-                        iface_vpn = node_mdl.config.core.interfaces(
-                            create=tunneldigger_models.TunneldiggerInterfaceConfig,
-                            server=server,
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_vpn.save()
-
-                        # Throughput limits
-                        if node['profile']['vpn_egress_limit'] or node['profile']['vpn_ingress_limit']:
-                            node_mdl.config.core.interfaces.qos(
-                                create=qos_models.InterfaceQoSConfig,
-                                interface=iface_vpn,
-                                download=node['profile']['vpn_ingress_limit'] or 0,
-                                upload=node['profile']['vpn_egress_limit'] or 0,
-                            ).save()
-
-                # DNS servers.
-                for server in data['dns_servers']:
-                    node_mdl.config.core.servers.dns(
-                        create=dns_models.DnsServerConfig,
-                        server=server,
-                    ).save()
-
-                # Optional packages
-                if node['profile']['packages']:
-                    # TODO: Implement configuration for packages that were available in v2
-                    pass
             else:
-                node_mdl.config.core.general(
-                    create=core_models.GeneralConfig,
-                    name=node['name'],
+                # If no subnets are configured, designate the interface for routing
+                iface_lan.routing_protocols = ['olsr', 'babel']
+
+        # VPN (only configure when an uplink exists)
+        if node['profile']['use_vpn'] and uplink_configured:
+            for server in data['vpn_servers']:
+                iface_vpn = create(
+                    tunneldigger_models.TunneldiggerInterfaceConfig,
+                    server=server,
+                    routing_protocols=['olsr', 'babel'],
                 )
+
+                # Throughput limits
+                if node['profile']['vpn_egress_limit'] or node['profile']['vpn_ingress_limit']:
+                    create(
+                        qos_models.InterfaceQoSConfig,
+                        interface=iface_vpn,
+                        download=node['profile']['vpn_ingress_limit'] or 0,
+                        upload=node['profile']['vpn_egress_limit'] or 0,
+                    )
+
+        # DNS servers.
+        for server in data['dns_servers']:
+            create(
+                dns_models.DnsServerConfig,
+                server=server,
+            )
+
+        # Optional packages
+        if node['profile']['packages']:
+            # TODO: Implement configuration for packages that were available in v2
+            pass
+
+        return items
+
+    def assign_permissions(self, assignments):
+        """
+        Assigns default node permissions using a single query.
+
+        :param assignments: A list of (user, node) tuples
+        """
+
+        content_type = contenttypes_models.ContentType.objects.get_for_model(core_models.Node)
+        permissions = auth_models.Permission.objects.filter(content_type=content_type, codename__in=NODE_PERMISSIONS)
+        if len(permissions) != len(NODE_PERMISSIONS):
+            raise base.CommandError('Node permissions are not installed!')
+
+        guardian_models.UserObjectPermission.objects.bulk_create([
+            guardian_models.UserObjectPermission(
+                user=user,
+                permission=permission,
+                content_type=content_type,
+                object_pk=str(node_mdl.pk),
+            )
+            for user, node_mdl in assignments
+            for permission in permissions
+        ], batch_size=bulk.BATCH_SIZE)
+
+    def configure_nodes(self, data, nodes, node_names):
+        """
+        Creates registry items and permissions of a batch of nodes.
+
+        :param data: Export data
+        :param nodes: A list of exported nodes
+        :param node_names: A dictionary mapping node names to node identifiers
+        """
+
+        node_models = core_models.Node.objects.in_bulk([node['uuid'] for node in nodes])
+
+        items = []
+        assignments = []
+        for node in nodes:
+            node_mdl = node_models[node['uuid']]
+            items.extend(self.configure_node(data, node, node_mdl, node_names))
+
+            # Assign default permissions
+            maintainer = data['users'][str(node['owner_id'])]['_model']
+            assignments.append((maintainer, node_mdl))
+
+        bulk.create_all(items)
+        self.assign_permissions(assignments)
@@ -0,0 +1,254 @@
+import calendar
+import collections
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import traceback
+
+from django.conf import settings
+
+from django_datastream import datastream
+
+# Logger instance
+logger = logging.getLogger('monitor.datastream.downsampling')
+
+# Smoothing factor of per-stream cost and rate estimates.
+ESTIMATE_SMOOTHING = 0.3
+# Lower bound of the rate estimate, so that slow streams still age.
+MINIMUM_RATE = 1e-6
+# Duration in seconds of buckets of the coarsest downsampling granularity (days).
+COARSEST_BUCKET = 86400
+# Assumed cost in seconds of downsampling a stream, when no streams have estimates yet.
+DEFAULT_COST = 1.0
+
+
+def to_epoch(timestamp):
+    if timestamp is None:
+        return None
+
+    if isinstance(timestamp, (int, long, float)):
+        return float(timestamp)
+
+    return calendar.timegm(timestamp.utctimetuple()) + timestamp.microsecond / 1e6
+
+
+def _downsample_chunk(stream_ids):
+    """
+    Downsamples a chunk of streams. Called by the worker pool.
+
+    :param stream_ids: A list of stream identifiers
+    :return: Time in seconds it took to downsample the chunk
+    """
+
+    stream_ids = set(stream_ids)
+    start = time.time()
+    datastream.downsample_streams(filter_stream=lambda stream: str(stream.id) in stream_ids)
+    return time.time() - start
+
+
+class DownsampleScheduler(object):
+    """
+    Splits downsampling into per-stream work items, which are processed in order
+    of their estimated pending work within a time budget. Per-stream estimates
+    are stored in a local file, so that unfinished work carries over to the
+    next cycle.
+
+    For each stream the scheduler keeps the time of its last downsampling, a
+    smoothed cost (seconds needed to downsample it) and a smoothed rate (cost
+    per second of staleness). The priority of a stream is its rate multiplied
+    by its staleness, which means that hot, high-rate streams are processed
+    first, while every stream eventually gets its turn. Streams without new
+    datapoints are only processed once every ``cold_interval`` seconds, and
+    once after the coarsest bucket containing their latest datapoint closes.
+    """
+
+    def __init__(self, path=None, time_budget=None, cold_interval=None):
+        """
+        Class constructor.
+
+        :param path: Optional filename of the scheduler state
+        :param time_budget: Optional time in seconds after which no more work is
+            dispatched in a cycle
+        :param cold_interval: Optional time in seconds between downsampling of
+            streams without new datapoints
+        """
+
+        self.path = path or getattr(settings, 'DATASTREAM_DOWNSAMPLE_STATE', None) or \
+            os.path.join(tempfile.gettempdir(), 'nodewatcher-downsample.json')
+        self.time_budget = time_budget or getattr(settings, 'DATASTREAM_DOWNSAMPLE_TIME_BUDGET', 600)
+        self.cold_interval = cold_interval or getattr(settings, 'DATASTREAM_DOWNSAMPLE_COLD_INTERVAL', 86400)
+
+    def load_state(self):
+        """
+        Returns stored per-stream state.
+        """
+
+        try:
+            with open(self.path, 'r') as state_file:
+                return json.load(state_file)
+        except (IOError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        """
+        Atomically stores per-stream state.
+
+        :param state: State dictionary
+        """
+
+        try:
+            directory = os.path.dirname(self.path)
+            handle, filename = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(handle, 'w') as state_file:
+                json.dump(state, state_file)
+            os.rename(filename, self.path)
+        except (IOError, OSError):
+            logger.warning("Unable to store downsampling state to '%s'." % self.path)
+
+    def plan(self, streams, state, now):
+        """
+        Returns stream identifiers that should be downsampled, ordered by
+        priority.
+
+        :param streams: A list of (stream identifier, latest datapoint epoch or None)
+        :param state: Per-stream state
+        :param now: Current epoch
+        """
+
+        work = []
+        for stream_id, latest_datapoint in streams:
+            stream_state = state.get(stream_id, None)
+            if stream_state is None:
+                # Streams without any estimates come first, so they get estimates.
+                work.append((float('inf'), stream_id))
+                continue
+
+            staleness = now - stream_state['downsampled']
+            if latest_datapoint is not None and latest_datapoint <= stream_state['downsampled']:
+                # Cold stream without new datapoints. Buckets which were still open when it has
+                # last been downsampled must be downsampled once they close.
+                bucket_end = (math.floor(latest_datapoint / COARSEST_BUCKET) + 1) * COARSEST_BUCKET
+                closed = stream_state['downsampled'] < bucket_end <= now
+                if not closed and staleness < self.cold_interval:
+                    continue
+
+            work.append((max(stream_state['rate'], MINIMUM_RATE) * staleness, stream_id))
+
+        work.sort(key=lambda item: item[0], reverse=True)
+        return [stream_id for priority, stream_id in work]
+
+    def next_chunk(self, work, state, budget, max_cost):
+        """
+        Removes and returns streams from the front of the planned work, whose
+        estimated costs fit within the given budget. A stream which is estimated
+        to cost more than ``max_cost`` is returned alone, as it would otherwise
+        never be downsampled.
+
+        :param work: A deque of planned stream identifiers
+        :param state: Per-stream state
+        :param budget: Time in seconds the chunk should fit in
+        :param max_cost: Maximum time in seconds available to a single chunk
+        :return: A list of stream identifiers, empty if no work fits
+        """
+
+        costs = [stream_state['cost'] for stream_state in state.values()]
+        default_cost = sum(costs) / len(costs) if costs else DEFAULT_COST
+
+        chunk = []
+        total = 0.0
+        while work:
+            stream_state = state.get(work[0], None)
+            cost = stream_state['cost'] if stream_state is not None else default_cost
+            if total + cost > budget and (chunk or cost <= max_cost):
+                break
+
+            chunk.append(work.popleft())
+            total += cost
+            if total > budget:
+                break
+
+        return chunk
+
+    def update(self, state, stream_ids, duration, started):
+        """
+        Updates estimates of streams that have been downsampled together.
+
+        :param state: Per-stream state
+        :param stream_ids: A list of downsampled stream identifiers
+        :param duration: Time in seconds it took to downsample the streams
+        :param started: Epoch when downsampling has been dispatched
+        """
+
+        cost = duration / len(stream_ids)
+        for stream_id in stream_ids:
+            stream_state = state.get(stream_id, None)
+            if stream_state is None:
+                state[stream_id] = {'downsampled': started, 'cost': cost, 'rate': 0.0}
+                continue
+
+            elapsed = started - stream_state['downsampled']
+            rate = cost / elapsed if elapsed > 0 else stream_state['rate']
+            stream_state['cost'] += ESTIMATE_SMOOTHING * (cost - stream_state['cost'])
+            stream_state['rate'] += ESTIMATE_SMOOTHING * (rate - stream_state['rate'])
+            stream_state['downsampled'] = started
+
+    def run(self, pool, num_workers):
+        """
+        Performs a single downsampling cycle.
+
+        :param pool: Worker pool
+        :param num_workers: Number of workers in the pool
+        :return: A tuple (number of downsampled streams, number of pending streams)
+        """
+
+        start = time.time()
+        deadline = start + self.time_budget
+
+        streams = [
+            (str(stream['stream_id']), to_epoch(stream.get('latest_datapoint', None)))
+            for stream in datastream.find_streams()
+        ]
+        state = self.load_state()
+
+        # Forget streams which no longer exist.
+        existing = set([stream_id for stream_id, latest_datapoint in streams])
+        for stream_id in state.keys():
+            if stream_id not in existing:
+                del state[stream_id]
+
+        work = collections.deque(self.plan(streams, state, start))
+        max_cost = float(self.time_budget) / num_workers
+
+        downsampled = 0
+        pending = collections.deque()
+        while work or pending:
+            # Keep all workers busy with chunks sized by their estimated costs, so that every
+            # chunk fits within its share of the remaining time budget.
+            while work and len(pending) < num_workers:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+
+                chunk = self.next_chunk(work, state, remaining / num_workers, max_cost)
+                if not chunk:
+                    break
+
+                pending.append((chunk, time.time(), pool.apply_async(_downsample_chunk, [chunk])))
+
+            if not pending:
+                break
+
+            chunk, started, result = pending.popleft()
+            try:
+                self.update(state, chunk, result.get(), started)
+                downsampled += len(chunk)
+            except:
+                logger.warning("Downsample worker failed with exception:")
+                logger.warning(traceback.format_exc())
+
+        self.save_state(state)
+
+        return downsampled, len(work)
@@ -46,5 +46,6 @@ components.partials.get_partial('node_display_partial').add(components.PartialEn
     name='graphs',
     template='nodes/display/graphs.html',
     weight=1000, # Graphs should be towards the end.
+    prefetch=['config:core.location'],
     extra_context=extra_context
 ))
@@ -1,38 +1,177 @@
 import datetime
 import ijson
+import multiprocessing
+import Queue
 import traceback
 import math
+import sys
 import time
 
+from django.conf import settings
 from django.core.management import base
 
+import django_datastream
 from django_datastream import datastream
 
 
+def append_batch(stream, batch):
+    """
+    Appends a batch of datapoints. When the batch cannot be appended as a
+    whole, datapoints are appended one by one and failing ones are skipped.
+
+    :param stream: Datastream instance
+    :param batch: A list of datapoints for append_multiple
+    :return: Number of appended datapoints
+    """
+
+    try:
+        stream.append_multiple(batch)
+        return len(batch)
+    except:
+        pass
+
+    appended = 0
+    for datapoint in batch:
+        try:
+            stream.append(datapoint['stream_id'], datapoint['value'], datapoint['timestamp'])
+            appended += 1
+        except:
+            # Skip datapoints on errors
+            sys.stdout.write("=== WARNING: Skipping datapoint due to exception!\n")
+            sys.stdout.write("--- Exception:\n")
+            sys.stdout.write(traceback.format_exc())
+            sys.stdout.write("\n")
+            sys.stdout.write("--- Datapoint:\n")
+            sys.stdout.write("%s\n" % datapoint['timestamp'])
+            sys.stdout.write(repr(datapoint['value']))
+            sys.stdout.write("\n\n")
+
+    return appended
+
+
+def import_worker(queue, appended):
+    """
+    Worker process, which appends batches of datapoints until it receives
+    None.
+
+    :param queue: Queue of batches
+    :param appended: Shared counter of appended datapoints
+    """
+
+    # Each worker uses its own backend connections.
+    stream = django_datastream.init_datastream(settings.DATASTREAM_BACKEND, settings.DATASTREAM_BACKEND_SETTINGS)
+
+    for batch in iter(queue.get, None):
+        count = append_batch(stream, batch)
+        with appended.get_lock():
+            appended.value += count
+
+
 class Command(base.BaseCommand):
     help = "Imports legacy nodewatcher v2 data into datastream."
     requires_model_validation = True
 
-    def handle(self, *args, **options):
-        if len(args) != 1:
-            raise base.CommandError('Missing filename argument!')
+    def add_arguments(self, parser):
+        parser.add_argument('filename', type=str, help="File with exported nodewatcher v2 data.")
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="Number of worker processes appending datapoints.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Maximum number of datapoints of a single stream appended together.",
+        )
+        parser.add_argument(
+            '--max-pending',
+            type=int,
+            default=100000,
+            help="Maximum number of datapoints buffered before they are sent to workers.",
+        )
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            default=4,
+            help="Maximum number of batches queued for each worker.",
+        )
 
-        input_filename = args[0]
+    def handle(self, *args, **options):
+        input_filename = options['filename']
         try:
             input_file = open(input_filename, 'r')
         except IOError:
             raise base.CommandError("Unable to open file '%s'!" % input_filename)
 
+        self.batch_size = max(1, options['batch_size'])
+        self.appended = multiprocessing.Value('L', 0)
+        self.workers = []
+        for _ in xrange(max(0, options['workers'])):
+            queue = multiprocessing.Queue(max(1, options['queue_size']))
+            process = multiprocessing.Process(target=import_worker, args=(queue, self.appended))
+            process.daemon = True
+            process.start()
+            self.workers.append((process, queue))
+
+        try:
+            self.import_file(input_file, max(self.batch_size, options['max_pending']))
+
+            # Signal workers that there are no more batches and wait for them to finish.
+            for process, queue in self.workers:
+                self.put(process, queue, None)
+            for process, queue in self.workers:
+                process.join()
+                if process.exitcode != 0:
+                    raise base.CommandError("Worker process failed, terminating import.")
+        finally:
+            for process, queue in self.workers:
+                if process.is_alive():
+                    process.terminate()
+
+        self.stdout.write("Imported %d datapoints in %.2f seconds.\n" % (self.appended.value, time.time() - self.start_time))
+
+    def put(self, process, queue, batch):
+        """
+        Queues a batch for a worker, blocking while its queue is full.
+        """
+
+        while True:
+            try:
+                queue.put(batch, timeout=1)
+                return
+            except Queue.Full:
+                if not process.is_alive():
+                    raise base.CommandError("Worker process failed, terminating import.")
+
+    def append(self, stream_id, batch):
+        """
+        Appends a batch of datapoints of a single stream. All batches of a
+        stream are appended by the same worker, so their order is preserved.
+        """
+
+        if not self.workers:
+            with self.appended.get_lock():
+                self.appended.value += append_batch(datastream, batch)
+            return
+
+        process, queue = self.workers[hash(stream_id) % len(self.workers)]
+        self.put(process, queue, batch)
+
+    def import_file(self, input_file, max_pending):
         self.stdout.write("Starting import process...\n")
-        start_time = time.time()
+        self.start_time = time.time()
         item_index = 0
-        data_points = 0
         ensured_streams = {}
+        # Datapoints waiting to be appended, grouped by stream.
+        pending = {}
+        pending_count = 0
         for item in ijson.items(input_file, 'items.item'):
             timestamp = datetime.datetime.utcfromtimestamp(item['s'])
             item_index += 1
-            if item_index % 100 == 0:
-                self.stdout.write("[%d/s]\n" % (data_points / (time.time() - start_time)))
+            if item_index % 10000 == 0:
+                self.stdout.write("[%d/s]\n" % (self.appended.value / (time.time() - self.start_time)))
 
             try:
                 streams = self.import_data(item)
@@ -69,20 +208,22 @@ class Command(base.BaseCommand):
                 else:
                     stream_id = ensured_streams[stream_key]
 
-                try:
-                    datastream.append(stream_id, stream['value'], timestamp)
-                    data_points += 1
-                except:
-                    # Skip datapoints on errors
-                    self.stdout.write("=== WARNING: Skipping datapoint due to exception!\n")
-                    self.stdout.write("--- Exception:\n")
-                    self.stdout.write(traceback.format_exc())
-                    self.stdout.write("\n")
-                    self.stdout.write("--- Datapoint:\n")
-                    self.stdout.write("%s\n" % item['s'])
-                    self.stdout.write(repr(stream['value']))
-                    self.stdout.write("\n\n")
-                    continue
+                batch = pending.setdefault(stream_id, [])
+                batch.append({'stream_id': stream_id, 'value': stream['value'], 'timestamp': timestamp})
+                pending_count += 1
+                if len(batch) >= self.batch_size:
+                    self.append(stream_id, pending.pop(stream_id))
+                    pending_count -= len(batch)
+
+            if pending_count >= max_pending:
+                # Bound memory usage by sending out all buffered datapoints.
+                for stream_id, batch in pending.iteritems():
+                    self.append(stream_id, batch)
+                pending = {}
+                pending_count = 0
+
+        for stream_id, batch in pending.iteritems():
+            self.append(stream_id, batch)
 
     def import_data(self, item):
         return {
@@ -1,5 +1,4 @@
 import datetime
-import traceback
 
 from django.db.models import signals as model_signals
 
@@ -8,7 +7,7 @@ from django_datastream import datastream
 from nodewatcher.core.monitor import processors as monitor_processors
 from nodewatcher.core.registry import registration
 
-from . import exceptions
+from . import downsampling, exceptions
 from .pool import pool
 
 
@@ -56,6 +55,23 @@ class TrackRegistryModels(monitor_processors.NodeProcessor):
         model_signals.post_delete.disconnect(dispatch_uid='ds_track_models')
 
 
+def track_models(context, instances):
+    """
+    Ensures that data of registry items is stored into the datastream even
+    when they have not been saved in this cycle, for example because they have
+    not changed. Does nothing when models are not being tracked.
+
+    :param context: Current context
+    :param instances: A list of registry items
+    """
+
+    if 'tracked_models' not in context.datastream:
+        return
+
+    for instance in instances:
+        context.datastream.tracked_models[(type(instance), instance.pk)] = instance
+
+
 class DatastreamBase(object):
     def process_context(self, context):
         """
@@ -173,17 +189,11 @@ class MaintenanceBackprocess(monitor_processors.NetworkProcessor):
         return context, nodes
 
 
-def _maintenance_downsample_worker(worker_id, num_workers):
-    """
-    Helper function proxy that can be called by the worker pool.
-    """
-
-    datastream.downsample_streams(filter_stream=lambda stream: stream.id % num_workers == worker_id)
-
-
 class MaintenanceDownsample(monitor_processors.NetworkProcessor):
     """
-    Datastream downsampling maintenance processor.
+    Datastream downsampling maintenance processor. Streams are downsampled in
+    order of their estimated pending work within a time budget, unfinished
+    work is carried over to the next cycle.
     """
 
     requires_transaction = False
@@ -199,18 +209,11 @@ class MaintenanceDownsample(monitor_processors.NetworkProcessor):
         """
 
         # Downsample streams using multiple workers in parallel.
-        results = []
         workers = self.get_worker_pool()
         num_workers = workers._processes
         self.logger.info("Downsampling streams with %d workers..." % num_workers)
-        for worker in xrange(num_workers):
-            results.append(workers.apply_async(_maintenance_downsample_worker, [worker, num_workers]))
 
-        for result in results:
-            try:
-                result.get()
-            except:
-                self.logger.warning("Downsample worker failed with exception:")
-                self.logger.warning(traceback.format_exc())
+        downsampled, pending = downsampling.DownsampleScheduler().run(workers, num_workers)
+        self.logger.info("Downsampled %d streams, %d streams carried over to the next cycle." % (downsampled, pending))
 
         return context, nodes
@@ -1,7 +1,13 @@
+import datetime
+
 from django import dispatch
+from django.conf import settings
 from django.db.models import signals as django_signals
 
+from django_datastream import datastream
+
 from nodewatcher.core import models as core_models
+from nodewatcher.core.monitor import signals as monitor_signals
 
 from . import tasks
 
@@ -28,3 +34,33 @@ try:
         tasks.delete_streams.delay({'node': node.pk})
 except ImportError:
     pass
+
+
+@dispatch.receiver(monitor_signals.cycle_finished)
+def datastream_monitor_report(sender, run, report, **kwargs):
+    """
+    Export monitoring cycle reports into the datastream when enabled.
+    """
+
+    if not getattr(settings, 'MONITOR_REPORT_DATASTREAM', False):
+        return
+
+    timestamp = datetime.datetime.utcnow()
+    datapoints = []
+
+    def append(processor, metric, value):
+        stream_id = datastream.ensure_stream(
+            {'module': 'monitor.report', 'run': run.name, 'processor': processor, 'metric': metric},
+            {},
+            ['mean', 'min', 'max'],
+            datastream.Granularity.Minutes,
+            value_type='numeric',
+        )
+        datapoints.append({'stream_id': stream_id, 'value': value, 'timestamp': timestamp})
+
+    append('cycle', 'time', report['time'])
+    for entry in report['processors']:
+        for metric in ('time', 'queries', 'rows'):
+            append(entry['processor'], metric, entry[metric])
+
+    datastream.append_multiple(datapoints)
@@ -1,9 +1,20 @@
+import collections
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import datastream
+import mock
+import pytz
+
 from django import test as django_test
 from django.conf import settings
 
 import django_datastream
 
-from . import base, exceptions, fields
+from . import base, downsampling, exceptions, fields, utils
 from .pool import pool
 
 
@@ -124,3 +135,164 @@ class RegistryTestCase(django_test.TestCase):
         pool.unregister(DummyModel)
         with self.assertRaises(exceptions.StreamDescriptorNotRegistered):
             pool.unregister(DummyModel)
+
+
+class DownsampleSchedulerTestCase(unittest.TestCase):
+    def test_plan(self):
+        scheduler = downsampling.DownsampleScheduler(path='/nonexistent', cold_interval=3600)
+        state = {
+            'hot': {'downsampled': 900.0, 'cost': 1.0, 'rate': 0.01},
+            'slow': {'downsampled': 900.0, 'cost': 0.1, 'rate': 0.001},
+            'stale': {'downsampled': -1000.0, 'cost': 0.1, 'rate': 0.001},
+            'cold': {'downsampled': 900.0, 'cost': 0.1, 'rate': 0.01},
+        }
+        streams = [('cold', 800.0), ('slow', 950.0), ('stale', 500.0), ('hot', 950.0), ('new', None)]
+
+        self.assertEqual(scheduler.plan(streams, state, 1000.0), ['new', 'stale', 'hot', 'slow'])
+        # Cold streams are processed once the cold interval passes.
+        self.assertIn('cold', scheduler.plan(streams, state, 4600.0))
+
+        # Cold streams are processed once after the bucket of their latest datapoint closes.
+        scheduler.cold_interval = 7 * downsampling.COARSEST_BUCKET
+        bucket_end = float(downsampling.COARSEST_BUCKET)
+        self.assertNotIn('cold', scheduler.plan(streams, state, bucket_end - 1))
+        self.assertIn('cold', scheduler.plan(streams, state, bucket_end + 1))
+        state['cold']['downsampled'] = bucket_end + 1
+        self.assertNotIn('cold', scheduler.plan(streams, state, bucket_end + 3600))
+
+    def test_next_chunk(self):
+        scheduler = downsampling.DownsampleScheduler(path='/nonexistent')
+        state = {
+            'a': {'downsampled': 0.0, 'cost': 2.0, 'rate': 0.0},
+            'b': {'downsampled': 0.0, 'cost': 3.0, 'rate': 0.0},
+            'c': {'downsampled': 0.0, 'cost': 4.0, 'rate': 0.0},
+            'huge': {'downsampled': 0.0, 'cost': 100.0, 'rate': 0.0},
+        }
+
+        # Chunks are filled with streams in order of priority while they fit within the budget.
+        work = collections.deque(['a', 'b', 'c', 'new'])
+        self.assertEqual(scheduler.next_chunk(work, state, 6.0, 50.0), ['a', 'b'])
+        # Streams without estimates are assumed to cost as much as an average stream.
+        self.assertEqual(scheduler.next_chunk(work, state, 8.0, 50.0), ['c'])
+        self.assertEqual(list(work), ['new'])
+        self.assertEqual(scheduler.next_chunk(work, state, 10.0, 50.0), [])
+        self.assertEqual(scheduler.next_chunk(work, state, 27.25, 50.0), ['new'])
+
+        # Streams which never fit are downsampled alone.
+        work = collections.deque(['huge', 'a'])
+        self.assertEqual(scheduler.next_chunk(work, state, 10.0, 50.0), ['huge'])
+        self.assertEqual(list(work), ['a'])
+
+    def test_update(self):
+        scheduler = downsampling.DownsampleScheduler(path='/nonexistent')
+        state = {'a': {'downsampled': 0.0, 'cost': 1.0, 'rate': 0.0}}
+
+        scheduler.update(state, ['a', 'b'], 2.0, 100.0)
+        self.assertEqual(state['b'], {'downsampled': 100.0, 'cost': 1.0, 'rate': 0.0})
+        self.assertEqual(state['a']['downsampled'], 100.0)
+        self.assertAlmostEqual(state['a']['rate'], downsampling.ESTIMATE_SMOOTHING * 0.01)
+
+
+class InterruptedCopy(Exception):
+    pass
+
+
+class MemoryDatastream(object):
+    """
+    In-memory datastream with timezone-aware timestamps, which rejects
+    non-monotonic appends.
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.appends = []
+        self.fail_at = None
+        self.fail_with = InterruptedCopy
+
+    def get_data(self, stream_id, granularity, start, end=None, reverse=False):
+        datapoints = [
+            datapoint for datapoint in self.streams.get(stream_id, [])
+            if utils.to_naive_utc(datapoint['t']) >= utils.to_naive_utc(start) and (end is None or datapoint['t'] <= end)
+        ]
+        if reverse:
+            datapoints.reverse()
+        return datapoints
+
+    def append_multiple(self, datapoints):
+        self.appends.append(datapoints)
+        for datapoint in datapoints:
+            if len(self.streams.get(datapoint['stream_id'], [])) == self.fail_at:
+                # Interrupt in the middle of a batch, after some datapoints have been stored.
+                self.fail_at = None
+                raise self.fail_with
+
+            stream = self.streams.setdefault(datapoint['stream_id'], [])
+            if stream and datapoint['timestamp'] <= stream[-1]['t']:
+                raise ValueError("Non-monotonic timestamp.")
+            stream.append({'t': datapoint['timestamp'], 'v': datapoint['value']})
+
+
+class CopyStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state_filename = os.path.join(self.directory, 'copy.state')
+
+        start = datetime.datetime(2016, 1, 1, tzinfo=pytz.utc)
+        self.source = MemoryDatastream()
+        self.source.streams['source'] = [
+            {'t': start + datetime.timedelta(minutes=i), 'v': i} for i in xrange(2 * utils.COMMIT_BATCH_SIZE + 500)
+        ]
+        self.destination = MemoryDatastream()
+
+        patcher = mock.patch.object(utils.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy(self, start=datetime.datetime.min):
+        # A new state instance corresponds to a restarted copy.
+        utils._copy_worker.update({
+            'source': self.source,
+            'destination': self.destination,
+            'state': utils.CopyState(self.state_filename),
+        })
+        return utils._copy_stream(('source', 'destination', 'minutes', start, None))
+
+    def assertCopied(self):
+        self.assertEqual(self.destination.streams['destination'], self.source.streams['source'])
+
+    def test_resume(self):
+        # Interrupt the copy after the first checkpoint and a part of the next batch.
+        self.destination.fail_at = utils.COMMIT_BATCH_SIZE + 10
+        with self.assertRaises(InterruptedCopy):
+            self.copy()
+
+        self.assertFalse(utils.CopyState(self.state_filename).is_done('source'))
+
+        # Resuming must neither duplicate nor skip datapoints.
+        self.assertEqual(self.copy(start=datetime.datetime(2015, 1, 1, tzinfo=pytz.utc)), ('source', utils.COMMIT_BATCH_SIZE + 490))
+        self.assertCopied()
+        self.assertTrue(utils.CopyState(self.state_filename).is_done('source'))
+
+        # Copying a finished stream again does not append anything.
+        self.assertEqual(self.copy(), ('source', 0))
+        self.assertCopied()
+
+    def test_retry(self):
+        # Datapoints stored by a failed append are not appended again.
+        self.destination.fail_at = 10
+        self.destination.fail_with = datastream.exceptions.StreamAppendFailed
+        self.copy()
+        self.assertCopied()
+
+    def test_batch_time_span(self):
+        start = datetime.datetime(2016, 1, 1, tzinfo=pytz.utc)
+        self.source.streams['source'] = [{'t': start + datetime.timedelta(hours=i), 'v': i} for i in xrange(72)]
+        self.copy()
+        self.assertCopied()
+
+        self.assertEqual(len(self.destination.appends), 3)
+        for batch in self.destination.appends:
+            self.assertLess(batch[-1]['timestamp'] - batch[0]['timestamp'], utils.COMMIT_BATCH_TIME_SPAN)
@@ -1,7 +1,12 @@
+import calendar
 import datetime
+import json
+import multiprocessing
+import os
 import time
 
 import datastream
+import pytz
 
 from nodewatcher.utils import toposort
 
@@ -9,18 +14,252 @@ from nodewatcher.utils import toposort
 COMMIT_BATCH_SIZE = 1000
 # Number of bytes to commit in one batch.
 COMMIT_BATCH_BYTE_SIZE = 5242880
+# Maximum time span of datapoints committed in one batch.
+COMMIT_BATCH_TIME_SPAN = datetime.timedelta(days=1)
 
 
-def datastream_copy(source, destination, start=None, end=None, remove_all=False):
+def is_backend_factory(backend):
+    """
+    Returns True if the argument is a callable returning backend instances
+    and not a backend instance.
+
+    :param backend: Backend instance or a callable returning one
+    """
+
+    return callable(backend) and not hasattr(backend, 'find_streams')
+
+
+def get_backend(backend):
+    """
+    Returns a datastream backend instance.
+
+    :param backend: Backend instance or a callable returning one
+    """
+
+    if is_backend_factory(backend):
+        return backend()
+
+    return backend
+
+
+def to_epoch(timestamp):
+    return calendar.timegm(timestamp.utctimetuple()) + timestamp.microsecond / 1e6
+
+
+def to_naive_utc(timestamp):
+    """
+    Returns a naive datetime in UTC for a naive (assumed to be in UTC) or a
+    timezone-aware datetime.
+    """
+
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(pytz.utc).replace(tzinfo=None)
+
+    return timestamp
+
+
+def get_latest_timestamp(ds, stream_id, granularity):
+    """
+    Returns the naive UTC timestamp of the latest datapoint of a stream or None
+    if the stream has no datapoints.
+
+    :param ds: Datastream instance
+    :param stream_id: Stream identifier
+    :param granularity: Stream granularity
+    """
+
+    try:
+        datapoint = ds.get_data(stream_id, granularity, start=datetime.datetime.min, reverse=True)[0]
+    except IndexError:
+        return None
+
+    return to_naive_utc(datapoint['t'])
+
+
+class CopyState(object):
+    """
+    Per-stream progress of a datastream copy, stored as an append-only log in
+    a local file so that interrupted copies may be resumed.
+    """
+
+    def __init__(self, filename):
+        """
+        Class constructor.
+
+        :param filename: State filename or None to not store any state
+        """
+
+        self.filename = filename
+        self.lock = multiprocessing.Lock()
+        self.streams = {}
+
+        if filename is None or not os.path.exists(filename):
+            return
+
+        with open(filename, 'r') as state_file:
+            for line in state_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Ignore partially written entries.
+                    continue
+
+                self.streams[entry['stream']] = entry
+
+    def get_resume_timestamp(self, stream_id):
+        """
+        Returns the timestamp after which copying of a stream should resume
+        or None if the stream has not been copied yet.
+
+        :param stream_id: Source stream identifier
+        """
+
+        entry = self.streams.get(stream_id, None)
+        if entry is None or entry['timestamp'] is None:
+            return None
+
+        return datetime.datetime.utcfromtimestamp(entry['timestamp'])
+
+    def is_done(self, stream_id):
+        return self.streams.get(stream_id, {}).get('done', False)
+
+    def checkpoint(self, stream_id, timestamp, done=False):
+        """
+        Records progress of a stream. May be called from worker processes.
+
+        :param stream_id: Source stream identifier
+        :param timestamp: Timestamp of the last copied datapoint
+        :param done: True if the stream has been copied completely
+        """
+
+        if self.filename is None:
+            return
+
+        entry = json.dumps({
+            'stream': stream_id,
+            'timestamp': to_epoch(timestamp) if timestamp is not None else None,
+            'done': done,
+        })
+
+        with self.lock:
+            with open(self.filename, 'a') as state_file:
+                state_file.write(entry + '\n')
+                state_file.flush()
+                os.fsync(state_file.fileno())
+
+# Worker process state, inherited from the parent process.
+_copy_worker = {}
+
+
+def _init_copy_worker(source, destination, state):
+    _copy_worker['source'] = datastream.Datastream(get_backend(source))
+    _copy_worker['destination'] = datastream.Datastream(get_backend(destination))
+    _copy_worker['state'] = state
+
+
+def _copy_stream(task):
+    """
+    Copies datapoints of a single stream in time-bounded batches, recording
+    progress after each committed batch.
+
+    :return: A tuple (source stream identifier, number of copied datapoints)
+    """
+
+    source_id, destination_id, granularity, start, end = task
+    ds_source = _copy_worker['source']
+    ds_destination = _copy_worker['destination']
+    state = _copy_worker['state']
+
+    # Continue after the last copied datapoint. The destination may contain datapoints
+    # appended after the last checkpoint, when a previous copy has been interrupted.
+    start = to_naive_utc(start)
+    resume = [state.get_resume_timestamp(source_id), get_latest_timestamp(ds_destination, destination_id, granularity)]
+    resume = [timestamp for timestamp in resume if timestamp is not None]
+    if resume:
+        start = max(start, max(resume) + datetime.timedelta(microseconds=1))
+
+    batch = []
+    size_of_batch = 0
+    copied = 0
+
+    def append_current_batch():
+        datapoints = batch
+        for i in xrange(10):
+            try:
+                if datapoints:
+                    ds_destination.append_multiple(datapoints)
+                break
+            except datastream.exceptions.StreamAppendFailed:
+                print "WARNING: Destination stream append failed. Retry #%d after 30 seconds." % (i + 1)
+                time.sleep(30)
+
+                # A failed append may have stored some datapoints, which must not be appended again.
+                latest = get_latest_timestamp(ds_destination, destination_id, granularity)
+                if latest is not None:
+                    datapoints = [datapoint for datapoint in datapoints if to_naive_utc(datapoint['timestamp']) > latest]
+        else:
+            raise datastream.exceptions.StreamAppendFailed
+
+        state.checkpoint(source_id, batch[-1]['timestamp'])
+
+    try:
+        for datapoint in ds_source.get_data(source_id, granularity, start=start, end=end):
+            if batch and datapoint['t'] - batch[0]['timestamp'] >= COMMIT_BATCH_TIME_SPAN:
+                append_current_batch()
+                batch = []
+                size_of_batch = 0
+
+            batch.append({'stream_id': destination_id, 'value': datapoint['v'], 'timestamp': datapoint['t']})
+            size_of_batch += len(str(datapoint['v']))
+            copied += 1
+            if len(batch) >= COMMIT_BATCH_SIZE or size_of_batch >= COMMIT_BATCH_BYTE_SIZE:
+                append_current_batch()
+                batch = []
+                size_of_batch = 0
+
+        if batch:
+            append_current_batch()
+            batch = []
+    except datastream.exceptions.StreamNotFound:
+        # Stream has been removed while import was in progress. Remove the stream from
+        # destination as well.
+        print "Skipping removed stream %s." % source_id
+
+        try:
+            ds_destination.delete_streams({'import_id': source_id})
+        except:
+            # Do not abort import when a stream cannot be deleted.
+            pass
+    except:
+        print "ERROR: Failed to copy data for source stream %s (target %s)." % (source_id, destination_id)
+        print "ERROR: Last batch was (%d items, %d bytes):" % (len(batch), size_of_batch)
+        for value in batch:
+            print "  %s" % repr(value['value'])
+        print "ERROR: Aborting due to exception."
+        raise
+
+    state.checkpoint(source_id, None, done=True)
+    return source_id, copied
+
+
+def datastream_copy(source, destination, start=None, end=None, remove_all=False, workers=1, state_filename=None):
     """
     Copies all streams from one datastream backend to another. Source and destination
     MUST differ. All data in destination datastream backend WILL BE LOST.
 
-    :param source: Source datastream backend instance
-    :param destination: Destination datastream backend instance
+    Streams are created in the main process, while their data is copied by a pool of
+    worker processes. Each worker uses its own backend instances, so when using more
+    than one worker, source and destination must be callables, which return new
+    backend instances.
+
+    :param source: Source datastream backend instance or callable
+    :param destination: Destination datastream backend instance or callable
     :param start: Import from the specified timestamp
     :param end: Import until the specified timestamp
-    :param remove_all: Remove all destination streams
+    :param remove_all: Remove all destination streams (ignored when resuming)
+    :param workers: Number of worker processes
+    :param state_filename: Optional file where progress is recorded, so that an
+        interrupted copy may be resumed by calling this function again
     """
 
     # Do a basic check if source and destination are the same. This cannot determine
@@ -29,11 +268,16 @@ def datastream_copy(source, destination, start=None, end=None, remove_all=False)
     if source == destination:
         raise ValueError('Source and destination must differ!')
 
+    # Backend instances inherited by forked workers would share their connections.
+    if workers > 1 and not (is_backend_factory(source) and is_backend_factory(destination)):
+        raise ValueError('Source and destination must be callables when using more than one worker!')
+
     if start is None:
         start = datetime.datetime.min
 
-    ds_source = datastream.Datastream(source)
-    ds_destination = datastream.Datastream(destination)
+    state = CopyState(state_filename)
+    ds_source = datastream.Datastream(get_backend(source))
+    ds_destination = datastream.Datastream(get_backend(destination))
 
     # Load all stream metadata into memory.
     print "Loading streams from source."
@@ -49,16 +293,19 @@ def datastream_copy(source, destination, start=None, end=None, remove_all=False)
     sorted_streams = toposort.topological_sort(streams)
 
     if remove_all:
-        print "Dropping destination streams."
-        ds_destination.delete_streams()
+        if state.streams:
+            print "Resuming copy, destination streams will not be dropped."
+        else:
+            print "Dropping destination streams."
+            ds_destination.delete_streams()
 
-    print "Importing streams."
-    stream_no = 1
+    # Create all streams on the destination. Derived streams must be created after
+    # the streams they are derived from.
+    print "Creating streams."
     stream_map = {}
+    tasks = []
     for stream_batch in sorted_streams:
         for stream in stream_batch:
-            print "[%d/%d] Importing stream." % (stream_no, len(streams))
-
             stream = datastream.Stream(stream['stream'])
             value_downsamplers = list(set(stream.value_downsamplers).intersection(ds_destination.backend.value_downsamplers))
 
@@ -85,54 +332,45 @@ def datastream_copy(source, destination, start=None, end=None, remove_all=False)
 
             stream_map[stream.id] = stream_id
 
-            if not hasattr(stream, 'derived_from'):
-                # Copy data.
-                print "Copying data."
-                batch = []
-                size_of_batch = 0
+            # Data of derived streams is computed on the destination.
+            if not hasattr(stream, 'derived_from') and not state.is_done(stream.id):
+                tasks.append((stream.id, stream_id, stream.highest_granularity, start, end))
 
-                try:
-                    def append_current_batch():
-                        for i in xrange(10):
-                            try:
-                                ds_destination.append_multiple(batch)
-                                break
-                            except datastream.exceptions.StreamAppendFailed:
-                                print "WARNING: Destination stream append failed. Retry #%d after 30 seconds." % (i + 1)
-                                time.sleep(30)
-
-                    for datapoint in ds_source.get_data(stream.id, stream.highest_granularity, start=start, end=end):
-                        batch.append({'stream_id': stream_id, 'value': datapoint['v'], 'timestamp': datapoint['t']})
-                        size_of_batch += len(str(datapoint['v']))
-                        if len(batch) >= COMMIT_BATCH_SIZE or size_of_batch >= COMMIT_BATCH_BYTE_SIZE:
-                            append_current_batch()
-                            batch = []
-                            size_of_batch = 0
-
-                    if batch:
-                        append_current_batch()
-                        batch = []
-                except datastream.exceptions.StreamNotFound:
-                    # Stream has been removed while import was in progress. Remove the stream from
-                    # destination as well.
-                    print "Skipping removed stream."
-
-                    try:
-                        ds_destination.delete_streams({'import_id': stream.id})
-                    except:
-                        # Do not abort import when a stream cannot be deleted.
-                        pass
-                except:
-                    print "ERROR: Failed to copy data for source stream %s (target %s)." % (stream.id, stream_id)
-                    print "ERROR: Last batch was (%d items, %d bytes):" % (len(batch), size_of_batch)
-                    for value in batch:
-                        print "  %s" % repr(value['value'])
-                    print "ERROR: Aborting due to exception."
-                    raise
-
-            stream_no += 1
+    print "Copying data of %d streams (%d already copied) using %d workers." % (
+        len(tasks), len(streams) - len(tasks), workers
+    )
+
+    start_time = time.time()
+    copied_streams = 0
+    copied_datapoints = 0
+
+    def report(stream_id, datapoints):
+        duration = max(time.time() - start_time, 1e-6)
+        print "[%d/%d] Copied stream %s with %d datapoints (%d datapoints/s overall)." % (
+            copied_streams, len(tasks), stream_id, datapoints, copied_datapoints / duration
+        )
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=_init_copy_worker, initargs=(source, destination, state))
+        try:
+            for stream_id, datapoints in pool.imap_unordered(_copy_stream, tasks):
+                copied_streams += 1
+                copied_datapoints += datapoints
+                report(stream_id, datapoints)
+
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        _copy_worker.update({'source': ds_source, 'destination': ds_destination, 'state': state})
+        for task in tasks:
+            stream_id, datapoints = _copy_stream(task)
+            copied_streams += 1
+            copied_datapoints += datapoints
+            report(stream_id, datapoints)
 
     print "Backprocessing streams."
     ds_destination.backprocess_streams()
 
-    print "Imported %d/%d streams." % (len(ds_destination.find_streams()), stream_no - 1)
+    print "Imported %d/%d streams." % (len(ds_destination.find_streams()), len(streams))
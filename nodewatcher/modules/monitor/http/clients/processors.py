@@ -3,7 +3,9 @@ import pytz
 
 from django.utils.translation import gettext_noop
 
+from nodewatcher.core import models as core_models
 from nodewatcher.core.monitor import models as monitor_models, processors as monitor_processors
+from nodewatcher.core.registry import bulk as registry_bulk, versions as registry_versions
 from nodewatcher.utils import ipaddr
 from nodewatcher.modules.monitor.sources.http import processors as http_processors
 
@@ -56,81 +58,114 @@ class ClientInfo(monitor_processors.NodeProcessor):
         :return: A (possibly) modified context
         """
 
-        existing_clients = {}
-        for client in node.monitoring.network.clients():
-            existing_clients[client.client_id] = client
-
         version = context.http.get_module_version('core.clients')
         if version == 0:
             # Unsupported version or data fetch failed (v0)
             return context
 
-        client_count = 0
+        # Load a snapshot of existing clients and their addresses using two queries.
+        existing_clients = {}
+        for client in node.monitoring.network.clients().prefetch_related('addresses'):
+            existing_clients[client.client_id] = client
+
+        reported_clients = {}
         for client_id, data in context.http.core.clients.iteritems():
             if client_id.startswith('_'):
                 continue
 
-            try:
-                client = existing_clients[client_id]
-            except KeyError:
+            reported_clients[client_id] = data
+
+        # Create new clients.
+        new_clients = []
+        for client_id in reported_clients:
+            if client_id not in existing_clients:
                 client = node.monitoring.network.clients(create=monitor_models.ClientMonitor)
                 client.client_id = client_id
-                existing_clients[client_id] = client
+                new_clients.append(client)
+        registry_bulk.create(new_clients)
+
+        # Remove vanished clients together with their addresses.
+        vanished_clients = [client.pk for client_id, client in existing_clients.items() if client_id not in reported_clients]
+        if vanished_clients:
+            monitor_models.ClientMonitor.objects.filter(pk__in=vanished_clients).delete()
+
+        # Reconcile client addresses.
+        new_addresses = []
+        changed_addresses = []
+        vanished_addresses = []
+        for client in new_clients:
+            self.process_client(context, node, client, reported_clients[client.client_id], {}, new_addresses, changed_addresses)
+
+        for client_id, client in existing_clients.items():
+            if client_id not in reported_clients:
+                continue
 
-            client.save()
-            self.process_client(context, node, client, data)
-            client_count += 1
+            existing_addresses = {}
+            for address in client.addresses.all():
+                existing_addresses[address.address] = address
+
+            self.process_client(
+                context,
+                node,
+                client,
+                reported_clients[client_id],
+                existing_addresses,
+                new_addresses,
+                changed_addresses,
+            )
+            vanished_addresses += [address.pk for address in existing_addresses.values()]
 
-            del existing_clients[client_id]
+        registry_bulk.create(new_addresses)
+        registry_bulk.update(changed_addresses, ['family', 'expiry_time'])
+        if vanished_addresses:
+            monitor_models.ClientAddress.objects.filter(pk__in=vanished_addresses).delete()
 
-        for client in existing_clients.values():
-            client.delete()
+        if new_addresses or changed_addresses or vanished_addresses:
+            # Addresses are not registry items, so node version must be updated explicitly.
+            registry_versions.tracker.schedule_bump(core_models.Node, node.pk)
 
         if DATASTREAM_SUPPORTED:
             # Store client count into datastream.
-            context.datastream.monitor_http_clients = ClientStreamsData(node, client_count)
+            context.datastream.monitor_http_clients = ClientStreamsData(node, len(reported_clients))
 
         return context
 
-    def process_client(self, context, node, client, data):
+    def process_client(self, context, node, client, data, existing_addresses, new_addresses, changed_addresses):
         """
-        Processes a single client descriptor.
+        Processes a single client descriptor. Addresses that are still reported
+        are removed from ``existing_addresses``.
 
         :param context: Current context
         :param node: Node that is being processed
         :param client: Client model
         :param data: Telemetry data
+        :param existing_addresses: Existing client addresses, indexed by address
+        :param new_addresses: A list where new addresses should be added
+        :param changed_addresses: A list where changed addresses should be added
         """
 
-        existing_addresses = {}
-        for address in client.addresses.all():
-            existing_addresses[address.address] = address
-
+        reported_addresses = {}
         for address in data.addresses:
             ip = ipaddr.IPNetwork(address['address'])
-            client_address = existing_addresses.get(ip, None)
+            client_address = existing_addresses.pop(ip, None) or reported_addresses.get(ip, None)
             if client_address is None:
-                client_address, _ = client.addresses.get_or_create(
-                    client=client,
-                    address=ip,
-                )
+                client_address = monitor_models.ClientAddress(client=client, address=ip)
+                new_addresses.append(client_address)
+            reported_addresses[ip] = client_address
 
-                existing_addresses[ip] = client_address
-
-            client_address.expiry_time = datetime.datetime.fromtimestamp(
-                int(address['expires']),
-                pytz.utc
-            )
+            values = {
+                'expiry_time': datetime.datetime.fromtimestamp(
+                    int(address['expires']),
+                    pytz.utc
+                ),
+            }
 
             if address['family'] == 'ipv4':
-                client_address.family = 'ipv4'
+                values['family'] = 'ipv4'
             elif address['family'] == 'ipv6':
-                client_address.family = 'ipv6'
+                values['family'] = 'ipv6'
             else:
                 self.logger.warning("Unknown network family '%s' on node '%s' client '%s'!" % (address['family'], node.pk, client.client_id))
 
-            client_address.save()
-            del existing_addresses[ip]
-
-        for address in existing_addresses.values():
-            address.delete()
+            if registry_bulk.get_changed_fields(client_address, values) and client_address.pk is not None and client_address not in changed_addresses:
+                changed_addresses.append(client_address)
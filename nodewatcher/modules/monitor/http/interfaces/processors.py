@@ -1,9 +1,11 @@
 from nodewatcher.core.monitor import models as monitor_models, processors as monitor_processors
+from nodewatcher.core.registry import bulk as registry_bulk
 from nodewatcher.utils import ipaddr
 from nodewatcher.modules.monitor.sources.http import processors as http_processors
 
 DATASTREAM_SUPPORTED = False
 try:
+    from nodewatcher.modules.monitor.datastream import processors as ds_processors
     from nodewatcher.modules.monitor.datastream.pool import pool as ds_pool
     DATASTREAM_SUPPORTED = True
 except ImportError:
@@ -15,6 +17,16 @@ class Interfaces(monitor_processors.NodeProcessor):
     Stores interface monitoring data.
     """
 
+    # Fields that are set from telemetry.
+    measured_fields = [
+        'up', 'hw_address', 'tx_packets', 'rx_packets', 'tx_bytes', 'rx_bytes',
+        'tx_errors', 'rx_errors', 'tx_drops', 'rx_drops', 'mtu',
+    ]
+    measured_wifi_fields = [
+        'mode', 'essid', 'bssid', 'protocol', 'channel', 'channel_width', 'bitrate',
+        'rts_threshold', 'frag_threshold', 'signal', 'noise', 'snr',
+    ]
+
     @monitor_processors.depends_on_context('http', http_processors.HTTPTelemetryContext)
     def process(self, context, node):
         """
@@ -25,47 +37,26 @@ class Interfaces(monitor_processors.NodeProcessor):
         :return: A (possibly) modified context
         """
 
-        # Fetch models for all existing interfaces and reset measured variables
-        existing_interfaces = {}
-        for iface in node.monitoring.core.interfaces():
-            iface.up = False
-            iface.tx_packets = None
-            iface.rx_packets = None
-            iface.tx_bytes = None
-            iface.rx_bytes = None
-            iface.tx_errors = None
-            iface.rx_errors = None
-            iface.tx_drops = None
-            iface.rx_drops = None
-            iface.mtu = None
-            iface.hw_address = None
-            if isinstance(iface, monitor_models.WifiInterfaceMonitor):
-                iface.mode = None
-                iface.essid = None
-                iface.bssid = None
-                iface.channel = None
-                iface.bitrate = None
-                iface.rts_threshold = None
-                iface.frag_threshold = None
-                iface.signal = None
-                iface.noise = None
-                iface.snr = None
-
-            existing_interfaces[iface.name] = iface
-
         version_ifaces = context.http.get_module_version('core.interfaces')
         version_wifi = context.http.get_module_version('core.wireless')
         if version_ifaces < 3 or version_wifi < 3 or context.http.get_version() < 3:
             return context
 
-        interfaces = {}
+        # Load a snapshot of existing interfaces and their networks using two queries.
+        existing_interfaces = {}
+        for iface in node.monitoring.core.interfaces():
+            existing_interfaces[iface.name] = iface
+
+        existing_networks = {}
+        for net in node.monitoring.core.interfaces.network():
+            existing_networks.setdefault(net.interface_id, {})[net.address] = net
+
+        reported_interfaces = {}
         for name, data in context.http.core.interfaces.iteritems():
             if name.startswith('_') or name in ('lo',):
                 continue
 
-            try:
-                iface = existing_interfaces[name]
-            except KeyError:
+            if name not in existing_interfaces:
                 if name in context.http.core.wireless.interfaces:
                     iface = node.monitoring.core.interfaces(create=monitor_models.WifiInterfaceMonitor)
                 else:
@@ -73,23 +64,101 @@ class Interfaces(monitor_processors.NodeProcessor):
                 iface.name = name
                 existing_interfaces[name] = iface
 
-            self.process_interface(context, node, iface, data)
-            iface.save()
-            self.interface_enabled(context, node, iface)
+            reported_interfaces[name] = data
 
-            del existing_interfaces[name]
-            interfaces[name] = iface
+        # Compute field-level changes of all interfaces. Interfaces that were not
+        # found only have their measured variables reset.
+        new_interfaces = {}
+        changed_interfaces = {}
+        for name, iface in existing_interfaces.items():
+            fields = self.get_measured_fields(iface)
+            current = [getattr(iface, field) for field in fields]
 
-        # Store reset values for any interfaces that were not found; also hide these interfaces
-        for iface in existing_interfaces.values():
-            iface.save()
-            self.interface_disabled(context, node, iface)
+            self.reset_interface(iface)
+            if name in reported_interfaces:
+                self.process_interface(context, node, iface, reported_interfaces[name])
+
+            if iface.pk is None:
+                new_interfaces.setdefault(type(iface), []).append(iface)
+                continue
+
+            changed_fields = [field for field, value in zip(fields, current) if getattr(iface, field) != value]
+            if changed_fields:
+                instances, update_fields = changed_interfaces.setdefault(type(iface), ([], set()))
+                instances.append(iface)
+                update_fields.update(changed_fields)
+
+        # Interfaces must be created before their networks.
+        for instances in new_interfaces.values():
+            registry_bulk.create(instances)
+        for instances, update_fields in changed_interfaces.values():
+            registry_bulk.update(instances, update_fields)
+
+        networks = {'new': [], 'changed': [], 'vanished': []}
+        for name, data in reported_interfaces.items():
+            iface = existing_interfaces[name]
+            self.process_networks(context, node, iface, data, existing_networks.get(iface.pk, {}), networks)
+
+        registry_bulk.create(networks['new'])
+        registry_bulk.update(networks['changed'], ['family'])
+        if networks['vanished']:
+            monitor_models.NetworkAddressMonitor.objects.filter(pk__in=networks['vanished']).delete()
+
+        # Make interface monitors available to further processors, so they do not need
+        # to be fetched again.
+        context.interface_monitors = existing_interfaces
+
+        for name, iface in existing_interfaces.items():
+            if name in reported_interfaces:
+                self.interface_enabled(context, node, iface)
+            else:
+                # Hide interfaces that were not found.
+                self.interface_disabled(context, node, iface)
 
         return context
 
+    def get_measured_fields(self, iface):
+        """
+        Returns names of fields that are set from telemetry.
+        """
+
+        if isinstance(iface, monitor_models.WifiInterfaceMonitor):
+            return self.measured_fields + self.measured_wifi_fields
+
+        return self.measured_fields
+
+    def reset_interface(self, iface):
+        """
+        Resets measured variables of an interface.
+        """
+
+        iface.up = False
+        iface.tx_packets = None
+        iface.rx_packets = None
+        iface.tx_bytes = None
+        iface.rx_bytes = None
+        iface.tx_errors = None
+        iface.rx_errors = None
+        iface.tx_drops = None
+        iface.rx_drops = None
+        iface.mtu = None
+        iface.hw_address = None
+        if isinstance(iface, monitor_models.WifiInterfaceMonitor):
+            iface.mode = None
+            iface.essid = None
+            iface.bssid = None
+            iface.channel = None
+            iface.bitrate = None
+            iface.rts_threshold = None
+            iface.frag_threshold = None
+            iface.signal = None
+            iface.noise = None
+            iface.snr = None
+
     def process_interface(self, context, node, iface, data):
         """
-        Performs per-interface processing.
+        Performs per-interface processing. Measured variables are only set on
+        the interface, which is saved afterwards.
         """
 
         if not data.up:
@@ -138,36 +207,45 @@ class Interfaces(monitor_processors.NodeProcessor):
                 iface.snr = None
             iface.protocol = "".join(sorted(wdata.protocols)) if wdata.protocols else None
 
-        if data.addresses:
-            # Ensure that the interface is saved
-            iface.save()
-
-            existing_networks = {}
-            for net in iface.networks.all():
-                existing_networks[net.address] = net
-
-            for network in data.addresses:
-                address = ipaddr.IPNetwork("%(address)s/%(mask)d" % network)
-                net = existing_networks.get(address, None)
-                if net is None:
-                    net, _ = iface.networks.get_or_create(
-                        root=node,
-                        interface=iface,
-                        address=address
-                    )
-                    existing_networks[address] = net
-
-                if network['family'] == 'ipv4':
-                    net.family = 'ipv4'
-                elif network['family'] == 'ipv6':
-                    net.family = 'ipv6'
-                else:
-                    self.logger.warning("Unknown network family '%s' on node '%s' interface '%s'!" % (network.family, node.pk, iface.name))
-                net.save()
-                del existing_networks[address]
+    def process_networks(self, context, node, iface, data, existing_networks, networks):
+        """
+        Computes changes of interface networks.
+
+        :param context: Current context
+        :param node: Node that is being processed
+        :param iface: Saved interface
+        :param data: Interface telemetry data
+        :param existing_networks: Existing networks of the interface, indexed by address
+        :param networks: A dictionary with lists of new, changed and vanished networks
+        """
+
+        if not data.up or not data.addresses:
+            return
+
+        existing_networks = existing_networks.copy()
+        reported_networks = {}
+        for network in data.addresses:
+            address = ipaddr.IPNetwork("%(address)s/%(mask)d" % network)
+            net = existing_networks.pop(address, None) or reported_networks.get(address, None)
+            if net is None:
+                net = node.monitoring.core.interfaces.network(create=monitor_models.NetworkAddressMonitor)
+                net.interface = iface
+                net.address = address
+                networks['new'].append(net)
+            reported_networks[address] = net
+
+            if network['family'] == 'ipv4':
+                family = 'ipv4'
+            elif network['family'] == 'ipv6':
+                family = 'ipv6'
+            else:
+                family = net.family
+                self.logger.warning("Unknown network family '%s' on node '%s' interface '%s'!" % (network['family'], node.pk, iface.name))
+
+            if registry_bulk.get_changed_fields(net, {'family': family}) and net.pk is not None and net not in networks['changed']:
+                networks['changed'].append(net)
 
-            for net in existing_networks.values():
-                net.delete()
+        networks['vanished'] += [net.pk for net in existing_networks.values()]
 
     def interface_enabled(self, context, node, iface):
         """
@@ -208,6 +286,8 @@ if DATASTREAM_SUPPORTED:
 
             super(DatastreamInterfaces, self).interface_enabled(context, node, iface)
             self.set_interface_initial_set(iface, True)
+            # Interfaces are only saved when changed, but their data must be stored every time.
+            ds_processors.track_models(context, [iface])
 
         def interface_disabled(self, context, node, iface):
             """
@@ -216,3 +296,5 @@ if DATASTREAM_SUPPORTED:
 
             super(DatastreamInterfaces, self).interface_disabled(context, node, iface)
             self.set_interface_initial_set(iface, False)
+            # Interfaces are only saved when changed, but their data must be stored every time.
+            ds_processors.track_models(context, [iface])
@@ -0,0 +1,242 @@
+import cPickle as pickle
+import time
+import uuid
+
+import redis
+
+from django.conf import settings
+
+from nodewatcher.core import models as core_models
+
+from . import signals
+
+# Statistics counters.
+ACCEPTED = 'accepted'
+REJECTED = 'rejected'
+COALESCED = 'coalesced'
+
+
+class PushBufferFull(Exception):
+    """
+    Raised when the push buffer holds pending pushes of too many nodes.
+    """
+
+    pass
+
+
+def normalize_uuid(source):
+    """
+    Validates and normalizes a pushing node's UUID.
+
+    :param source: UUID string as received from the node
+    :return: Normalized UUID string
+    :raises ValueError: When the UUID is not valid
+    """
+
+    return str(uuid.UUID(source))
+
+
+def validate_push(source, context):
+    """
+    Performs cheap validation of a push before it is accepted for processing, so
+    that pushes which would be discarded by the monitoring pipeline anyway do not
+    consume any resources there.
+
+    :param source: Normalized UUID of the pushing node
+    :param context: Push context dictionary
+    :return: True if the push should be accepted
+    """
+
+    try:
+        node = core_models.Node.objects.get(uuid=source)
+    except core_models.Node.DoesNotExist:
+        # Pushes from unknown nodes are accepted, so that they may be discovered.
+        return True
+
+    telemetry_source = node.config.core.telemetry.http()
+    if not telemetry_source or telemetry_source.source != 'push':
+        return False
+
+    # Allow other modules to reject the push.
+    for receiver, valid in signals.validate_push.send(sender=None, node=node, context=context):
+        if valid is False:
+            return False
+
+    return True
+
+
+class PushBuffer(object):
+    """
+    Short-lived keyed buffer of pushed telemetry, shared between the push
+    endpoint and the monitoring workers. Only the latest push of each node is
+    kept, so a backlog of pushes from the same node is coalesced into a single
+    processing task and raw push data never passes through the broker.
+    """
+
+    KEY_PREFIX = 'nodewatcher:monitor:http:push'
+
+    def __init__(self, url=None, ttl=None, max_pending=None):
+        """
+        Class constructor.
+
+        :param url: Optional Redis URL, defaults to the broker URL
+        :param ttl: Optional time in seconds after which buffered pushes expire
+        :param max_pending: Optional maximum number of nodes with pending pushes
+        """
+
+        self._url = url
+        self._ttl = ttl
+        self._max_pending = max_pending
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            url = self._url or getattr(settings, 'MONITOR_HTTP_PUSH_BUFFER_URL', None) or settings.BROKER_URL
+            self._connection = redis.StrictRedis.from_url(url)
+
+        return self._connection
+
+    @property
+    def ttl(self):
+        if self._ttl is None:
+            return getattr(settings, 'MONITOR_HTTP_PUSH_BUFFER_TTL', 300)
+
+        return self._ttl
+
+    @property
+    def max_pending(self):
+        if self._max_pending is None:
+            return getattr(settings, 'MONITOR_HTTP_PUSH_BUFFER_MAX_PENDING', 10000)
+
+        return self._max_pending
+
+    def _key(self, *components):
+        return ':'.join((self.KEY_PREFIX,) + components)
+
+    def store(self, source, context):
+        """
+        Stores the latest push context of a node.
+
+        :param source: Normalized UUID of the pushing node
+        :param context: Push context dictionary
+        :return: True if a processing task should be queued for the node, False
+            if one is already queued and will process this push instead
+        :raises PushBufferFull: When too many nodes have pending pushes
+        """
+
+        # Pending nodes are kept in a sorted set scored by push time, so that nodes whose
+        # pushes have expired without being processed can be removed.
+        now = time.time()
+        pending = self._key('pending')
+        pipeline = self.connection.pipeline()
+        pipeline.zremrangebyscore(pending, '-inf', now - self.ttl)
+        pipeline.zcard(pending)
+        pipeline.zscore(pending, source)
+        _, size, score = pipeline.execute()
+
+        if score is None and size >= self.max_pending:
+            self.record(REJECTED)
+            raise PushBufferFull
+
+        pipeline = self.connection.pipeline()
+        pipeline.set(self._key('data', source), pickle.dumps(context, pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+        pipeline.set(self._key('queued', source), '1', ex=self.ttl, nx=True)
+        pipeline.zadd(pending, now, source)
+        pipeline.expire(pending, self.ttl)
+        queued = pipeline.execute()[1]
+
+        self.record(ACCEPTED)
+        if not queued:
+            self.record(COALESCED)
+
+        return bool(queued)
+
+    def pop(self, source):
+        """
+        Removes and returns the latest push context of a node.
+
+        :param source: Normalized UUID of the pushing node
+        :return: Push context dictionary or None if there is no buffered push
+        """
+
+        pipeline = self.connection.pipeline()
+        pipeline.get(self._key('data', source))
+        pipeline.delete(self._key('data', source))
+        pipeline.delete(self._key('queued', source))
+        pipeline.zrem(self._key('pending'), source)
+        data = pipeline.execute()[0]
+
+        if data is None:
+            return None
+
+        return pickle.loads(data)
+
+    def pop_batch(self, limit):
+        """
+        Removes and returns the latest push contexts of up to a given number of
+        nodes which have pending pushes.
+
+        :param limit: Maximum number of nodes
+        :return: A dictionary mapping node UUIDs to push context dictionaries
+        """
+
+        pending = self._key('pending')
+        candidates = self.connection.zrange(pending, 0, limit - 1)
+        if not candidates:
+            return {}
+
+        # Only nodes actually removed from the pending set belong to this batch, as
+        # concurrent workers may have fetched the same candidates.
+        pipeline = self.connection.pipeline()
+        for source in candidates:
+            pipeline.zrem(pending, source)
+        sources = [source for source, removed in zip(candidates, pipeline.execute()) if removed]
+        if not sources:
+            return {}
+
+        pipeline = self.connection.pipeline()
+        for source in sources:
+            pipeline.get(self._key('data', source))
+            pipeline.delete(self._key('data', source))
+            pipeline.delete(self._key('queued', source))
+        results = pipeline.execute()[::3]
+
+        batch = {}
+        for source, data in zip(sources, results):
+            if data is None:
+                continue
+
+            batch[source] = pickle.loads(data)
+
+        return batch
+
+    def record(self, counter, amount=1):
+        """
+        Increments a statistics counter.
+
+        :param counter: Counter name
+        :param amount: Optional increment
+        """
+
+        self.connection.hincrby(self._key('statistics'), counter, amount)
+
+    def get_statistics(self):
+        """
+        Returns a dictionary of statistics counters.
+        """
+
+        statistics = dict.fromkeys([ACCEPTED, REJECTED, COALESCED], 0)
+        for counter, value in self.connection.hgetall(self._key('statistics')).items():
+            statistics[counter] = int(value)
+
+        return statistics
+
+    def reset_statistics(self):
+        """
+        Resets all statistics counters.
+        """
+
+        self.connection.delete(self._key('statistics'))
+
+push_buffer = PushBuffer()
@@ -0,0 +1,107 @@
+import time
+
+from django.conf import settings
+from django.core.management import base
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.monitor import tasks as monitor_tasks
+
+from ... import ingestion, tasks
+
+
+class Command(base.BaseCommand):
+    help = "Benchmarks HTTP push processing throughput of a single worker by replaying " \
+           "a telemetry payload for existing push nodes. Processing is performed synchronously " \
+           "in this process, so no broker is required. Nodes should not require identity " \
+           "verification as no identity information is included in the replayed pushes."
+    requires_model_validation = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('filename', type=str, help="File with the pushed telemetry payload.")
+        parser.add_argument(
+            '--pushes',
+            type=int,
+            default=1000,
+            help="Number of pushes to replay.",
+        )
+        parser.add_argument(
+            '--nodes',
+            type=int,
+            default=100,
+            help="Maximum number of distinct push nodes.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'MONITOR_HTTP_PUSH_BATCH_SIZE', 1),
+            help="Number of pushes processed together.",
+        )
+        parser.add_argument(
+            '--buffer-url',
+            type=str,
+            default=None,
+            help="Redis URL of the push buffer, for example a local Redis instance.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['filename'], 'r') as payload_file:
+                payload = payload_file.read()
+        except IOError:
+            raise base.CommandError("Unable to open file '%s'!" % options['filename'])
+
+        sources = [str(node_uuid) for node_uuid in core_models.Node.objects.regpoint('config').registry_fields(
+            source='core.telemetry.http__source'
+        ).filter(
+            source='push',
+        ).values_list('uuid', flat=True)[:options['nodes']]]
+        if not sources:
+            raise base.CommandError("No nodes configured for push are available!")
+
+        push_buffer = ingestion.PushBuffer(url=options['buffer_url'])
+        batch_size = max(1, options['batch_size'])
+        pushes = options['pushes']
+
+        self.stdout.write("Replaying %d pushes for %d nodes with batch size %d...\n" % (pushes, len(sources), batch_size))
+
+        start_time = time.time()
+        processed = 0
+        stored = 0
+        while stored < pushes or processed < stored:
+            # Buffer one push per node, as nodes would push concurrently.
+            for source in sources[:pushes - stored]:
+                push_buffer.store(source, {
+                    'push': {
+                        'source': source,
+                        'data': payload,
+                        'timestamp': timezone.now(),
+                    },
+                    'identity': {
+                        'ip_address': None,
+                    },
+                })
+                stored += 1
+
+            # Drain the buffer.
+            while True:
+                batch = push_buffer.pop_batch(batch_size)
+                if not batch:
+                    break
+
+                if batch_size == 1:
+                    for context in batch.values():
+                        monitor_tasks.run_pipeline(run_id=settings.MONITOR_HTTP_PUSH_RUN, base_context=context)
+                else:
+                    tasks.process_batch(batch)
+
+                processed += len(batch)
+
+            if processed < stored:
+                # Some pushes have expired or have been consumed by other workers.
+                break
+
+        duration = time.time() - start_time
+        self.stdout.write("Processed %d pushes in %.2f seconds.\n" % (processed, duration))
+        if duration > 0:
+            self.stdout.write("Throughput: %.2f pushes/second per worker.\n" % (processed / duration))
@@ -0,0 +1,25 @@
+from django.core.management import base
+
+from ... import ingestion
+
+
+class Command(base.BaseCommand):
+    help = "Displays counts of accepted, rejected and coalesced HTTP pushes."
+    requires_model_validation = True
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            dest='reset',
+            default=False,
+            help="Reset the counters after displaying them.",
+        )
+
+    def handle(self, *args, **options):
+        statistics = ingestion.push_buffer.get_statistics()
+        for counter in (ingestion.ACCEPTED, ingestion.REJECTED, ingestion.COALESCED):
+            self.stdout.write("%s: %d" % (counter, statistics[counter]))
+
+        if options['reset']:
+            ingestion.push_buffer.reset_statistics()
@@ -0,0 +1,201 @@
+import copy
+import glob
+import json
+import os
+import time
+
+from django import apps
+from django.conf import settings
+from django.core.management import base
+from django.db import connection
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+from nodewatcher.core.monitor import worker as monitor_worker
+from nodewatcher.core.monitor.config import config as monitor_config
+
+from .... import models
+
+
+class Command(base.BaseCommand):
+    help = "Benchmarks a monitoring run by replaying captured HTTP telemetry for a number of " \
+           "synthetic nodes in a scratch database, reporting throughput, per-processor cost " \
+           "and database load. Telemetry is replayed as pushed data and datastream data is " \
+           "stored into scratch datastream databases."
+    requires_model_validation = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help="Telemetry file or directory with captured telemetry files.")
+        parser.add_argument('--run', type=str, default='telemetry', help="Monitoring run to benchmark.")
+        parser.add_argument('--nodes', type=int, default=100, help="Number of synthetic nodes.")
+        parser.add_argument('--workers', type=int, default=None, help="Number of workers, defaults to the run configuration.")
+        parser.add_argument('--cycles', type=int, default=1, help="Number of monitoring cycles.")
+        parser.add_argument('--keepdb', action='store_true', help="Preserve the scratch database between benchmarks.")
+        parser.add_argument('--noinput', action='store_false', dest='interactive', help="Do not prompt before destroying an existing scratch database.")
+
+    def handle(self, *args, **options):
+        if os.path.isdir(options['path']):
+            filenames = sorted(glob.glob(os.path.join(options['path'], '*.json')))
+        else:
+            filenames = [options['path']]
+
+        payloads = []
+        for filename in filenames:
+            try:
+                with open(filename, 'r') as telemetry_file:
+                    payload = telemetry_file.read()
+                json.loads(payload)
+            except (IOError, ValueError):
+                raise base.CommandError("Unable to load telemetry from '%s'!" % filename)
+
+            payloads.append(payload)
+
+        if not payloads:
+            raise base.CommandError("No telemetry files found in '%s'!" % options['path'])
+
+        try:
+            run_info = copy.copy(monitor_config.get_run(options['run']))
+        except KeyError:
+            raise base.CommandError("Monitoring run '%s' does not exist!" % options['run'])
+
+        run_info['workers'] = options['workers'] or run_info['workers'] or 1
+        run_info['cycles'] = 1
+        run_info['process_only_node'] = None
+        run_info['store_reports'] = False
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=not options['interactive'],
+            keepdb=options['keepdb'],
+        )
+
+        try:
+            scratch_datastream = self.use_scratch_datastream()
+            try:
+                self.benchmark(run_info, payloads, options)
+            finally:
+                if scratch_datastream is not None:
+                    self.restore_datastream(scratch_datastream, options['keepdb'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+    def use_scratch_datastream(self):
+        """
+        Replaces the backend of the global datastream instance with a backend
+        using scratch databases, so that no benchmark data is written into the
+        configured datastream.
+
+        :return: A tuple (original backend, scratch datastream instance) or None
+            if the datastream module is not installed
+        """
+
+        if not apps.apps.is_installed('nodewatcher.modules.monitor.datastream'):
+            return None
+
+        import django_datastream
+
+        backend_settings = copy.deepcopy(settings.DATASTREAM_BACKEND_SETTINGS)
+        if settings.DATASTREAM_BACKEND == 'datastream.backends.mongodb.Backend':
+            backend_settings['database_name'] = 'test_nodewatcher_datastream'
+        elif settings.DATASTREAM_BACKEND == 'datastream.backends.influxdb.Backend':
+            backend_settings['connection_influxdb']['database'] = 'test_nodewatcher_datastream'
+            backend_settings['connection_metadata']['database'] = connection.settings_dict['NAME']
+        else:
+            raise base.CommandError("Unsupported datastream backend '%s'!" % settings.DATASTREAM_BACKEND)
+
+        scratch = django_datastream.init_datastream(settings.DATASTREAM_BACKEND, backend_settings)
+        original_backend = django_datastream.datastream.backend
+        django_datastream.datastream.backend = scratch.backend
+
+        return original_backend, scratch
+
+    def restore_datastream(self, scratch_datastream, keep):
+        """
+        Restores the original backend of the global datastream instance.
+
+        :param scratch_datastream: Value returned by use_scratch_datastream
+        :param keep: True if scratch datastream data should be preserved
+        """
+
+        import django_datastream
+
+        original_backend, scratch = scratch_datastream
+        try:
+            if not keep:
+                scratch.delete_streams()
+        finally:
+            django_datastream.datastream.backend = original_backend
+
+    def create_nodes(self, count):
+        nodes = []
+        for index in xrange(count):
+            node = core_models.Node()
+            node.save()
+
+            general = node.config.core.general(create=core_models.GeneralConfig)
+            general.name = 'benchmark-%d' % index
+            general.save()
+
+            source = node.config.core.telemetry.http(create=models.HttpTelemetrySourceConfig)
+            source.source = 'push'
+            source.save()
+
+            nodes.append(node.pk)
+
+        return nodes
+
+    def benchmark(self, run_info, payloads, options):
+        nodes = list(core_models.Node.objects.regpoint('config').registry_fields(
+            name='core.general__name'
+        ).filter(name__startswith='benchmark-').values_list('pk', flat=True))[:options['nodes']]
+        if len(nodes) < options['nodes']:
+            nodes.extend(self.create_nodes(options['nodes'] - len(nodes)))
+
+        self.stdout.write("Benchmarking run '%s' with %d nodes, %d telemetry samples and %d workers...\n" % (
+            run_info['name'], len(nodes), len(payloads), run_info['workers']
+        ))
+
+        run = monitor_worker.MonitorRun(run_info)
+        for cycle in xrange(options['cycles']):
+            pushes = {}
+            for index, node in enumerate(nodes):
+                pushes[node] = {
+                    'push': {
+                        'source': node,
+                        'data': payloads[index % len(payloads)],
+                        'timestamp': timezone.now(),
+                    },
+                }
+
+            if run_info['on_demand']:
+                # On-demand runs receive pushes in batches.
+                base_context = {'pushes': pushes}
+            else:
+                base_context = {'for_node': pushes}
+
+            start = time.time()
+            report = run.cycle(base_context)
+            duration = time.time() - start
+
+            self.stdout.write("Cycle %d: %d nodes in %.2f seconds (%.2f nodes/second).\n" % (
+                cycle + 1, len(nodes), duration, len(nodes) / duration if duration > 0 else 0
+            ))
+
+            if report is None:
+                continue
+
+            queries = sum([entry['queries'] for entry in report['processors']])
+            rows = sum([entry['rows'] for entry in report['processors']])
+            self.stdout.write("  Database load: %d queries (%.1f per node), %d rows.\n" % (
+                queries, float(queries) / len(nodes), rows
+            ))
+            self.stdout.write("  %-50s %8s %10s %10s %10s\n" % ("Processor", "Calls", "Time (s)", "Queries", "Rows"))
+            for entry in report['processors']:
+                self.stdout.write("  %-50s %8d %10.2f %10d %10d\n" % (
+                    entry['processor'],
+                    entry['calls'],
+                    entry['time'],
+                    entry['queries'],
+                    entry['rows'],
+                ))
@@ -0,0 +1,54 @@
+import json
+import os
+
+from django.core.management import base
+
+from nodewatcher.core import models as core_models
+
+from .... import parser as telemetry_parser
+
+
+class Command(base.BaseCommand):
+    help = "Captures HTTP telemetry of polled nodes into files, which can be replayed " \
+           "by the telemetry_benchmark command."
+    requires_model_validation = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', type=str, help="Directory where captured telemetry is stored.")
+        parser.add_argument('--node', type=str, action='append', help="UUID of a node to capture, may be repeated.")
+        parser.add_argument('--limit', type=int, default=10, help="Maximum number of captured nodes.")
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        nodes = core_models.Node.objects.regpoint('config').registry_fields(
+            source='core.telemetry.http__source'
+        ).filter(source='poll')
+        if options['node']:
+            nodes = nodes.filter(uuid__in=options['node'])
+
+        captured = 0
+        for node in nodes:
+            if captured >= options['limit']:
+                break
+
+            try:
+                router_id = node.config.core.routerid(queryset=True).filter(rid_family='ipv4')[0].router_id
+            except IndexError:
+                continue
+
+            try:
+                data = telemetry_parser.HttpTelemetryParser(router_id, 80).fetch_data('/nodewatcher/feed')
+                json.loads(data)
+            except (telemetry_parser.HttpTelemetryParseFailed, ValueError):
+                self.stdout.write("Skipping node %s as it did not return valid v3 telemetry.\n" % node.uuid)
+                continue
+
+            with open(os.path.join(directory, '%s.json' % node.uuid), 'w') as telemetry_file:
+                telemetry_file.write(data)
+
+            captured += 1
+
+        self.stdout.write("Captured telemetry of %d nodes.\n" % captured)
@@ -130,7 +130,8 @@ class HTTPTelemetry(monitor_processors.NodeProcessor):
 class HTTPGetPushedNode(monitor_processors.NetworkProcessor):
     """
     A processor that populates the nodes set with the node that is set as the push
-    source in the context.
+    source in the context. When a batch of pushes is processed, all pushing nodes
+    are added and each push is moved into the per-node context of its node.
     """
 
     def process(self, context, nodes):
@@ -156,5 +157,24 @@ class HTTPGetPushedNode(monitor_processors.NetworkProcessor):
                 nodes.add(node)
             except core_models.Node.DoesNotExist:
                 self.logger.error("Node with UUID '%s' does not exist." % context.push.source)
+        elif context.pushes:
+            # A batch of pushes is being processed. Fetch all pushing nodes at once and move
+            # each push into the context of its node.
+            push_nodes = core_models.Node.objects.regpoint('config').registry_fields(
+                source='core.telemetry.http__source'
+            ).filter(
+                uuid__in=context.pushes.keys(),
+                source='push',
+            )
+            for node in push_nodes:
+                context.for_node[node.pk] = context.pushes[str(node.uuid)]
+                nodes.add(node)
+
+            missing = set(context.pushes.keys()) - set([str(node.uuid) for node in nodes])
+            for source in missing:
+                self.logger.error("Node with UUID '%s' does not exist or is not configured to push." % source)
+
+            # Pushes are now stored in per-node contexts, so they should not be copied for every node.
+            del context['pushes']
 
         return context, nodes
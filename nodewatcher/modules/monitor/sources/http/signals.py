@@ -3,3 +3,8 @@ from django import dispatch
 # Called to extract a processing context from HTTP headers. The returned contexts
 # are merged together.
 extract_context = dispatch.Signal(providing_args=['headers', 'uuid'])
+
+# Called before a push from a known node is accepted for processing, in order to
+# cheaply reject pushes that would fail processing anyway. Receivers should return
+# False to reject the push.
+validate_push = dispatch.Signal(providing_args=['node', 'context'])
@@ -0,0 +1,50 @@
+from django.conf import settings
+
+from celery.task import task as celery_task
+
+from nodewatcher.core.monitor import tasks as monitor_tasks
+
+from . import ingestion
+
+
+@celery_task()
+def process_push(source):
+    """
+    Processes the latest buffered push of a node. When batching is enabled,
+    pending pushes of other nodes are processed together with it.
+
+    :param source: Normalized UUID of the pushing node
+    """
+
+    batch_size = getattr(settings, 'MONITOR_HTTP_PUSH_BATCH_SIZE', 1)
+    if batch_size <= 1:
+        context = ingestion.push_buffer.pop(source)
+        if context is None:
+            # The push has already been processed by another task or has expired.
+            return
+
+        monitor_tasks.run_pipeline(
+            run_id=settings.MONITOR_HTTP_PUSH_RUN,
+            base_context=context,
+        )
+        return
+
+    process_batch(ingestion.push_buffer.pop_batch(batch_size))
+
+
+def process_batch(batch):
+    """
+    Processes a batch of pushes with a single run of the push monitoring
+    pipeline.
+
+    :param batch: A dictionary mapping node UUIDs to push contexts
+    """
+
+    if not batch:
+        return
+
+    monitor_tasks.run_pipeline(
+        run_id=settings.MONITOR_HTTP_PUSH_RUN,
+        base_context={'pushes': batch},
+        max_nodes=len(batch),
+    )
@@ -1,6 +1,6 @@
 import unittest
 
-from . import parser
+from . import ingestion, parser
 
 
 class TestContext(dict):
@@ -70,3 +70,21 @@ general.buffers: 1788
         self.assertEquals(tree['core']['general']['uuid'], '64840ad9-aac1-4494-b4d1-9de5d8cbedd9')
 
         self.assertEquals(tree['_meta']['version'], 3)
+
+
+class HttpPushIngestionTestCase(unittest.TestCase):
+    def test_normalize_uuid(self):
+        self.assertEquals(
+            ingestion.normalize_uuid('64840AD9AAC144944B4D19DE5D8CBEDD'),
+            '64840ad9-aac1-4494-4b4d-19de5d8cbedd',
+        )
+        self.assertEquals(
+            ingestion.normalize_uuid('64840ad9-aac1-4494-b4d1-9de5d8cbedd9'),
+            '64840ad9-aac1-4494-b4d1-9de5d8cbedd9',
+        )
+
+        with self.assertRaises(ValueError):
+            ingestion.normalize_uuid('not-a-uuid')
+
+        with self.assertRaises(ValueError):
+            ingestion.normalize_uuid('64840ad9-aac1-4494-b4d1-9de5d8cbedd9/../')
@@ -1,13 +1,11 @@
 from django import http
-from django.conf import settings
 from django.views import generic
 from django.views.decorators import csrf
 from django.utils import decorators, timezone
 
-from nodewatcher.core.monitor import tasks as monitor_tasks
 from nodewatcher.utils import datastructures
 
-from . import signals
+from . import ingestion, signals, tasks
 
 
 class HttpPushEndpoint(generic.View):
@@ -20,6 +18,12 @@ class HttpPushEndpoint(generic.View):
         Handles HTTP push requests from nodewatcher-agent.
         """
 
+        try:
+            uuid = ingestion.normalize_uuid(uuid)
+        except ValueError:
+            ingestion.push_buffer.record(ingestion.REJECTED)
+            return http.JsonResponse({'status': 'error', 'error': 'Invalid node UUID.'}, status=400)
+
         # Determine the remote IP address.
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
@@ -46,10 +50,17 @@ class HttpPushEndpoint(generic.View):
 
             datastructures.merge_dict(context, extracted_context)
 
-        # Schedule a new push task.
-        monitor_tasks.run_pipeline.delay(
-            run_id=settings.MONITOR_HTTP_PUSH_RUN,
-            base_context=context,
-        )
+        # Reject pushes that would be discarded during processing anyway.
+        if not ingestion.validate_push(uuid, context):
+            ingestion.push_buffer.record(ingestion.REJECTED)
+            return http.JsonResponse({'status': 'error', 'error': 'Push rejected.'}, status=403)
+
+        # Buffer the push and schedule a new push task unless one is already queued for
+        # this node, in which case it will process this push instead.
+        try:
+            if ingestion.push_buffer.store(uuid, context):
+                tasks.process_push.delay(uuid)
+        except ingestion.PushBufferFull:
+            return http.JsonResponse({'status': 'error', 'error': 'Too many pending pushes.'}, status=503)
 
         return http.JsonResponse({'status': 'ok'})
@@ -4,3 +4,9 @@ from django import apps
 class UnknownNodesConfig(apps.AppConfig):
     name = 'nodewatcher.modules.monitor.unknown_nodes'
     label = 'unknown_nodes'
+
+    def ready(self):
+        super(UnknownNodesConfig, self).ready()
+
+        # Connect signals.
+        from . import signals
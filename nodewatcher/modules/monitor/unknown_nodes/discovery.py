@@ -0,0 +1,255 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core import cache as django_cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from nodewatcher.core import models as core_models
+
+from . import models
+
+logger = logging.getLogger('monitor.unknown_nodes')
+
+# Cache key of the known nodes generation, which changes when nodes are created or removed.
+KNOWN_NODES_GENERATION_KEY = 'nodewatcher:unknown_nodes:known_generation'
+
+
+class KnownNodes(object):
+    """
+    In-process set of known node UUIDs. The set is reloaded when nodes are created
+    or removed in any process and at least every ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=300):
+        """
+        Class constructor.
+
+        :param ttl: Maximum age of the set in seconds
+        """
+
+        self.ttl = ttl
+        self._nodes = None
+        self._generation = None
+        self._loaded = 0
+
+    @property
+    def cache(self):
+        return django_cache.caches[getattr(settings, 'UNKNOWN_NODES_CACHE', 'default')]
+
+    def invalidate(self):
+        """
+        Invalidates known node sets in all processes.
+        """
+
+        try:
+            self.cache.incr(KNOWN_NODES_GENERATION_KEY)
+        except ValueError:
+            self.cache.set(KNOWN_NODES_GENERATION_KEY, 1, None)
+
+        self._nodes = None
+
+    def get_nodes(self):
+        """
+        Returns the set of known node UUIDs.
+        """
+
+        generation = self.cache.get(KNOWN_NODES_GENERATION_KEY)
+        if self._nodes is None or generation != self._generation or time.time() - self._loaded > self.ttl:
+            self._nodes = set([str(node_uuid) for node_uuid in core_models.Node.objects.values_list('uuid', flat=True)])
+            self._generation = generation
+            self._loaded = time.time()
+
+        return self._nodes
+
+    def add(self, sources):
+        """
+        Adds nodes known to exist to the set of this process.
+
+        :param sources: Node UUIDs
+        """
+
+        if self._nodes is not None:
+            self._nodes.update(sources)
+
+
+class Sightings(object):
+    """
+    Per-process buffer of unknown node sightings, which are periodically stored
+    using a single bulk upsert. Buffered sightings are flushed by a background
+    timer at most ``interval`` seconds after they are recorded, so they do not
+    depend on further pushes handled by the same process.
+    """
+
+    def __init__(self, interval=None, limit=None):
+        """
+        Class constructor.
+
+        :param interval: Optional time in seconds between flushes
+        :param limit: Optional number of buffered nodes which causes a flush
+        """
+
+        self.interval = interval or getattr(settings, 'UNKNOWN_NODES_FLUSH_INTERVAL', 10)
+        self.limit = limit or getattr(settings, 'UNKNOWN_NODES_FLUSH_LIMIT', 1000)
+        self._pid = os.getpid()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _check_process(self):
+        if os.getpid() != self._pid:
+            # Do not store sightings inherited from the parent process. Timer threads
+            # do not survive a fork.
+            self._pid = os.getpid()
+            self._pending = {}
+            self._lock = threading.Lock()
+            self._timer = None
+
+    def _merge(self, source, sighting):
+        """
+        Merges a sighting into the buffer. Must be called with the lock held.
+        """
+
+        pending = self._pending.get(source, None)
+        if pending is None:
+            self._pending[source] = sighting
+        else:
+            pending['first_seen'] = min(pending['first_seen'], sighting['first_seen'])
+            pending['sightings'] += sighting['sightings']
+            if sighting['last_seen'] >= pending['last_seen']:
+                for key in ('last_seen', 'ip_address', 'certificate', 'origin'):
+                    pending[key] = sighting[key]
+
+        if self._timer is None:
+            self._timer = threading.Timer(self.interval, self._flush_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def record(self, source, ip_address, certificate, origin):
+        """
+        Records a sighting of an unknown node.
+
+        :param source: Normalized node UUID
+        :param ip_address: Optional IP address of the node
+        :param certificate: Optional certificate dictionary
+        :param origin: Origin of the sighting
+        """
+
+        self._check_process()
+
+        now = timezone.now()
+        with self._lock:
+            self._merge(source, {
+                'first_seen': now,
+                'last_seen': now,
+                'ip_address': ip_address,
+                'certificate': certificate,
+                'origin': origin,
+                'sightings': 1,
+            })
+
+    def is_due(self):
+        return len(self._pending) >= self.limit
+
+    def schedule_flush(self):
+        """
+        Flushes buffered sightings after the current transaction commits, so they
+        are not lost when it is rolled back.
+        """
+
+        transaction.on_commit(self._flush_logged)
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to store unknown node sightings.")
+
+    def _flush_timer(self):
+        try:
+            self._flush_logged()
+        finally:
+            # The timer thread has its own database connection.
+            connection.close()
+
+    def flush(self):
+        """
+        Stores all buffered sightings of nodes which are still unknown. When
+        storing fails, the sightings are returned to the buffer.
+        """
+
+        self._check_process()
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            pending = self._pending
+            self._pending = {}
+
+        if not pending:
+            return
+
+        try:
+            self._store(pending)
+        except:
+            with self._lock:
+                for source, sighting in pending.items():
+                    self._merge(source, sighting)
+            raise
+
+    def _store(self, pending):
+        # Nodes may have been registered since they were sighted.
+        registered = set([str(node_uuid) for node_uuid in core_models.Node.objects.filter(
+            uuid__in=pending.keys(),
+        ).values_list('uuid', flat=True)])
+        known_nodes.add(registered)
+
+        rows = []
+        values = []
+        # Rows are locked in a consistent order to avoid deadlocks between processes.
+        for source, sighting in sorted(pending.items()):
+            if source in registered:
+                continue
+
+            rows.append('(%s, %s, %s, %s, %s::jsonb, %s, %s)')
+            values.extend([
+                source,
+                sighting['first_seen'],
+                sighting['last_seen'],
+                sighting['ip_address'],
+                json.dumps(sighting['certificate']) if sighting['certificate'] is not None else None,
+                sighting['origin'],
+                sighting['sightings'],
+            ])
+
+        if not rows:
+            return
+
+        table = connection.ops.quote_name(models.UnknownNode._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} AS unknown (uuid, first_seen, last_seen, ip_address, certificate, origin, sightings) '
+                'VALUES {rows} '
+                'ON CONFLICT (uuid) DO UPDATE SET '
+                'last_seen = EXCLUDED.last_seen, '
+                'ip_address = EXCLUDED.ip_address, '
+                'certificate = EXCLUDED.certificate, '
+                'origin = EXCLUDED.origin, '
+                'sightings = unknown.sightings + EXCLUDED.sightings'.format(table=table, rows=', '.join(rows)),
+                values
+            )
+
+known_nodes = KnownNodes()
+sightings = Sightings()
+
+
+@atexit.register
+def _flush_on_exit():
+    sightings._flush_logged()
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('unknown_nodes', '0004_json_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unknownnode',
+            name='sightings',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -23,3 +23,4 @@ class UnknownNode(models.Model):
     ip_address = models.GenericIPAddressField(null=True, unpack_ipv4=True)
     certificate = JSONField(null=True)
     origin = models.CharField(max_length=20, choices=ORIGIN_CHOICES, default=UNKNOWN)
+    sightings = models.PositiveIntegerField(default=1)
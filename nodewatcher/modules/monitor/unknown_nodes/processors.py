@@ -1,9 +1,8 @@
 import uuid
 
-from nodewatcher.core import models as core_models
 from nodewatcher.core.monitor import processors as monitor_processors
 
-from . import models
+from . import discovery, models
 
 
 class DiscoverUnknownNodes(monitor_processors.NetworkProcessor):
@@ -21,24 +20,34 @@ class DiscoverUnknownNodes(monitor_processors.NetworkProcessor):
         :return: A (possibly) modified context and a (possibly) modified set of nodes
         """
 
-        if not context.push.source:
+        if context.push.source:
+            pushes = [context]
+        elif context.pushes:
+            pushes = context.pushes.values()
+        else:
             return context, nodes
 
-        try:
-            core_models.Node.objects.get(uuid=context.push.source)
-        except core_models.Node.DoesNotExist:
-            # If there is currently no such node, add an unknown node record.
+        # Sightings of unknown nodes are buffered and stored periodically in bulk. Buffered
+        # sightings are also flushed in the background, when no further pushes arrive.
+        known = discovery.known_nodes.get_nodes()
+        for push_context in pushes:
             try:
-                models.UnknownNode.objects.update_or_create(
-                    uuid=str(uuid.UUID(context.push.source)),
-                    defaults={
-                        'ip_address': context.identity.ip_address or None,
-                        'certificate': dict(context.identity.certificate or {}) or None,
-                        'origin': models.UnknownNode.PUSH,
-                    },
-                )
+                source = str(uuid.UUID(push_context.push.source))
             except ValueError:
                 # Ignore invalid UUIDs.
-                pass
+                continue
+
+            if source in known:
+                continue
+
+            discovery.sightings.record(
+                source,
+                ip_address=push_context.identity.ip_address or None,
+                certificate=dict(push_context.identity.certificate or {}) or None,
+                origin=models.UnknownNode.PUSH,
+            )
+
+        if discovery.sightings.is_due():
+            discovery.sightings.schedule_flush()
 
         return context, nodes
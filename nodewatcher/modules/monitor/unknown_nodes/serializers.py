@@ -10,4 +10,4 @@ class UnknownNodeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.UnknownNode
-        fields = ('uuid', 'first_seen', 'last_seen', 'ip_address', 'certificate', 'origin')
+        fields = ('uuid', 'first_seen', 'last_seen', 'ip_address', 'certificate', 'origin', 'sightings')
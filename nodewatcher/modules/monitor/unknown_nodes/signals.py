@@ -0,0 +1,37 @@
+from celery import signals as celery_signals
+
+from django import dispatch
+from django.db.models import signals as model_signals
+
+from nodewatcher.core import models as core_models
+
+from . import discovery
+
+
+@dispatch.receiver(model_signals.post_save, sender=core_models.Node)
+def node_created(sender, instance, created, **kwargs):
+    """
+    Refreshes known nodes when a node is created.
+    """
+
+    if created:
+        discovery.known_nodes.invalidate()
+
+
+@dispatch.receiver(model_signals.post_delete, sender=core_models.Node)
+def node_removed(sender, instance, **kwargs):
+    """
+    Refreshes known nodes when a node is removed.
+    """
+
+    discovery.known_nodes.invalidate()
+
+
+@celery_signals.worker_process_shutdown.connect
+def worker_process_shutdown(**kwargs):
+    """
+    Stores buffered sightings when a worker process exits, as exit handlers are
+    not run for recycled worker processes.
+    """
+
+    discovery.sightings.flush()
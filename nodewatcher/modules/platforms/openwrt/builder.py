@@ -166,6 +166,8 @@ class Builder(object):
     def extract_files(self):
         """
         Extract built files.
+
+        :return: A list of (filename, temporary file) tuples
         """
 
         base_dir = self.get_base_output_dir()
@@ -173,21 +175,27 @@ class Builder(object):
 
         # Collect the output files and return them.
         fw_files = []
-        for fw_file in self.profile['files']:
-            matched = False
-            for output_location in output_locations:
-                for output_filename in self._builder.list_dir(os.path.join(base_dir, output_location)):
-                    if fnmatch.fnmatch(output_filename, fw_file):
-                        try:
-                            fw_files.append((
-                                output_filename,
-                                self._builder.read_result_file(os.path.join(base_dir, output_location, output_filename))
-                            ))
-                            matched = True
-                        except IOError:
-                            continue
-
-            if not matched:
-                raise cgm_exceptions.BuildError('Output file \'%s\' not found!' % fw_file)
+        try:
+            for fw_file in self.profile['files']:
+                matched = False
+                for output_location in output_locations:
+                    for output_filename in self._builder.list_dir(os.path.join(base_dir, output_location)):
+                        if fnmatch.fnmatch(output_filename, fw_file):
+                            try:
+                                fw_files.append((
+                                    output_filename,
+                                    self._builder.read_result_file(os.path.join(base_dir, output_location, output_filename))
+                                ))
+                                matched = True
+                            except IOError:
+                                continue
+
+                if not matched:
+                    raise cgm_exceptions.BuildError('Output file \'%s\' not found!' % fw_file)
+        except:
+            # Discard any temporary files that have already been transferred.
+            for output_filename, output_file in fw_files:
+                output_file.close()
+            raise
 
         return fw_files
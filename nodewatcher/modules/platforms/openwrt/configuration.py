@@ -162,15 +162,16 @@ class UCIConfiguration(cgm_base.PlatformConfiguration):
         :param fmt: Wanted export format
         """
 
-        if fmt == uci.UCIFormat.DUMP:
-            # UCI dump format.
-            output = []
-            for name, package in self._packages.iteritems():
-                output += package.format(fmt=fmt)
-        elif fmt == uci.UCIFormat.FILES:
-            # UCI split into multiple files.
-            output = {}
-            for name, package in self._packages.iteritems():
-                output[name] = '\n'.join(package.format(fmt=fmt))
-
-        return output
+        return uci.emitter.emit(self._packages, fmt=fmt)
+
+    def diff(self, other):
+        """
+        Returns structural changes between this and another UCI configuration,
+        which affect the formatted output. When there are no changes, both
+        configurations produce identical UCI files.
+
+        :param other: Another UCIConfiguration instance
+        :return: A list of uci.UCIChange instances
+        """
+
+        return uci.emitter.diff(self._packages, other._packages)
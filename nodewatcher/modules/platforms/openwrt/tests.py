@@ -0,0 +1,85 @@
+import collections
+import unittest
+
+from . import uci
+
+
+def get_packages(hostname='node', ports=('lan1', 'lan2')):
+    packages = collections.OrderedDict()
+
+    system = packages['system'] = uci.UCIPackage('system')
+    section = system.add('system')
+    section.hostname = hostname
+    section.timezone = 'CET-1CEST,M3.5.0,M10.5.0/3 '
+    section.description = 'first\nsecond'
+    section._internal = 'not formatted'
+
+    network = packages['network'] = uci.UCIPackage('network')
+    section = network.add(interface='lan')
+    section.ifname = list(ports)
+    section.proto = 'static'
+    section.ipaddr = '10.254.0.1'
+    section.auto = True
+    section.defaultroute = False
+    section.mtu = 1500
+
+    section = network.add(interface='wan')
+    section.ifname = 'eth1'
+    section.proto = 'dhcp'
+
+    firewall = packages['firewall'] = uci.UCIPackage('firewall')
+    for zone in ('lan', 'wan'):
+        section = firewall.add('zone')
+        section.name = zone
+        section.network = [zone]
+        section.masq = zone == 'wan'
+
+    packages['empty'] = uci.UCIPackage('empty')
+
+    return packages
+
+
+class UCIEmitterTest(unittest.TestCase):
+    def test_emit(self):
+        packages = get_packages()
+        emitter = uci.UCIEmitter()
+
+        # Output must be identical to the output of package formatters.
+        output = []
+        for package in packages.values():
+            output += package.format(fmt=uci.UCIFormat.DUMP)
+        self.assertEqual(emitter.emit(packages, fmt=uci.UCIFormat.DUMP), output)
+
+        output = {}
+        for name, package in packages.items():
+            output[name] = '\n'.join(package.format(fmt=uci.UCIFormat.FILES))
+        self.assertEqual(emitter.emit(packages, fmt=uci.UCIFormat.FILES), output)
+
+        # Cached fragments must be reused when the same options are emitted again.
+        self.assertEqual(emitter.emit(get_packages(), fmt=uci.UCIFormat.FILES), output)
+
+    def test_diff(self):
+        emitter = uci.UCIEmitter()
+        self.assertEqual(emitter.diff(get_packages(), get_packages()), [])
+
+        # Values with the same formatted output are not changes.
+        packages = get_packages()
+        packages['network'].lan.mtu = '1500'
+        packages['network'].lan.auto = 1
+        self.assertEqual(emitter.diff(get_packages(), packages), [])
+
+        changes = emitter.diff(get_packages(), get_packages(hostname='other', ports=('lan1',)))
+        self.assertEqual(changes, [
+            uci.UCIChange('network', 'lan', 'ifname', ["\tlist ifname 'lan1'", "\tlist ifname 'lan2'"], ["\tlist ifname 'lan1'"]),
+            uci.UCIChange('system', '@system[0]', 'hostname', ["\toption hostname 'node'"], ["\toption hostname 'other'"]),
+        ])
+
+        packages = get_packages()
+        del packages['empty']
+        packages['firewall'].add(defaults='defaults')
+        changes = emitter.diff(get_packages(), packages)
+        self.assertEqual(changes, [
+            uci.UCIChange('empty', None, None, [], None),
+            uci.UCIChange('firewall', None, None, ['@zone[0]', '@zone[1]'], ['defaults', '@zone[0]', '@zone[1]']),
+            uci.UCIChange('firewall', 'defaults', None, None, 'defaults'),
+        ])
@@ -6,6 +6,9 @@ UCI_IDENTIFIER = re.compile(r'^[a-zA-Z0-9_]+$')
 UCI_IDENTIFIER_REPLACE = re.compile(r'[^a-zA-Z0-9_]')
 UCI_PACKAGE_IDENTIFIER = re.compile(r'^[a-zA-Z0-9_-]+$')
 
+# A single change between two UCI configurations.
+UCIChange = collections.namedtuple('UCIChange', ['package', 'section', 'option', 'old', 'new'])
+
 
 class UCIFormat:
     """
@@ -355,3 +358,220 @@ class UCIPackage(object):
                 output += section.format(self._package, name, idx, fmt=fmt)
 
         return output
+
+
+class UCIEmitter(object):
+    """
+    Serializes complete UCI configurations in a single pass. Constant output
+    fragments, which only depend on option names, are prepared once and then
+    reused for all configurations. The output is identical to the output of
+    the format methods of packages and sections.
+    """
+
+    def __init__(self, max_fragments=10000):
+        """
+        Class constructor.
+
+        :param max_fragments: Maximum number of cached option fragments
+        """
+
+        self.max_fragments = max_fragments
+        self._fragments = {}
+
+    def get_fragments(self, key):
+        """
+        Returns constant output fragments of an option.
+
+        :param key: Option name
+        :return: A tuple (dump fragment, option fragment, list fragment)
+        """
+
+        fragments = self._fragments.get(key, None)
+        if fragments is None:
+            if len(self._fragments) >= self.max_fragments:
+                self._fragments.clear()
+
+            fragments = self._fragments[key] = (
+                '%s=' % key,
+                '\toption %s \'' % key,
+                '\tlist %s \'' % key,
+            )
+
+        return fragments
+
+    def emit_section(self, output, package, name, section, idx=None, fmt=UCIFormat.DUMP):
+        """
+        Appends formatted section lines to the output.
+
+        :param output: Output list
+        :param package: Package name
+        :param name: Section name (or type for ordered sections)
+        :param section: UCISection instance
+        :param idx: Index of an ordered section
+        :param fmt: Wanted export format
+        """
+
+        typ = section._typ
+        if fmt == UCIFormat.DUMP:
+            if typ is not None:
+                output.append('{0}.{1}={2}'.format(package, name, typ))
+                prefix = '{0}.{1}.'.format(package, name)
+            else:
+                output.append('{0}.@{1}[{2}]={1}'.format(package, name, idx))
+                prefix = '{0}.@{1}[{2}].'.format(package, name, idx)
+
+            for key, value in section._values.iteritems():
+                if key[0] == '_':
+                    continue
+
+                if isinstance(value, (list, tuple)):
+                    value = ' '.join(str(x) for x in value)
+                elif isinstance(value, bool):
+                    value = '1' if value else '0'
+                else:
+                    value = str(value).strip().replace('\n', ' ')
+
+                output.append(prefix + self.get_fragments(key)[0] + value)
+        elif fmt == UCIFormat.FILES:
+            if typ is not None:
+                output.append('config %s \'%s\'' % (typ, name))
+            else:
+                output.append('config %s' % name)
+
+            for key, value in section._values.iteritems():
+                if key[0] == '_':
+                    continue
+
+                output.extend(self.format_option(key, value))
+
+            output.append('')
+        else:
+            raise ValueError("Unsupported UCI format '%s'." % fmt)
+
+    def format_option(self, key, value):
+        """
+        Returns option lines in the UCIFormat.FILES format.
+
+        :param key: Option name
+        :param value: Option value
+        """
+
+        dump_fragment, option_fragment, list_fragment = self.get_fragments(key)
+        if isinstance(value, (list, tuple)):
+            return [list_fragment + ('%s' % (item,)) + '\'' for item in value]
+        elif isinstance(value, bool):
+            return [option_fragment + ('1' if value else '0') + '\'']
+        else:
+            return [option_fragment + str(value).strip().replace('\n', ' ') + '\'']
+
+    def emit_package(self, output, package, fmt=UCIFormat.DUMP):
+        """
+        Appends formatted package lines to the output.
+
+        :param output: Output list
+        :param package: UCIPackage instance
+        :param fmt: Wanted export format
+        """
+
+        package_name = package._package
+        for name, section in package._named_sections.iteritems():
+            self.emit_section(output, package_name, name, section, fmt=fmt)
+
+        for name, sections in package._ordered_sections.iteritems():
+            for idx, section in enumerate(sections):
+                self.emit_section(output, package_name, name, section, idx, fmt=fmt)
+
+    def emit(self, packages, fmt=UCIFormat.DUMP):
+        """
+        Formats UCI configuration so it is suitable for loading into UCI.
+
+        :param packages: A dictionary of UCIPackage instances keyed by package name
+        :param fmt: Wanted export format
+        :return: A list of lines for UCIFormat.DUMP or a dictionary of file
+            contents keyed by package name for UCIFormat.FILES
+        """
+
+        if fmt == UCIFormat.DUMP:
+            output = []
+            for name, package in packages.iteritems():
+                self.emit_package(output, package, fmt=fmt)
+        elif fmt == UCIFormat.FILES:
+            output = {}
+            for name, package in packages.iteritems():
+                lines = []
+                self.emit_package(lines, package, fmt=fmt)
+                output[name] = '\n'.join(lines)
+        else:
+            raise ValueError("Unsupported UCI format '%s'." % fmt)
+
+        return output
+
+    def get_structure(self, package):
+        """
+        Returns the effective structure of a package as an ordered dictionary,
+        keyed by section identifier, of tuples (section type, options). Options
+        are dictionaries of formatted option lines keyed by option name.
+
+        :param package: UCIPackage instance
+        """
+
+        structure = collections.OrderedDict()
+        for name, section in package._named_sections.iteritems():
+            structure[name] = (section._typ, section)
+
+        for name, sections in package._ordered_sections.iteritems():
+            for idx, section in enumerate(sections):
+                structure['@%s[%d]' % (name, idx)] = (name, section)
+
+        for section_id, (typ, section) in structure.items():
+            structure[section_id] = (typ, dict([
+                (key, self.format_option(key, value))
+                for key, value in section._values.iteritems()
+                if key[0] != '_'
+            ]))
+
+        return structure
+
+    def diff(self, old, new):
+        """
+        Returns structural changes between two UCI configurations, which affect
+        their formatted output. Package-level changes (addition, removal or
+        reordering of sections) have section set to None and the lists of
+        section identifiers as values. Section-level changes have option set to
+        None and section types as values. Option-level changes have formatted
+        option lines as values. Missing values are None.
+
+        :param old: A dictionary of old UCIPackage instances keyed by package name
+        :param new: A dictionary of new UCIPackage instances keyed by package name
+        :return: A list of UCIChange instances, which is empty when the configurations
+            produce the same output
+        """
+
+        changes = []
+        for package_name in sorted(set(old.keys()) | set(new.keys())):
+            old_sections = self.get_structure(old[package_name]) if package_name in old else None
+            new_sections = self.get_structure(new[package_name]) if package_name in new else None
+
+            old_ids = old_sections.keys() if old_sections is not None else None
+            new_ids = new_sections.keys() if new_sections is not None else None
+            if old_ids != new_ids:
+                changes.append(UCIChange(package_name, None, None, old_ids, new_ids))
+
+            old_sections = old_sections or {}
+            new_sections = new_sections or {}
+            for section_id in (old_ids or []) + [x for x in (new_ids or []) if x not in old_sections]:
+                old_type, old_options = old_sections.get(section_id, (None, {}))
+                new_type, new_options = new_sections.get(section_id, (None, {}))
+                if old_type != new_type:
+                    changes.append(UCIChange(package_name, section_id, None, old_type, new_type))
+
+                for key in sorted(set(old_options.keys()) | set(new_options.keys())):
+                    old_value = old_options.get(key, None)
+                    new_value = new_options.get(key, None)
+                    if old_value != new_value:
+                        changes.append(UCIChange(package_name, section_id, key, old_value, new_value))
+
+        return changes
+
+# Shared emitter instance
+emitter = UCIEmitter()
@@ -9,4 +9,5 @@ components.partials.get_partial('node_display_partial').add(components.PartialEn
     name='babel',
     weight=110,
     template='nodes/babel.html',
+    cache=components.CachePolicy([components.registry_version()]),
 ))
@@ -0,0 +1,259 @@
+import logging
+import os
+import socket
+import threading
+
+import radix
+
+from . import parser as babel_parser
+
+# Logger instance
+logger = logging.getLogger('routing.babel.monitor')
+
+
+class BabelSnapshot(object):
+    """
+    An immutable snapshot of babeld state. It provides the same properties
+    as the one-shot parser, so it may be used in its place.
+    """
+
+    def __init__(self, node_info, neighbours, exported_routes, routes):
+        """
+        Class constructor.
+
+        :param node_info: Information about the local babeld node
+        :param neighbours: A list of neighbours
+        :param exported_routes: A list of exported routes
+        :param routes: A radix tree containing all the routes
+        """
+
+        self.node_info = node_info
+        self.neighbours = neighbours
+        self.exported_routes = exported_routes
+        self.routes = routes
+
+
+class BabelMonitor(threading.Thread):
+    """
+    A background client that stays subscribed to babeld updates using its
+    ``monitor`` command and applies them incrementally to an in-memory
+    route table.
+    """
+
+    def __init__(self, host, port, reconnect_interval=5):
+        """
+        Class constructor.
+
+        :param host: babeld local socket host
+        :param port: babeld local socket port
+        :param reconnect_interval: Number of seconds to wait before reconnecting
+        """
+
+        super(BabelMonitor, self).__init__(name='babel-monitor-%s-%s' % (host, port))
+        self.daemon = True
+
+        self.host = host
+        self.port = port
+        self.reconnect_interval = reconnect_interval
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._socket = None
+        self._reset()
+
+    def _reset(self):
+        """
+        Resets all state. Must be called with the lock held.
+        """
+
+        self._node_info = {}
+        self._neighbours = {}
+        self._exported_routes = {}
+        self._routes = {}
+        self._synchronized = False
+        self._route_snapshot = None
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._session()
+            except (socket.error, EOFError):
+                logger.warning("Lost connection with babeld on %s:%s." % (self.host, self.port))
+
+            with self._lock:
+                self._reset()
+
+            self._stopped.wait(self.reconnect_interval)
+
+    def stop(self):
+        """
+        Stops the monitor.
+        """
+
+        self._stopped.set()
+
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except (AttributeError, socket.error):
+            pass
+
+    def _session(self):
+        """
+        Connects to babeld, subscribes to updates and processes them until the
+        connection is closed.
+        """
+
+        connection = socket.create_connection((self.host, self.port), timeout=15)
+        try:
+            self._socket = connection
+            connection.settimeout(None)
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            connection.sendall('monitor\n')
+
+            stream = connection.makefile('r')
+            for line in iter(stream.readline, ''):
+                if self._stopped.is_set():
+                    break
+
+                self.apply(line.rstrip('\n'))
+        finally:
+            self._socket = None
+            connection.close()
+
+    def apply(self, line):
+        """
+        Applies a single line of babeld output to the route table.
+
+        :param line: Line without the trailing newline
+        """
+
+        if line in ('done', 'ok'):
+            # The initial dump has been completed. Older babeld versions end the dump with
+            # 'done', newer ones with 'ok', which is also sent after the connection banner.
+            with self._lock:
+                if self._node_info:
+                    self._synchronized = True
+            return
+
+        update = babel_parser.parse_line(line)
+        if update is None:
+            return
+
+        command, update_type, identifier, arguments = update
+        if command not in ('add', 'change', 'flush'):
+            return
+
+        with self._lock:
+            if update_type == 'self':
+                if command != 'flush':
+                    self._node_info = {
+                        'hostname': identifier,
+                        'router_id': arguments.get('id'),
+                    }
+                return
+            elif update_type == 'neighbour':
+                table = self._neighbours
+            elif update_type == 'xroute':
+                table = self._exported_routes
+            elif update_type == 'route':
+                table = self._routes
+            else:
+                return
+
+            if command == 'flush':
+                table.pop(identifier, None)
+            else:
+                table[identifier] = arguments
+
+            if update_type != 'neighbour':
+                self._route_snapshot = None
+
+    def is_synchronized(self):
+        """
+        Returns True if the monitor is connected and has received a full dump.
+        """
+
+        return self._synchronized
+
+    def snapshot(self):
+        """
+        Returns a snapshot of the current babeld state, or None if the monitor
+        is not synchronized. The radix tree is only rebuilt when routes have
+        changed since the previous snapshot, so it must not be modified.
+        """
+
+        if os.getpid() != self._pid:
+            # In a forked process the monitor thread is not running, so the inherited state
+            # is frozen and must not be locked as the lock may have been held during fork.
+            return self._get_snapshot()
+
+        with self._lock:
+            return self._get_snapshot()
+
+    def _get_snapshot(self):
+        if not self._synchronized:
+            return None
+
+        if self._route_snapshot is None:
+            routes = radix.Radix()
+            for arguments in self._exported_routes.values():
+                if 'prefix' not in arguments:
+                    continue
+
+                node = routes.add(arguments['prefix'])
+                node.data.update(arguments)
+
+            # Installed routes are applied last so they take precedence over other routes
+            # for the same prefix.
+            for arguments in sorted(self._routes.values(), key=lambda route: route.get('installed') == 'yes'):
+                if 'prefix' not in arguments:
+                    continue
+
+                node = routes.add(arguments['prefix'])
+                node.data.update(arguments)
+
+            exported_routes = [dict(route) for route in self._exported_routes.values()]
+            self._route_snapshot = (exported_routes, routes)
+
+        exported_routes, routes = self._route_snapshot
+        return BabelSnapshot(
+            node_info=dict(self._node_info),
+            neighbours=[dict(neighbour) for neighbour in self._neighbours.values()],
+            exported_routes=exported_routes,
+            routes=routes,
+        )
+
+# Monitors started in this process, indexed by (host, port).
+_monitors = {}
+
+
+def start_monitor(host, port):
+    """
+    Starts a background monitor for the given babeld instance unless one is
+    already running.
+
+    :param host: babeld local socket host
+    :param port: babeld local socket port
+    :return: Monitor instance
+    """
+
+    monitor = _monitors.get((host, port), None)
+    if monitor is None or not monitor.is_alive():
+        monitor = BabelMonitor(host, port)
+        monitor.start()
+        _monitors[(host, port)] = monitor
+
+    return monitor
+
+
+def get_monitor(host, port):
+    """
+    Returns the monitor for the given babeld instance or None if it has not
+    been started.
+
+    :param host: babeld local socket host
+    :param port: babeld local socket port
+    """
+
+    return _monitors.get((host, port), None)
@@ -7,6 +7,30 @@ class BabelParseFailed(Exception):
     pass
 
 
+def parse_line(line):
+    """
+    Parses a single line of babeld local interface output.
+
+    :param line: Line without the trailing newline
+    :return: A tuple (command, update_type, identifier, arguments) or None if
+        the line is not an update
+    """
+
+    parts = line.split(' ', 3)
+    if len(parts) < 3:
+        return None
+
+    command, update_type, identifier = parts[:3]
+    raw_arguments = parts[3].split(' ') if len(parts) > 3 else []
+
+    arguments = {}
+    while len(raw_arguments) >= 2:
+        key, value = raw_arguments.pop(0), raw_arguments.pop(0)
+        arguments[key] = value
+
+    return command, update_type, identifier, arguments
+
+
 class BabelParser(object):
     """
     Parser for babeld data feed.
@@ -45,20 +69,14 @@ class BabelParser(object):
         }
 
         for line in raw.split('\n'):
-            try:
-                command, update_type, identifier, raw_arguments = line.split(' ', 3)
-                raw_arguments = raw_arguments.split(' ')
-            except ValueError:
+            update = parse_line(line)
+            if update is None:
                 continue
 
+            command, update_type, identifier, arguments = update
             if command != 'add':
                 continue
 
-            arguments = {}
-            while raw_arguments:
-                key, value = raw_arguments.pop(0), raw_arguments.pop(0)
-                arguments[key] = value
-
             if update_type == 'self':
                 # Node itself.
                 data['node_info'] = {
@@ -6,14 +6,36 @@ from nodewatcher.core.monitor import processors as monitor_processors, events as
 from nodewatcher.modules.monitor.sources.http import processors as http_processors
 from nodewatcher.utils import ipaddr
 
-from . import models as babel_models, parser as babel_parser
+from . import models as babel_models, monitor as babel_monitor, parser as babel_parser
+
+
+def get_babeld_address():
+    """
+    Returns the configured (host, port) of the local Babel daemon.
+    """
+
+    return (
+        getattr(settings, 'BABELD_MONITOR_HOST', '::1'),
+        getattr(settings, 'BABELD_MONITOR_PORT', 33123),
+    )
 
 
 class IncludeRoutableNodes(monitor_processors.NetworkProcessor):
     """
     Selects all nodes for which routes exist as reported by the local Babel daemon.
+    When a background monitor subscription is available, routes are taken from its
+    snapshot instead of requesting a full dump.
     """
 
+    @classmethod
+    def initialize_run(cls, run):
+        """
+        Starts a long-lived subscription to the local Babel daemon.
+        """
+
+        if getattr(settings, 'BABELD_MONITOR_SUBSCRIBE', True):
+            babel_monitor.start_monitor(*get_babeld_address())
+
     def process(self, context, nodes):
         """
         Performs network-wide processing and selects the nodes that will be processed
@@ -24,12 +46,17 @@ class IncludeRoutableNodes(monitor_processors.NetworkProcessor):
         :return: A (possibly) modified context and a (possibly) modified set of nodes
         """
 
-        # Fetch data from the Babel daemon.
-        self.logger.info("Parsing babeld information...")
-        babel = babel_parser.BabelParser(
-            host=getattr(settings, 'BABELD_MONITOR_HOST', '::1'),
-            port=getattr(settings, 'BABELD_MONITOR_PORT', 33123),
-        )
+        # Use a snapshot of the monitor subscription when available, otherwise fetch
+        # data from the Babel daemon.
+        babel = None
+        monitor = babel_monitor.get_monitor(*get_babeld_address())
+        if monitor is not None:
+            babel = monitor.snapshot()
+
+        if babel is None:
+            self.logger.info("Parsing babeld information...")
+            host, port = get_babeld_address()
+            babel = babel_parser.BabelParser(host=host, port=port)
 
         try:
             routes = babel.routes
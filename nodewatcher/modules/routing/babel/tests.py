@@ -0,0 +1,129 @@
+import socket
+import threading
+import time
+import unittest
+
+from . import monitor as babel_monitor, parser as babel_parser
+
+BABELD_DUMP = [
+    'BABEL 1.0',
+    'version babeld-1.8.0',
+    'host lem-1',
+    'my-id 02:ca:ff:ee:ba:be:00:01',
+    'ok',
+    'add self lem-1 id 02:ca:ff:ee:ba:be:00:01',
+    'add neighbour 1e2f3c0 address fe80::1 if wlan0 reach ffff rxcost 96 txcost 96 cost 96',
+    'add xroute 10.254.147.224/27-::/0 prefix 10.254.147.224/27 from ::/0 metric 0',
+    'add route 1e2f840 prefix 10.254.0.1/32 from ::/0 installed yes id 02:ca:ff:ee:ba:be:00:02 metric 96 refmetric 0 via fe80::1 if wlan0',
+    'add route 1e2f8a0 prefix 10.254.0.2/32 from ::/0 installed yes id 02:ca:ff:ee:ba:be:00:03 metric 192 refmetric 96 via fe80::1 if wlan0',
+    'ok',
+]
+
+
+class ScriptedBabelServer(object):
+    """
+    A local TCP server that emulates babeld output.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.client = None
+
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self):
+        self.client, address = self.server.accept()
+        self.send(self.lines)
+
+    def send(self, lines):
+        self.client.sendall(''.join(['%s\n' % line for line in lines]))
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.server.close()
+
+
+class BabelParserTestCase(unittest.TestCase):
+    def test_parse_line(self):
+        self.assertEqual(
+            babel_parser.parse_line('flush route 1e2f840'),
+            ('flush', 'route', '1e2f840', {}),
+        )
+        self.assertEqual(
+            babel_parser.parse_line('add xroute 1e2f prefix 10.0.0.0/8 metric'),
+            ('add', 'xroute', '1e2f', {'prefix': '10.0.0.0/8'}),
+        )
+        self.assertIsNone(babel_parser.parse_line('version babeld-1.8.0'))
+
+
+class BabelMonitorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ScriptedBabelServer(BABELD_DUMP)
+        self.monitor = babel_monitor.BabelMonitor('127.0.0.1', self.server.port)
+        self.monitor.start()
+
+    def tearDown(self):
+        self.monitor.stop()
+        self.server.close()
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+
+        return False
+
+    def test_snapshot(self):
+        self.assertTrue(self.wait_for(self.monitor.is_synchronized))
+
+        snapshot = self.monitor.snapshot()
+        self.assertEqual(snapshot.node_info['hostname'], 'lem-1')
+        self.assertEqual(snapshot.node_info['router_id'], '02:ca:ff:ee:ba:be:00:01')
+        self.assertEqual(len(snapshot.neighbours), 1)
+        self.assertEqual(len(snapshot.exported_routes), 1)
+        self.assertEqual(snapshot.routes.search_best('10.254.0.1').data['metric'], '96')
+        self.assertEqual(snapshot.routes.search_best('10.254.147.225').prefix, '10.254.147.224/27')
+
+        # Snapshots are reused while routes do not change.
+        self.assertIs(self.monitor.snapshot().routes, snapshot.routes)
+
+    def test_incremental_updates(self):
+        self.assertTrue(self.wait_for(self.monitor.is_synchronized))
+
+        self.server.send([
+            'change route 1e2f840 prefix 10.254.0.1/32 from ::/0 installed yes id 02:ca:ff:ee:ba:be:00:02 metric 128 refmetric 0 via fe80::1 if wlan0',
+            'flush route 1e2f8a0',
+            'add route 1e2f900 prefix 10.254.0.3/32 from ::/0 installed yes id 02:ca:ff:ee:ba:be:00:04 metric 96 refmetric 0 via fe80::1 if wlan0',
+        ])
+
+        def updated():
+            routes = self.monitor.snapshot().routes
+            return routes.search_exact('10.254.0.3/32') is not None
+
+        self.assertTrue(self.wait_for(updated))
+
+        routes = self.monitor.snapshot().routes
+        self.assertEqual(routes.search_exact('10.254.0.1/32').data['metric'], '128')
+        self.assertIsNone(routes.search_exact('10.254.0.2/32'))
+
+        # Original snapshot is not modified by updates.
+        self.server.send(['flush route 1e2f900'])
+        self.assertTrue(self.wait_for(lambda: self.monitor.snapshot().routes.search_exact('10.254.0.3/32') is None))
+        self.assertIsNotNone(routes.search_exact('10.254.0.3/32'))
+
+    def test_disconnect(self):
+        self.assertTrue(self.wait_for(self.monitor.is_synchronized))
+
+        self.server.client.close()
+        self.assertTrue(self.wait_for(lambda: not self.monitor.is_synchronized()))
+        self.assertIsNone(self.monitor.snapshot())
@@ -19,4 +19,5 @@ components.partials.get_partial('node_display_partial').add(components.PartialEn
     name='olsr',
     weight=100,
     template='nodes/olsr.html',
+    cache=components.CachePolicy([components.registry_version()]),
 ))
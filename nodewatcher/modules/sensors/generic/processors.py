@@ -1,6 +1,12 @@
+from django.utils import timezone
+
 from nodewatcher.core.monitor import processors as monitor_processors
+from nodewatcher.core.registry import bulk as registry_bulk
+from nodewatcher.modules.monitor.datastream import processors as ds_processors
 from nodewatcher.modules.monitor.sources.http import processors as http_processors
 
+from . import models
+
 
 class GenericSensors(monitor_processors.NodeProcessor):
     """
@@ -22,29 +28,55 @@ class GenericSensors(monitor_processors.NodeProcessor):
 
         existing_sensors = {}
         for sensor in node.monitoring.sensors.generic():
-            sensor.value = None
             existing_sensors[sensor.sensor_id] = sensor
 
-        if version >= 1:
-            for sensor_id, data in context.http.sensors.generic.items():
-                if sensor_id.startswith('_'):
-                    continue
-
-                node.monitoring.sensors.generic(queryset=True).update_or_create(
-                    root=node,
-                    sensor_id=sensor_id,
-                    defaults={
-                        'name': str(data.name or ''),
-                        'unit': str(data.unit or ''),
-                        'value': float(data.value),
-                        'group': str(data.group or ''),
-                    }
-                )
-
-                if sensor_id in existing_sensors:
-                    del existing_sensors[sensor_id]
-
-        for sensor in existing_sensors.values():
-            sensor.save()
+        now = timezone.now()
+        if version < 1:
+            # Sensor data is not available, reset readings of existing sensors.
+            sensors = existing_sensors.values()
+            for sensor in sensors:
+                sensor.value = None
+                sensor.last_updated = now
+            registry_bulk.update(sensors, ['value', 'last_updated'])
+            ds_processors.track_models(context, sensors)
+            return context
+
+        sensors = []
+        new_sensors = []
+        updated_sensors = []
+        # Last update timestamps of all reported sensors are refreshed, even when their values
+        # have not changed, so they are written together with any changed fields.
+        updated_fields = set(['last_updated'])
+        for sensor_id, data in context.http.sensors.generic.items():
+            if sensor_id.startswith('_'):
+                continue
+
+            values = {
+                'name': str(data.name or ''),
+                'unit': str(data.unit or ''),
+                'value': float(data.value),
+                'group': str(data.group or ''),
+            }
+
+            sensor = existing_sensors.pop(sensor_id, None)
+            if sensor is None:
+                sensor = node.monitoring.sensors.generic(create=models.GenericSensorMonitor, sensor_id=sensor_id, **values)
+                new_sensors.append(sensor)
+            else:
+                updated_fields.update(registry_bulk.get_changed_fields(sensor, values))
+                sensor.last_updated = now
+                updated_sensors.append(sensor)
+
+            sensors.append(sensor)
+
+        registry_bulk.create(new_sensors)
+        registry_bulk.update(updated_sensors, updated_fields)
+
+        # Remove sensors which are no longer reported.
+        if existing_sensors:
+            models.GenericSensorMonitor.objects.filter(pk__in=[sensor.pk for sensor in existing_sensors.values()]).delete()
+
+        # Readings must be stored every time, also for sensors written in bulk.
+        ds_processors.track_models(context, sensors)
 
         return context
@@ -1,6 +1,6 @@
 from django.utils.translation import gettext_noop
 
-from nodewatcher.core.monitor import models as monitor_models, processors as monitor_processors
+from nodewatcher.core.monitor import processors as monitor_processors
 
 from . import models
 
@@ -74,7 +74,8 @@ except ImportError:
 
 class Tunneldigger(monitor_processors.NodeProcessor):
     """
-    Performs tunneldigger-related monitoring functions.
+    Performs tunneldigger-related monitoring functions. The up/down state of
+    each configured tunnel is stored into ``context.tunneldigger.tunnels``.
     """
 
     def process(self, context, node):
@@ -87,16 +88,33 @@ class Tunneldigger(monitor_processors.NodeProcessor):
         """
 
         # Verify that configured tunneldigger interfaces are present.
-        for idx, interface in enumerate(node.config.core.interfaces(onlyclass=models.TunneldiggerInterfaceConfig)):
-            # TODO: Should we identify VPN interfaces based on configured MAC address?
-            ifname = models.get_tunneldigger_interface_name(idx)
-            try:
-                iface = node.monitoring.core.interfaces(queryset=True).get(name=ifname, up=True).cast()
-                self.process_interface(context, iface)
-            except monitor_models.InterfaceMonitor.DoesNotExist:
+        # TODO: Should we identify VPN interfaces based on configured MAC address?
+        ifnames = [
+            models.get_tunneldigger_interface_name(idx)
+            for idx, interface in enumerate(node.config.core.interfaces(onlyclass=models.TunneldiggerInterfaceConfig))
+        ]
+        if not ifnames:
+            return context
+
+        if 'interface_monitors' in context:
+            # Use interface monitors loaded by the interfaces processor.
+            interfaces = context.interface_monitors
+        else:
+            interfaces = {}
+            for iface in node.monitoring.core.interfaces().filter(name__in=ifnames):
+                interfaces[iface.name] = iface
+
+        for ifname in ifnames:
+            iface = interfaces.get(ifname, None)
+            up = iface is not None and iface.up
+            context.tunneldigger.tunnels[ifname] = up
+
+            if not up:
                 # TODO: Generate an event that digger interface does not exist or is down.
                 continue
 
+            self.process_interface(context, iface)
+
         return context
 
     def process_interface(self, context, iface):
@@ -246,6 +246,7 @@ CORE_APPS = [
     'nodewatcher.core.generator',
     'nodewatcher.core.monitor',
     'nodewatcher.core.registry',
+    'nodewatcher.core.statistics',
 ]
 
 # External dependency apps should be listed last.
@@ -441,6 +442,9 @@ CELERY_QUEUES = {
 
 CELERY_ROUTES = {
     # Generator.
+    'nodewatcher.core.generator.cgm.tasks.schedule_builds': {
+        'queue': 'generator',
+    },
     'nodewatcher.core.generator.cgm.tasks.background_build': {
         'queue': 'generator',
     },
@@ -448,6 +452,9 @@ CELERY_ROUTES = {
     'nodewatcher.core.monitor.tasks.run_pipeline': {
         'queue': 'monitor',
     },
+    'nodewatcher.modules.monitor.sources.http.tasks.process_push': {
+        'queue': 'monitor',
+    },
 }
 
 # Monitoring runs and processors configuration; this defines the order in which monitoring processors
@@ -526,7 +533,9 @@ MONITOR_RUNS = {
     'datastream': {
         'workers': 2,
         'interval': 700,
-        'max_tasks_per_child': 1,
+        # Downsampling dispatches a few work items per worker in each cycle, so workers
+        # are still recycled about once per cycle.
+        'max_tasks_per_child': 4,
         'processors': (
             'nodewatcher.modules.monitor.datastream.processors.MaintenanceDownsample',
         ),
@@ -548,6 +557,13 @@ MONITOR_RUNS = {
 MONITOR_HTTP_PUSH_RUN = 'telemetry-push'
 # Base host that should be used for HTTP push. Must be reachable from nodes.
 MONITOR_HTTP_PUSH_HOST = '127.0.0.1'
+# Time in seconds after which buffered HTTP pushes that have not been processed expire.
+MONITOR_HTTP_PUSH_BUFFER_TTL = 300
+# Maximum number of nodes with buffered HTTP pushes. Pushes from further nodes are rejected.
+MONITOR_HTTP_PUSH_BUFFER_MAX_PENDING = 10000
+# Maximum number of buffered HTTP pushes from different nodes processed together by a single
+# monitoring task. Setting this to 1 disables batching.
+MONITOR_HTTP_PUSH_BATCH_SIZE = 1
 # Timeout when establishing a connection during HTTP polling.
 MONITOR_HTTP_POLL_CONNECT_TIMEOUT = 2
 # Timeout when reading data over an established connection during HTTP polling.
@@ -570,6 +586,9 @@ DATASTREAM_BACKEND_SETTINGS = {
         'password': DATABASES['default']['PASSWORD'],
     },
 }
+# Time in seconds after which datastream downsampling stops dispatching work in a cycle and
+# carries the remaining streams over. Should be lower than the 'datastream' run interval.
+DATASTREAM_DOWNSAMPLE_TIME_BUDGET = 600
 
 OLSRD_MONITOR_HOST = '127.0.0.1'
 OLSRD_MONITOR_PORT = 2006